@@ -0,0 +1,424 @@
+"""This is an alternative startup script of the backend which serves the
+REST API of ``webserver.py`` with an asyncio server (aiohttp) instead of Flask.
+
+The compute threads (producer, feature extraction, visualisation and
+prediction) run unchanged. Every new spectrogram and prediction is encoded once
+by an artifact thread per session (see ``server.streaming.artifact_publisher``)
+and the request handlers only hand out these prebuilt artifacts. Hence, no
+request runs DSP, inference or the default JPEG encoding, and idle or streaming
+connections only cost a coroutine instead of a worker thread. Blocking
+operations like switching the predictor of a session and renditions with a
+non-default scale or quality run in the default executor of the event loop.
+
+All routes of ``webserver.py`` are available with the same parameters and
+responses, the host is http://127.0.0.1:5000 as well:
+
+```bash
+python server/async_webserver.py
+```
+
+Like ``webserver.py``, it answers right away and starts the default session
+in the background.
+
+"""
+
+import time
+
+# the startup report starts with the import of the web server
+importStart = time.perf_counter()
+
+import asyncio
+
+from aiohttp import web
+from werkzeug.http import quote_etag, parse_etags
+
+from server.audio_tagger_manager import AudioTaggerManager
+from server.config.load_config import loadPredictors, loadAudiofiles
+from server.config.config import DEFAULT_SESSION, RENDER_SCALE, RENDER_JPEG_QUALITY, STREAM_MAX_FPS, PUSH_TOP_K, \
+    PUSH_MIN_DELTA, PUSH_MAX_RATE, PUSH_KEEPALIVE
+from server.rendering.render_cache import RenderCache
+from server.rendering.raw_spectrogram import encodeColumns
+from server.streaming.artifact_publisher import SessionArtifacts
+from server.streaming.prediction_stream import PredictionStream
+from server.streaming.prediction_formats import encodePrediction, classesTag
+
+MJPEG_TYPE = 'multipart/x-mixed-replace; boundary=frame'
+
+routes = web.RouteTableDef()
+
+
+def sessionRoutes(method, path):
+    """registers a handler for a route of the default session and of
+    ``/sessions/{sessionId}``.
+
+    Parameters
+    ----------
+    method : str
+        the http method
+    path : str
+        the route of the default session, e.g. ``/live_pred``
+
+    Returns
+    -------
+    callable
+        decorator registering the handler
+    """
+    def register(handler):
+        routes.route(method, path)(handler)
+        routes.route(method, '/sessions/{sessionId:\\d+}' + path)(handler)
+        return handler
+    return register
+
+
+###### audio tagger REST API functions ######
+
+@sessionRoutes('GET', '/live_visual')
+async def live_visual(request):
+    """Http GET interface method to request most current audio visualisation
+    (URI: /live_visual), see ``webserver.live_visual()``.
+    """
+    return await visualResponse(request, lambda content: content)
+
+@sessionRoutes('GET', '/live_visual_browser')
+async def live_visual_browser(request):
+    """Http GET interface method to request most current audio visualisation
+    (browser ready) (URI: /live_visual_browser), see ``webserver.live_visual_browser()``.
+    """
+    return await visualResponse(request, lambda content: (b'--frame\r\n'
+                                                          b'Content-Type: image/jpeg\r\n\r\n' + content + b'\r\n\r\n'))
+
+@sessionRoutes('GET', '/live_visual_stream')
+async def live_visual_stream(request):
+    """Http GET interface method to receive the audio visualisation as
+    a continuous MJPEG stream (URI: /live_visual_stream), see ``webserver.live_visual_stream()``.
+    """
+    scale, quality = renditionArgs(request)
+    fps = floatArg(request, 'fps', STREAM_MAX_FPS)
+    if not fps > 0:
+        raise web.HTTPBadRequest()
+    session, artifacts = getArtifacts(request)
+
+    response = web.StreamResponse(headers={'Content-Type': MJPEG_TYPE, 'Cache-Control': 'no-cache'})
+    await response.prepare(request)
+    sentVersion, sentTime = -1, 0.0
+    try:
+        while not session.closed:
+            artifact = await artifacts.visual.waitFor(sentVersion)
+            if artifact is None or artifact.version <= sentVersion:
+                continue
+            # respect the frame rate, frames published in the meantime are skipped
+            delay = sentTime + 1.0 / fps - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                artifact = artifacts.visual.artifact
+            content, _ = await rendition(session, artifact, scale, quality)
+            sentVersion, sentTime = artifact.version, time.monotonic()
+            await response.write(b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + content + b'\r\n')
+    except ConnectionResetError:
+        pass    # the client closed the stream
+    return response
+
+@sessionRoutes('GET', '/live_spec')
+async def live_spec(request):
+    """Http GET interface method to request the most current spectrogram
+    as raw values for client-side rendering (URI: /live_spec), see ``webserver.live_spec()``.
+    """
+    since = intArg(request, 'since', None)
+    head, columns = getSession(request).getVisualisationColumns(since)
+    try:
+        content = encodeColumns(columns, request.query.get('format', 'uint8'))
+    except ValueError:
+        raise web.HTTPBadRequest()
+    headers = {'X-Spectrogram-Sequence': '' if head is None else str(head),
+               'X-Spectrogram-Shape': '{},{}'.format(columns.shape[1], columns.shape[0]),
+               'Cache-Control': 'no-cache'}
+    if not content:
+        return web.Response(status=204, headers=headers)
+    return web.Response(body=content, content_type='application/octet-stream', headers=headers)
+
+@sessionRoutes('GET', '/live_pred')
+async def live_pred(request):
+    """Http GET interface method to request most current class predictions
+    (URI: /live_pred), see ``webserver.live_pred()``.
+    """
+    k = intArg(request, 'k', None)
+    if k is not None and k < 1:
+        raise web.HTTPBadRequest()
+    format = request.query.get('format', 'json')
+    _, artifacts = getArtifacts(request)
+    artifact = await prebuilt(artifacts.prediction)
+    if k is None and format == 'json':
+        content, mimetype = artifact.content, 'application/json'
+    else:
+        try:
+            content, mimetype = encodePrediction(artifact.version, artifact.source, k, format)
+        except ValueError:
+            raise web.HTTPBadRequest()
+    return web.Response(body=content, content_type=mimetype,
+                        headers={'X-Prediction-Sequence': str(artifact.version),
+                                 'X-Classes-Tag': classesTag(artifact.source)})
+
+@sessionRoutes('GET', '/live_pred_stream')
+async def live_pred_stream(request):
+    """Http GET interface method to receive the class predictions as
+    server-sent events (URI: /live_pred_stream), see ``webserver.live_pred_stream()``.
+    """
+    k = intArg(request, 'k', PUSH_TOP_K)
+    minDelta = floatArg(request, 'min_delta', PUSH_MIN_DELTA)
+    rate = floatArg(request, 'rate', PUSH_MAX_RATE)
+    if (k is not None and k < 1) or not minDelta >= 0 or not rate > 0:
+        raise web.HTTPBadRequest()
+    session, artifacts = getArtifacts(request)
+
+    response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache',
+                                           'X-Accel-Buffering': 'no'})
+    await response.prepare(request)
+    stream = PredictionStream(k, minDelta)
+    seenVersion, seenTime, sentTime = -1, 0.0, time.monotonic()
+    try:
+        while not session.closed:
+            artifact = await artifacts.prediction.waitFor(seenVersion)
+            if artifact is None or artifact.version <= seenVersion:
+                if time.monotonic() - sentTime >= PUSH_KEEPALIVE:
+                    sentTime = time.monotonic()
+                    await response.write(b': keep-alive\n\n')
+                continue
+            # respect the rate, predictions published in the meantime are skipped
+            delay = seenTime + 1.0 / rate - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                artifact = artifacts.prediction.artifact
+            seenVersion, seenTime = artifact.version, time.monotonic()
+            events = stream.update(artifact.version, artifact.source)
+            if events:
+                sentTime = seenTime
+                await response.write(events)
+    except ConnectionResetError:
+        pass    # the client closed the stream
+    return response
+
+@sessionRoutes('GET', '/classes')
+async def classes(request):
+    """Http GET interface method to request the class names of the
+    currently selected predictor (URI: /classes), see ``webserver.classes()``.
+    """
+    _, artifacts = getArtifacts(request)
+    artifact = await prebuilt(artifacts.prediction)
+    etag = classesTag(artifact.source)
+    headers = {'ETag': quote_etag(etag), 'Cache-Control': 'no-cache'}
+    if matchesETag(request, etag):
+        return web.Response(status=304, headers=headers)
+    return web.json_response([entry[0] for entry in artifact.source], headers=headers)
+
+@routes.get('/pred_list')
+async def pred_list(request):
+    """Http GET interface method to receive a list of available predictors
+    (URI: /pred_list), see ``webserver.pred_list()``.
+    """
+    content = [{'id': elem['id'], 'displayname': elem['displayname'], 'classes': elem['classes'],
+                'description': elem['description']} for elem in model.getPredList()]
+    return web.json_response(content)
+
+@routes.get('/pred_status')
+async def pred_status(request):
+    """Http GET interface method to check which predictors are warm
+    (URI: /pred_status), see ``webserver.pred_status()``.
+    """
+    ready = model.predictorPool.isReady()
+    content = {'ready': ready, 'predictors': model.predictorPool.getStatus()}
+    return web.json_response(content, status=200 if ready else 503)
+
+@routes.get('/health')
+async def health(request):
+    """Http GET interface method to check the startup of the backend
+    (URI: /health), see ``webserver.health()``.
+    """
+    content = model.startup.getStatus()
+    return web.json_response(content, status=503 if content['status'] == 'failed' else 200)
+
+@routes.get('/audiofile_list')
+async def audiofile_list(request):
+    """Http GET interface method to receive a list of available audio files
+    (URI: /audiofile_list), see ``webserver.audiofile_list()``.
+    """
+    content = [{'id': elem['id'], 'displayname': elem['displayname']} for elem in model.getAudiofileList()]
+    return web.json_response(content)
+
+@sessionRoutes('GET', '/consumer_stats')
+async def consumer_stats(request):
+    """Http GET interface method to request lag statistics of the feature
+    extraction stage and the consumers (URI: /consumer_stats), see ``webserver.consumer_stats()``.
+    """
+    return web.json_response(getSession(request).getConsumerStats())
+
+@routes.get('/sessions')
+async def session_list(request):
+    """Http GET interface method to receive a list of running audio sessions
+    (URI: /sessions), see ``webserver.session_list()``.
+    """
+    return web.json_response(model.getSessions())
+
+@routes.post('/sessions')
+async def create_session(request):
+    """Http POST interface method for starting a new audio session
+    (URI: /sessions), see ``webserver.create_session()``.
+    """
+    try:
+        sessionId = model.startSession(await jsonBody(request))
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=str(e))
+    return web.json_response({'id': sessionId}, status=202)
+
+@routes.delete('/sessions/{sessionId:\\d+}')
+async def close_session(request):
+    """Http DELETE interface method for stopping an audio session
+    (URI: /sessions/<id>), see ``webserver.close_session()``.
+    """
+    sessionId = int(request.match_info['sessionId'])
+    try:
+        await asyncio.get_event_loop().run_in_executor(None, model.closeSession, sessionId)
+    except KeyError:
+        raise web.HTTPNotFound()
+    artifacts = sessionArtifacts.pop(sessionId, None)
+    if artifacts is not None:
+        await asyncio.get_event_loop().run_in_executor(None, artifacts.stop)
+    return web.Response(text='OK')
+
+@sessionRoutes('POST', '/settings')
+async def send_new_settings(request):
+    """Http POST interface method for sending new configuration settings
+    to backend system (URI: /settings), see ``webserver.send_new_settings()``.
+    """
+    content = await jsonBody(request)
+    session = getSession(request)
+    try:
+        switch = session.refreshAudioTagger(content)
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=str(e))
+    location = '{}/{}'.format(request.path.rstrip('/'), switch.switchId)
+    return web.json_response(switch.getStatus(), status=202, headers={'Location': location})
+
+@sessionRoutes('GET', '/settings/{switchId:\\d+}')
+async def switch_status(request):
+    """Http GET interface method to request the progress of a settings switch
+    (URI: /settings/<switchId>), see ``webserver.switch_status()``.
+    """
+    try:
+        switch = getSession(request).getSwitch(int(request.match_info['switchId']))
+    except KeyError:
+        raise web.HTTPNotFound()
+    return web.json_response(switch.getStatus())
+
+###### Helper functions ######
+
+def getSession(request):
+    sessionId = int(request.match_info.get('sessionId', DEFAULT_SESSION))
+    try:
+        return model.getSession(sessionId)
+    except KeyError:
+        # the default session is not running until the startup finished
+        if sessionId == DEFAULT_SESSION and not model.startup.finished.is_set():
+            raise web.HTTPServiceUnavailable()
+        raise web.HTTPNotFound()
+
+def getArtifacts(request):
+    # artifact threads of a session are started with the first request to the session
+    session = getSession(request)
+    artifacts = sessionArtifacts.get(session.sessionId)
+    if artifacts is None or artifacts.session is not session:
+        artifacts = SessionArtifacts(session, asyncio.get_event_loop(), renderCache, dropArtifacts)
+        sessionArtifacts[session.sessionId] = artifacts
+    return session, artifacts
+
+def dropArtifacts(artifacts):
+    # called on the event loop once the session of the artifacts has been closed
+    if sessionArtifacts.get(artifacts.session.sessionId) is artifacts:
+        del sessionArtifacts[artifacts.session.sessionId]
+
+async def jsonBody(request):
+    # the body of a POST message, None if it is no json
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+async def prebuilt(artifactThread):
+    artifact = await artifactThread.waitFor()
+    if artifact is None:
+        raise web.HTTPServiceUnavailable()
+    return artifact
+
+async def rendition(session, artifact, scale, quality):
+    # the default rendition is prebuilt, other ones are rendered once in the executor
+    if scale == RENDER_SCALE and quality == RENDER_JPEG_QUALITY:
+        return artifact.content, artifact.etag
+    return await asyncio.get_event_loop().run_in_executor(
+        None, renderCache.render, session.sessionId, artifact.version, artifact.source, scale, quality)
+
+def intArg(request, name, default):
+    try:
+        return int(request.query[name]) if name in request.query else default
+    except ValueError:
+        return default
+
+def floatArg(request, name, default):
+    try:
+        return float(request.query[name]) if name in request.query else default
+    except ValueError:
+        return default
+
+def renditionArgs(request):
+    scale = intArg(request, 'scale', RENDER_SCALE)
+    quality = intArg(request, 'quality', RENDER_JPEG_QUALITY)
+    if not 1 <= scale <= 8 or not 1 <= quality <= 100:
+        raise web.HTTPBadRequest()
+    return scale, quality
+
+def matchesETag(request, etag):
+    # same quoting and comparison as the If-None-Match handling of Flask in webserver.py
+    return parse_etags(request.headers.get('If-None-Match')).contains(etag)
+
+async def visualResponse(request, wrap):
+    # serves the prebuilt rendition of the current spectrogram version, or 304 if the client has it already
+    scale, quality = renditionArgs(request)
+    session, artifacts = getArtifacts(request)
+    artifact = await prebuilt(artifacts.visual)
+    # the prebuilt default rendition is tagged like the renditions of the render cache
+    etag = renderCache.etag(session.sessionId, artifact.version, scale, quality)
+    headers = {'ETag': quote_etag(etag), 'Cache-Control': 'no-cache'}
+    if matchesETag(request, etag):
+        return web.Response(status=304, headers=headers)
+    content, _ = await rendition(session, artifact, scale, quality)
+    headers['Content-Type'] = MJPEG_TYPE
+    return web.Response(body=wrap(content), headers=headers)
+
+async def startBackend(app):
+    model.start()
+
+async def stopArtifacts(app):
+    for artifacts in sessionArtifacts.values():
+        artifacts.stop()
+
+
+### load configs ###
+predictorList = loadPredictors()
+audiofileList = loadAudiofiles()
+
+# the default session with the starting predictor and audio file of config.py is started with the application
+model = AudioTaggerManager(predictorList, audiofileList)
+model.startup.addPhase('web server import', time.perf_counter() - importStart)
+
+# renditions with a non-default scale or quality are rendered once per version
+renderCache = RenderCache()
+
+# prebuilt artifacts per session id
+sessionArtifacts = {}
+
+app = web.Application()
+app.add_routes(routes)
+app.on_startup.append(startBackend)
+app.on_cleanup.append(stopArtifacts)
+
+# start webserver
+if __name__ == '__main__':
+    web.run_app(app, host='127.0.0.1', port=5000)
@@ -6,24 +6,55 @@ coming from the producers (MicrophoneThread and AudiofileThread). Respectively,
 all the chunks are consumed by modules which e.g. compute spectrogram
 representation or make predictions based on a trained model for an
 audio input chunk.
+The spectrogram of every chunk is computed exactly once by a shared feature
+extraction stage (SpectrogramStage) owned by the manager. It publishes the
+spectrogram columns to a sequence-numbered feature ring from which
+visualizers and predictors read.
 Once there are multiple consumers, synchronization needs to be considered.
 To ensure that consumers do not drift off too far, the audio tagger manager
 keeps track of a global timing variable ``tGroundTruth``. It is increased
 every time a producer delivers a new audio chunk. When a consumer is ready
 to process new chunks, it asks for ``tGroundTruth``'s timestamp and reads
 chunks from shared memory related to this timestamp.
+The shared memory is a preallocated ring buffer (AudioRingBuffer) and
+``tGroundTruth`` is a monotonically increasing sequence number which is
+never wrapped, so consumers can tell exactly which chunks are new.
+All of the above exists once per audio session (AudioSession), so a single
+process can tag several microphones or files at the same time. The manager
+holds the running sessions, which share the spectrogram engine and the loaded
+weights of the predictors.
+Audio source and predictor of a session are switched in the background
+without a gap in its output (see ``server.session_switch``).
+With ``EXECUTION_MODE = 'processes'`` the audio ring buffer and the feature
+ring of a session live in shared memory. Feature extraction and the inference
+of batch capable predictors then run in worker processes (see
+``server.workers``), so they neither compete for the GIL with the producers and
+the web server nor copy chunks or columns between processes.
+Creating the manager is cheap. ``AudioTaggerManager.start()`` loads the model
+and starts the default session in the background (see ``server.startup``).
 
 """
 
 import wave
-import pyaudio
 import numpy as np
-from collections import deque
 
 from pydoc import locate
-from threading import Thread, Event, Condition
-
-from server.config.config import BUFFER_SIZE, START_FILE, CHUNK_SIZE, SAMPLE_RATE, N_CHANNELS
+from collections import OrderedDict
+from threading import Thread, Event, Lock
+
+from server.config.config import BUFFER_SIZE, CHUNK_SIZE, SAMPLE_RATE, N_CHANNELS, FEATURE_BUFFER_SIZE, \
+    SPEC_NUM_BINS, SLIDING_WINDOW_SIZE, DEFAULT_SESSION, EXECUTION_MODE, SWITCH_HISTORY
+from server.buffers.ring_buffer import AudioRingBuffer
+from server.buffers.sequence_notifier import SequenceNotifier
+from server.buffers.shared_memory import SharedRingMemory
+from server.features.feature_ring import FeatureRing
+from server.features.spectrogram_stage import SpectrogramStage
+from server.workers.feature_process import FeatureProcessStage
+from server.workers.prediction_process import ProcessPredictor
+from server.session_switch import PredictorBinding, SettingsSwitch
+from server.startup import StartupThread
+from server.consumer.predictors.predictor_pool import PredictorPool
+from server.consumer.visualizers.spectrogram.madmom_spectrogram_provider import MadmomSpectrogramProvider
 
 
 class MicrophoneThread(Thread):
@@ -39,6 +70,8 @@ class MicrophoneThread(Thread):
         it to get digital chunks of samples.
     stream : PyAudio stream object
         stream of the pyaudio object
+    activated : threading.Event
+        set once the session accepts the chunks of the producer
     _stopevent : threading.Event
         indicator for stopping a thread loop
 
@@ -59,6 +92,7 @@ class MicrophoneThread(Thread):
         name : str
             the name of the thread
         """
+        import pyaudio
         self.p = pyaudio.PyAudio()
         self.stream = self.p.open(format=pyaudio.paInt16,
                              channels=N_CHANNELS,
@@ -66,23 +100,21 @@ class MicrophoneThread(Thread):
                              input=True,
                              frames_per_buffer=CHUNK_SIZE)
         self.manager = manager
+        self.activated = Event()
         self._stopevent = Event()
         Thread.__init__(self, name=name)
 
     def run(self):
         """Reads sampled audio chunks coming from a microphone and
-        puts them into the shared memory. Finally, the global time variable
+        puts them into the shared memory. Thereby, the global time variable
         ``tGroundTruth`` is incremented by 1.
         """
 
 
         while not self._stopevent.isSet():
             chunk = self.stream.read(CHUNK_SIZE)
-            self.manager.putToSM(chunk)   # insert new chunk into shared memory
-            self.manager.tGroundTruth += 1    # increment global timestamp variable
-            self.manager.tGroundTruth = self.manager.tGroundTruth % BUFFER_SIZE # ring buffer implementation
-            with self.manager.condition:
-                self.manager.condition.notifyAll()
+            self.manager.putToSM(chunk, self)   # insert new chunk into shared memory, increments global timestamp
+            self.manager.chunkNotifier.publish(self.manager.tGroundTruth)
 
     def join(self, timeout=None):
         """Stops the thread.
@@ -117,6 +149,8 @@ class AudiofileThread(Thread):
         with path ``filePath``
     stream : PyAudio stream object
         stream of the pyaudio object
+    activated : threading.Event
+        set once the session accepts the chunks of the producer
     _stopevent : threading.Event
         indicator for stopping a thread loop
 
@@ -139,7 +173,7 @@ class AudiofileThread(Thread):
         name : str
             the name of the thread
         """
-
+        import pyaudio
         self.p = pyaudio.PyAudio()
         self.wf = wave.open(filePath, 'rb')
         self.stream = self.p.open(format=pyaudio.paInt16,
@@ -147,23 +181,21 @@ class AudiofileThread(Thread):
                 rate=SAMPLE_RATE,
                 output=True)
         self.manager = manager
+        self.activated = Event()
         self._stopevent = Event()
         Thread.__init__(self, name=name)
 
     def run(self):
         """Reads sampled audio chunks coming from an audio file and
-        puts them into the shared memory. Finally, the global time variable
+        puts them into the shared memory. Thereby, the global time variable
         ``tGroundTruth`` is incremented by 1.
         """
         chunk = self.wf.readframes(CHUNK_SIZE)
         while not self._stopevent.isSet() and chunk != b'':
             self.stream.write(chunk)
-            self.manager.putToSM(chunk)   # insert new chunk into shared memory
-            self.manager.tGroundTruth += 1    # increment global timestamp variable
-            self.manager.tGroundTruth = self.manager.tGroundTruth % BUFFER_SIZE # ring buffer implementation
+            self.manager.putToSM(chunk, self)   # insert new chunk into shared memory, increments global timestamp
             chunk = self.wf.readframes(CHUNK_SIZE)
-            with self.manager.condition:
-                self.manager.condition.notifyAll()
+            self.manager.chunkNotifier.publish(self.manager.tGroundTruth)
 
         self.stream.stop_stream()
         self.stream.close()
@@ -187,31 +219,82 @@ class AudiofileThread(Thread):
         Thread.join(self, timeout)
 
 
-class AudioTaggerManager:
+class AudioSession:
     """
-    This is the central management class of the audio tagger backend system.
+    A single audio stream of the audio tagger, e.g. one microphone or one
+    audio file. Each session owns its producer, shared memory, feature ring
+    and consumers, so its sliding windows and outputs are independent of all
+    other sessions. Heavy resources like the spectrogram engine and the
+    weights of a predictor are loaded once per process and shared by all
+    sessions. From the point of view of producers and consumers, a session
+    takes the role of the audio tagger manager.
 
     Attributes
     ----------
-    visualProvider : VisualisationContract
+    sessionId : int
+        id of the session within the audio tagger manager
+    manager : AudioTaggerManager
+        reference to the audio tagger manager owning the session
+    settings : dictionary
+        the current audio input and predictor of the session
+    visProvider : VisualisationContract
         a consumer which processes audio chunks to visual representation
     predProvider : PredictorContract
         a consumer which processes audio chunks to class predictions
-    predList : list
-        list of available predictors
-    audiofileList : list
-        list of available audio files
     curVisual : 2d numpy array of float values
         holds the current visual representation object
+    visualVersion : int
+        version of the current visual representation, increased with every new one
+    visualHead : int
+        number of spectrogram columns appended up to the current visual representation,
+        None if the visualisation consumer does not count its columns
+    visualLock : threading.Lock
+        guarantees that visual representation and version match
+    visualNotifier : SequenceNotifier
+        publishes the version of the newest visual representation, e.g. to streaming clients
     curPred : numpy array of list objects
         holds the current class prediction object
-    sharedMemory : deque
+    predictionVersion : int
+        sequence number of the current class prediction, increased with every new one
+    predictionLock : threading.Lock
+        guarantees that class prediction and sequence number match
+    predictionNotifier : SequenceNotifier
+        publishes the sequence number of the newest class prediction, e.g. to push clients
+    sharedMemory : AudioRingBuffer
         shared memory object (ring buffer) holding audio chunks
     tGroundTruth: int
-        global timing variable used for synchronization
+        timing variable of the session used for synchronization. It equals
+        the sequence number of the next audio chunk and is never wrapped.
+    featureRing : FeatureRing
+        ring buffer holding the spectrogram columns of the audio chunks
+    featureStage : SpectrogramStage or FeatureProcessStage
+        feature extraction stage computing the spectrogram columns,
+        in a worker process if ``EXECUTION_MODE`` is ``'processes'``
+    chunkNotifier : SequenceNotifier
+        publishes the sequence number of the newest audio chunk to the feature stage
+    featureNotifier : SequenceNotifier
+        publishes the sequence number of the newest spectrogram column to the consumers
+    producerThread : Thread
+        reference pointing to the producer thread
+    pendingProducer : Thread
+        producer of a running settings switch, which takes over with its first chunk
+    producerLock : threading.Lock
+        guarantees that the chunks of a single producer are written at a time
+    predBinding : PredictorBinding
+        binding of the active predictor, whose predictions are published
+    pendingPredBinding : PredictorBinding
+        binding of the predictor of a running settings switch, which takes over with its first prediction
+    switches : OrderedDict
+        the last ``SWITCH_HISTORY`` settings switches by id
+    switchLock : threading.Lock
+        lets settings switches run one after another
+    closed : bool
+        True once the session has been stopped
 
     Methods
     -------
+    createStorage(size, rowShape, dtype)
+        creates the storage of a ring buffer of the session.
     getPredList()
         returns a list of available predictors.
     getAudiofileList()
@@ -220,58 +303,130 @@ class AudioTaggerManager:
         set a new prediciton provider of type ``PredictorContract``.
     getVisualisation()
         returns the most recent visualisation.
+    getVersionedVisualisation()
+        returns the most recent visualisation and its version.
+    getVisualisationColumns(since)
+        returns the columns of the most recent visualisation appended after a sequence number.
     getPrediction()
         returns the most recent class predictions.
-    onNewVisualisationCalculated(image)
+    getVersionedPrediction()
+        returns the most recent class predictions and their sequence number.
+    getConsumerStats()
+        returns lag and drop counters of the feature stage and all consumers.
+    onNewVisualisationCalculated(image, head)
         called from visualisation consumers when new representation
         is computed.
     onNewPredictionCalculated(prob_dict)
         called from predictor consumers when new class predictions
         are computed.
+    onBoundPredictionCalculated(binding, prob_dict)
+        called from the binding of a predictor when it computed new class predictions.
+    activatePredictor()
+        makes the pending predictor the active predictor.
     startThreads()
-        start producers and consumers when audio tagger manager has
-        completed its initialization.
+        start producer and consumers of the session.
+    stopThreads()
+        stop producer and consumers of the session.
     refreshAudioTagger()
         method is called when frontend informs backend about changed
         settings regarding predictors and audio input.
+    getSwitch(switchId)
+        returns a settings switch of the session.
     putToSM()
         adds a new audio chunk to the shared memory.
+    activateProducer()
+        makes the pending producer the active producer.
     """
-    def __init__(self, visualProvider, predProvider, predList, audiofileList, condition):
+    def __init__(self, manager, sessionId, settings):
         """
         Parameters
         ----------
-        visualProvider : VisualisationContract
-            consumer which processes visual representation
-        predProvider : PredictorContract
-            consumer which processes class predictions
-        predList : list
-            list of available predictors
-        audiofileList : list
-            list of available audio files
+        manager : AudioTaggerManager
+            reference to the audio tagger manager owning the session
+        sessionId : int
+            id of the session within the audio tagger manager
+        settings : dictionary
+            a dictionary holding the a flag for microphone/audio file input
+            and IDs for the desired predictor and audio file, respectively.
         """
-        self.visProvider = visualProvider
-        self.predProvider = predProvider
+        self.manager = manager
+        self.sessionId = sessionId
+        self.settings = dict(settings)
 
         # initialization of visualization and prediction output
-        self.curVisual = np.zeros((128, 256), dtype=np.float32)
+        self.curVisual = np.zeros((SPEC_NUM_BINS, SLIDING_WINDOW_SIZE), dtype=np.float32)
+        self.visualVersion = 0
+        self.visualHead = None
+        self.visualLock = Lock()
+        self.visualNotifier = SequenceNotifier()
         self.curPred = [["Class{}".format(index), 0.2, index] for index in range(10)]
+        self.predictionVersion = 0
+        self.predictionLock = Lock()
+        self.predictionNotifier = SequenceNotifier()
+
+        # preallocated ring buffer, its sequence number serves as timestamp of the session
+        self.sharedMemory = AudioRingBuffer(BUFFER_SIZE, CHUNK_SIZE * N_CHANNELS,
+                                            storage=self.createStorage(BUFFER_SIZE, CHUNK_SIZE * N_CHANNELS, np.int16))
+
+        # every stage and consumer waits on its own subscription for new sequence numbers
+        self.chunkNotifier = SequenceNotifier()
+        self.featureNotifier = SequenceNotifier()
 
-        # consumers inform manager if an audio chunk is processed
+        # spectrogram of each chunk is computed once and shared among consumers
+        self.featureRing = FeatureRing(FEATURE_BUFFER_SIZE, SPEC_NUM_BINS,
+                                       storage=self.createStorage(FEATURE_BUFFER_SIZE, SPEC_NUM_BINS, np.float32))
+        self.featureStage = FeatureProcessStage(self) if EXECUTION_MODE == 'processes' else SpectrogramStage(self)
+
+        # consumers inform session if an audio chunk is processed
+        self.visProvider = MadmomSpectrogramProvider()
         self.visProvider.registerManager(self)
-        self.predProvider.registerManager(self)
+        self.predProvider = manager.createPredictor(self.settings['predictor'])
+        self.predBinding = PredictorBinding(self, self.predProvider)
+        self.predProvider.registerManager(self.predBinding)
+        self.pendingPredBinding = None
 
-        # selectable audio files and predictors
-        self.predList = predList
-        self.audiofileList = audiofileList
+        self.producerThread = None
+        self.pendingProducer = None
+        self.producerLock = Lock()
 
-        self.sharedMemory = deque(maxlen=BUFFER_SIZE)
+        # settings switches run in the background, one after another
+        self.switches = OrderedDict()
+        self.switchLock = Lock()
+        self.closed = False
+
+    @staticmethod
+    def createStorage(size, rowShape, dtype):
+        """creates the storage of a ring buffer of the session, which
+        is in shared memory if the session runs worker processes.
+
+        Parameters
+        ----------
+        size : int
+            maximum number of rows kept in the ring buffer
+        rowShape : int
+            length of a single row
+        dtype : numpy dtype
+            data type of the stored values
 
-        self.tGroundTruth = 0   # global timestamp to keep up synchronization of consumers
+        Returns
+        -------
+        SharedRingMemory
+            the shared storage, None for a storage in process memory
+        """
+        if EXECUTION_MODE != 'processes':
+            return None
+        return SharedRingMemory(size, rowShape, dtype)
 
-        self.condition = condition
+    @property
+    def tGroundTruth(self):
+        """timestamp to keep up synchronization of the consumers of the session
 
-        self.startThreads()
+        Returns
+        -------
+        int
+            sequence number of the next audio chunk written to shared memory
+        """
+        return self.sharedMemory.head
 
     def getPredList(self):
         """Gets the list of predictors
@@ -281,7 +436,7 @@ class AudioTaggerManager:
         list
             a list of available predictors
         """
-        return self.predList
+        return self.manager.getPredList()
 
     def getAudiofileList(self):
         """Gets the list of audio files
@@ -291,7 +446,7 @@ class AudioTaggerManager:
         list
             a list of available audio files
         """
-        return self.audiofileList
+        return self.manager.getAudiofileList()
 
     def setPredProvider(self, predProvider):
         """set the reference of the currently active predictor object
@@ -315,6 +470,43 @@ class AudioTaggerManager:
         """
         return self.curVisual.copy()
 
+    def getVersionedVisualisation(self):
+        """Gets the newest visual representation processed
+        by backend together with its version. Visual representations
+        are never modified once they are published, so no copy is made.
+
+        Returns
+        -------
+        tuple (int, 2d numpy array of float values)
+            the version and the current visual representation object
+        """
+        with self.visualLock:
+            return self.visualVersion, self.curVisual
+
+    def getVisualisationColumns(self, since=None):
+        """Gets the columns of the newest visual representation which
+        were appended after a certain column sequence number.
+
+        Parameters
+        ----------
+        since : int
+            column sequence number the caller already has, None
+            returns the whole visual representation
+
+        Returns
+        -------
+        tuple (int, 2d numpy array of float values)
+            the column sequence number of the visual representation (None if
+            unknown) and its newest columns, the whole visual representation if
+            ``since`` is None, older than the oldest column or newer than the
+            newest one (e.g. a cursor kept across a restart of the session)
+        """
+        with self.visualLock:
+            head, visual = self.visualHead, self.curVisual
+        if since is None or head is None or since > head or head - since >= visual.shape[1]:
+            return head, visual
+        return head, visual[:, visual.shape[1] - max(0, head - since):]
+
     def getPrediction(self):
         """Gets the newest class prediction processed
         by backend.
@@ -326,7 +518,42 @@ class AudioTaggerManager:
         """
         return self.curPred.copy()
 
-    def onNewVisualisationCalculated(self, image):
+    def getVersionedPrediction(self):
+        """Gets the newest class prediction processed by backend
+        together with its sequence number. Predictions are never
+        modified once they are published, so no copy is made.
+
+        Returns
+        -------
+        tuple (int, numpy array of list objects)
+            the sequence number and the current class prediction object
+        """
+        with self.predictionLock:
+            return self.predictionVersion, self.curPred
+
+    def getConsumerStats(self):
+        """Gets lag and drop counters of the feature stage and
+        all consumers which read with a cursor as well as the
+        prediction rate of a paced predictor.
+
+        Returns
+        -------
+        dict
+            a dictionary mapping the name of the stage or consumer
+            to its lag statistics (see ``ReadCursor.getStats()``) and
+            ``predictionPacer`` to the statistics of the predictor's pacer
+            (see ``PredictionPacer.getStats()``)
+        """
+        stats = {}
+        for name, provider in [('featureStage', self.featureStage), ('visualisation', self.visProvider),
+                               ('prediction', self.predProvider)]:
+            if getattr(provider, 'cursor', None) is not None:
+                stats[name] = provider.cursor.getStats()
+        if getattr(self.predProvider, 'pacer', None) is not None:
+            stats['predictionPacer'] = self.predProvider.pacer.getStats()
+        return stats
+
+    def onNewVisualisationCalculated(self, image, head=None):
         """Is called every time a visualisation consumer
         has processed a new visual representation item.
 
@@ -334,8 +561,16 @@ class AudioTaggerManager:
         ----------
         image : 2d numpy array of float values
             holds the current visual representation object
+        head : int
+            number of columns the consumer appended up to this
+            representation, None if it does not count its columns
         """
-        self.curVisual = image
+        with self.visualLock:
+            self.curVisual = image
+            self.visualHead = head
+            self.visualVersion += 1
+            version = self.visualVersion
+        self.visualNotifier.publish(version)
 
     def onNewPredictionCalculated(self, prob_dict):
         """Is called every time a predictor consumer
@@ -346,32 +581,78 @@ class AudioTaggerManager:
         prob_dict : numpy array of list objects
             holds the current class prediction object
         """
-        self.curPred = prob_dict
+        with self.predictionLock:
+            self.curPred = prob_dict
+            self.predictionVersion += 1
+            version = self.predictionVersion
+        self.predictionNotifier.publish(version)
+
+    def onBoundPredictionCalculated(self, binding, prob_dict):
+        """Is called every time a predictor bound to the session
+        has processed a new class prediction item. Only predictions of
+        the active predictor are published, the first prediction of a
+        pending predictor makes it the active one.
 
-    def startThreads(self):
-        """start producers and consumers when audio tagger manager has
-        completed its initialization.
+        Parameters
+        ----------
+        binding : PredictorBinding
+            the binding of the predictor
+        prob_dict : numpy array of list objects
+            holds the current class prediction object
         """
+        with self.predictionLock:
+            if binding is self.pendingPredBinding:
+                self.activatePredictor()
+            elif binding is not self.predBinding:
+                return  # prediction of a replaced predictor
+            self.curPred = prob_dict
+            self.predictionVersion += 1
+            version = self.predictionVersion
+        self.predictionNotifier.publish(version)
+
+    def activatePredictor(self):
+        """makes the pending predictor the active predictor. The
+        caller has to hold ``predictionLock``.
+        """
+        binding, self.pendingPredBinding = self.pendingPredBinding, None
+        self.predBinding = binding
+        self.setPredProvider(binding.predictor)
+        binding.activated.set()
 
-        # decide if audio input comes from microphone or file
-        if START_FILE == None:
-            self.producerThread = MicrophoneThread(self)
-        else:
-            filePath = [elem['path'] for elem in self.getAudiofileList() if elem['id'] == START_FILE][0]
-            self.producerThread = AudiofileThread(self, filePath)
-
+    def startThreads(self):
+        """start producer and consumers of the session.
+        """
+        self.producerThread = self.manager.createProducer(self, self.settings)
         self.producerThread.start()
 
-        # start consumers
+        # start feature extraction and consumers
+        self.featureStage.start()
         self.visProvider.start()
         self.predProvider.start()
 
+    def stopThreads(self):
+        """stop producer and consumers of the session.
+        """
+        self.closed = True
+        with self.switchLock:   # waits for a running settings switch
+            self.producerThread.join()
+
+            self.featureStage.stop()
+            self.visProvider.stop()
+            self.predProvider.stop()
+
+        # worker processes are stopped, release the shared memory
+        for ring in [self.sharedMemory, self.featureRing]:
+            if ring.storage is not None:
+                ring.storage.release()
+
     ############ Refresh function #############
     # This function is called when the frontend
     # changes audio mode, file or predictor
     def refreshAudioTagger(self, settings):
         """method is called when frontend informs backend about changed
-        settings regarding predictors and audio input.
+        settings regarding predictors and audio input. The session is
+        switched in the background without interrupting its output.
 
         Parameters
         ----------
@@ -379,55 +660,399 @@ class AudioTaggerManager:
             a dictionary holding the a flag for microphone/audio file input
             and IDs for the desired predictor and audio file, respectively.
 
+        Returns
+        -------
+        SettingsSwitch
+            the started switch, which reports its progress
+
+        Raises
+        ------
+        ValueError
+            if the settings are invalid, the session keeps running unchanged
+
         """
+        self.manager.checkSettings(settings)
+        with self.producerLock:
+            switchId = next(reversed(self.switches), -1) + 1
+            switch = SettingsSwitch(self, switchId, settings)
+            self.switches[switchId] = switch
+            while len(self.switches) > SWITCH_HISTORY:
+                self.switches.popitem(last=False)
+        switch.start()
+        return switch
+
+    def getSwitch(self, switchId):
+        """returns a settings switch of the session.
 
-        # stop producer and consumers
-        self.producerThread.join()
+        Parameters
+        ----------
+        switchId : int
+            id of the switch
 
-        self.visProvider.stop()
-        self.predProvider.stop()
+        Returns
+        -------
+        SettingsSwitch
+            the switch
 
-        # reset ring buffer
-        self.tGroundTruth = 0
-        self.sharedMemory.clear()
+        Raises
+        ------
+        KeyError
+            if the switch is unknown or too old
+        """
+        return self.switches[switchId]
 
-        # restart audio tagger with delivered settings
-        isLive = settings['isLive']
-        file = settings['file']
-        predictor = settings['predictor']
+    def putToSM(self, chunk, producer=None):
+        """adds a new audio chunk to the shared memory. The chunk is
+        converted to samples once and the timing variable
+        ``tGroundTruth`` is incremented by 1. The first chunk of a
+        pending producer makes it the active one, chunks of a replaced
+        producer are dropped.
 
-        # decide if audio input comes from microphone or file
-        if isLive:
-            self.producerThread = MicrophoneThread(self)
-        else:
-            filePath = [elem['path'] for elem in self.getAudiofileList() if elem['id'] == file][0]
-            self.producerThread = AudiofileThread(self, filePath)
+        Parameters
+        ----------
+        chunk : bytes
+            an array of audio sample values encoded as byte string
+        producer : Thread
+            the producer of the chunk, None for chunks of the active producer
 
-        # load selected prediction class via reflection, update references for the new predictor object
-        predictorClassPath = [elem['predictorClassPath'] for elem in self.getPredList() if elem['id'] == predictor][0]
-        predProviderClass = locate('server.consumer.predictors.{}'.format(predictorClassPath))
-        newPredProvider = predProviderClass()
-        self.setPredProvider(newPredProvider)
-        self.predProvider.registerManager(self)
+        Returns
+        -------
+        bool
+            True if the chunk has been added
 
-        # restart producer and consumers
-        self.producerThread.start()
+        """
+        with self.producerLock:
+            if producer is not None and producer is not self.producerThread:
+                if producer is not self.pendingProducer:
+                    return False
+                self.activateProducer()
+            self.sharedMemory.putBytes(chunk)
+        return True
+
+    def activateProducer(self):
+        """makes the pending producer the active producer. The
+        caller has to hold ``producerLock``.
+        """
+        self.producerThread, self.pendingProducer = self.pendingProducer, None
+        self.producerThread.activated.set()
 
-        self.visProvider.start()
-        self.predProvider.start()
 
-    def putToSM(self, chunk):
-        """adds a new audio chunk to the shared memory.
+class AudioTaggerManager:
+    """
+    This is the central management class of the audio tagger backend system.
+    It holds all running audio sessions of the process. The session with id
+    ``DEFAULT_SESSION`` is created by ``start()`` in the background with the
+    settings of config.py.
+
+    Attributes
+    ----------
+    predList : list
+        list of available predictors
+    audiofileList : list
+        list of available audio files
+    sessions : dict
+        running audio sessions by session id
+    startingSessions : dict
+        settings of sessions which are started in the background by session id,
+        a session whose start failed keeps its entry with the error until it is closed
+    nextSessionId : int
+        id assigned to the next created session
+    lock : threading.Lock
+        guards creation and removal of sessions
+    predictorPool : PredictorPool
+        keeps warmed up predictors for instant switching
+    startup : StartupThread
+        loads the model and starts the default session in the background
+
+    Methods
+    -------
+    start()
+        starts the backend in the background.
+    getPredList()
+        returns a list of available predictors.
+    getAudiofileList()
+        returns a list of available audio files.
+    checkSettings(settings)
+        checks the settings of a session.
+    createSession(settings, sessionId)
+        creates and starts a new audio session.
+    startSession(settings)
+        creates and starts a new audio session in the background.
+    getSession(sessionId)
+        returns a running audio session.
+    getSessions()
+        returns id, state and settings of all sessions.
+    closeSession(sessionId)
+        stops and removes an audio session.
+    createProducer(session, settings)
+        creates the producer thread of a session.
+    createPredictor(predictorId)
+        returns a warm predictor from the predictor pool.
+    constructPredictor(predictorId)
+        creates a predictor via reflection.
+    """
+    def __init__(self, predList, audiofileList):
+        """
+        Parameters
+        ----------
+        predList : list
+            list of available predictors
+        audiofileList : list
+            list of available audio files
+        """
+        # selectable audio files and predictors
+        self.predList = predList
+        self.audiofileList = audiofileList
+
+        # the id of the default session is reserved for the startup
+        self.sessions = {}
+        self.startingSessions = {}
+        self.nextSessionId = DEFAULT_SESSION + 1
+        self.lock = Lock()
+
+        # warmed up predictors for instant switching
+        self.predictorPool = PredictorPool(predList, self.constructPredictor)
+
+        self.startup = StartupThread(self)
+
+    def start(self):
+        """starts the backend in the background: warms up the starting
+        predictor and starts the default session. Further calls have no effect.
+        """
+        with self.lock:
+            if self.startup.ident is None:
+                self.startup.start()
+
+    def getPredList(self):
+        """Gets the list of predictors
+
+        Returns
+        -------
+        list
+            a list of available predictors
+        """
+        return self.predList
+
+    def getAudiofileList(self):
+        """Gets the list of audio files
+
+        Returns
+        -------
+        list
+            a list of available audio files
+        """
+        return self.audiofileList
+
+    def checkSettings(self, settings):
+        """checks the settings of a session before anything is started.
 
         Parameters
         ----------
-        chunk : bytes
-            an array of audio sample values encoded as byte string
+        settings : dictionary
+            a dictionary holding the a flag for microphone/audio file input
+            and IDs for the desired predictor and audio file, respectively.
+
+        Raises
+        ------
+        ValueError
+            if a setting is missing or refers to an unknown predictor or audio file
+        """
+        if not isinstance(settings, dict):
+            raise ValueError('settings must be an object')
+        for key in ['isLive', 'predictor'] + ([] if settings.get('isLive') else ['file']):
+            if key not in settings:
+                raise ValueError('missing setting {}'.format(key))
+        if settings['predictor'] not in [elem['id'] for elem in self.getPredList()]:
+            raise ValueError('unknown predictor {}'.format(settings['predictor']))
+        if not settings['isLive'] and settings['file'] not in [elem['id'] for elem in self.getAudiofileList()]:
+            raise ValueError('unknown audio file {}'.format(settings['file']))
+
+    def createSession(self, settings, sessionId=None):
+        """creates and starts a new audio session.
+
+        Parameters
+        ----------
+        settings : dictionary
+            a dictionary holding the a flag for microphone/audio file input
+            and IDs for the desired predictor and audio file, respectively.
+        sessionId : int
+            id reserved for the session, a new id is assigned if None
 
+        Returns
+        -------
+        AudioSession
+            the running session
+
+        Raises
+        ------
+        ValueError
+            if the settings are invalid
         """
+        self.checkSettings(settings)
+        if sessionId is None:
+            with self.lock:
+                sessionId = self.nextSessionId
+                self.nextSessionId += 1
+        session = AudioSession(self, sessionId, settings)
+        session.startThreads()
+        with self.lock:
+            self.sessions[sessionId] = session
+            self.startingSessions.pop(sessionId, None)
+        return session
+
+    def startSession(self, settings):
+        """creates and starts a new audio session in the background, so
+        loading the predictor does not block the caller. The session is
+        listed as starting by getSessions() until it runs.
 
-        # first iteration of ring buffer to avoid IndexOutOfRangeError
-        if len(self.sharedMemory) < BUFFER_SIZE:
-            self.sharedMemory.append(chunk)
-        else:
-            self.sharedMemory[self.tGroundTruth] = chunk
+        Parameters
+        ----------
+        settings : dictionary
+            a dictionary holding the a flag for microphone/audio file input
+            and IDs for the desired predictor and audio file, respectively.
+
+        Returns
+        -------
+        int
+            id of the new session
+
+        Raises
+        ------
+        ValueError
+            if the settings are invalid
+        """
+        self.checkSettings(settings)
+        with self.lock:
+            sessionId = self.nextSessionId
+            self.nextSessionId += 1
+            self.startingSessions[sessionId] = dict(settings)
+        Thread(target=self._runSessionStart, args=(sessionId, settings),
+               name='SessionStartThread', daemon=True).start()
+        return sessionId
+
+    def _runSessionStart(self, sessionId, settings):
+        try:
+            self.createSession(settings, sessionId)
+        except Exception as e:
+            with self.lock:
+                if sessionId in self.startingSessions:
+                    self.startingSessions[sessionId]['error'] = str(e)
+            raise
+
+    def getSession(self, sessionId=DEFAULT_SESSION):
+        """returns a running audio session.
+
+        Parameters
+        ----------
+        sessionId : int
+            id of the session
+
+        Returns
+        -------
+        AudioSession
+            the session with the given id
+
+        Raises
+        ------
+        KeyError
+            if there is no running session with the given id
+        """
+        return self.sessions[sessionId]
+
+    def getSessions(self):
+        """returns id, state and settings of all sessions. The state is
+        ``running``, ``starting`` or ``failed``, a failed session also
+        holds its ``error``.
+
+        Returns
+        -------
+        list
+            a list of dictionaries in the following format:
+            ``[{"id": 0, "state": "running", "isLive": 0, "file": 1, "predictor": 0}, ...]``
+        """
+        with self.lock:
+            sessions = [dict(session.settings, id=sessionId, state='running')
+                        for sessionId, session in self.sessions.items()]
+            sessions += [dict(settings, id=sessionId, state='failed' if 'error' in settings else 'starting')
+                         for sessionId, settings in self.startingSessions.items()]
+        return sorted(sessions, key=lambda session: session['id'])
+
+    def closeSession(self, sessionId):
+        """stops and removes an audio session.
+
+        Parameters
+        ----------
+        sessionId : int
+            id of the session
+
+        Raises
+        ------
+        KeyError
+            if there is no running or failed session with the given id
+        """
+        with self.lock:
+            settings = self.startingSessions.get(sessionId)
+            if settings is not None and 'error' in settings:
+                del self.startingSessions[sessionId]
+                return
+            session = self.sessions.pop(sessionId)
+        session.stopThreads()
+
+    def createProducer(self, session, settings):
+        """creates the producer thread of a session, either reading from
+        the microphone or from one of the available audio files.
+
+        Parameters
+        ----------
+        session : AudioSession
+            the session receiving the audio chunks
+        settings : dictionary
+            a dictionary holding the a flag for microphone/audio file input
+            and the ID of the desired audio file
+
+        Returns
+        -------
+        Thread
+            the producer thread, not started yet
+        """
+        if settings['isLive']:
+            return MicrophoneThread(session)
+        filePath = [elem['path'] for elem in self.getAudiofileList() if elem['id'] == settings['file']][0]
+        return AudiofileThread(session, filePath)
+
+    def createPredictor(self, predictorId):
+        """returns a warm predictor from the predictor pool. It is
+        constructed and warmed up first if the pool holds none.
+
+        Parameters
+        ----------
+        predictorId : int
+            id of the predictor in ``predictors.csv``
+
+        Returns
+        -------
+        PredictorContract
+            the predictor object
+        """
+        return self.predictorPool.acquire(predictorId)
+
+    def constructPredictor(self, predictorId):
+        """creates a predictor via reflection. Predictors load their
+        weights once per process, so further instances are cheap.
+
+        Parameters
+        ----------
+        predictorId : int
+            id of the predictor in ``predictors.csv``
+
+        Returns
+        -------
+        PredictorContract
+            the predictor object, not warmed up yet
+        """
+        predictorClassPath = [elem['predictorClassPath'] for elem in self.getPredList() if elem['id'] == predictorId][0]
+        predProviderClass = locate('server.consumer.predictors.{}'.format(predictorClassPath))
+        if EXECUTION_MODE == 'processes' and hasattr(predProviderClass, 'predictBatch'):
+            # inference runs in a worker process, predictors without batch interface stay threads
+            return ProcessPredictor(predictorClassPath, predProviderClass.classes)
+        return predProviderClass()
@@ -0,0 +1,190 @@
+"""This module implements batch tagging of whole directories or lists of
+WAV files on all cores.
+
+The files are sharded across a pool of worker processes. Each worker loads
+the predictor (and therefore the network weights) once in its initializer and
+reuses it for all files it receives, using the ``OfflineTagger``. The number
+of torch threads per worker is limited to its share of the cores so that the
+workers do not oversubscribe the CPU.
+
+Results are streamed to a JSON lines file as soon as a file is done. The
+first line holds the class names, every following line the timeline of one
+file. If the output file already exists, files with a result are skipped,
+so an interrupted run can simply be restarted.
+
+```bash
+python server/batch_tagger.py /path/to/archive --output archive.jsonl --workers 4
+```
+
+"""
+import os
+import json
+import argparse
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from server.config.config import START_PREDICTOR, OFFLINE_PREDICTION_HOP, BATCH_WORKERS
+from server.offline_tagger import OfflineTagger, loadOfflinePredictor
+
+# tagger of a worker process, created once by _initWorker
+_workerTagger = None
+
+
+def _initWorker(predictorId, numThreads):
+    global _workerTagger
+    import torch
+    torch.set_num_threads(numThreads)
+    torch.set_num_interop_threads(1)
+    _workerTagger = OfflineTagger(loadOfflinePredictor(predictorId))
+
+
+def _tagWorker(filePath, hop):
+    classes = list(_workerTagger.predictor.classes)
+    try:
+        timeline = _workerTagger.tagFile(filePath, hop)
+    except Exception as e:
+        return {'file': filePath, 'error': repr(e)}, classes
+    return {'file': filePath,
+            'times': [time for time, _ in timeline],
+            'probabilities': [probs.tolist() for _, probs in timeline]}, classes
+
+
+def collectFiles(paths):
+    """Collects the WAV files of the given directories and files.
+
+    Parameters
+    ----------
+    paths : list of str
+        directories (searched recursively) and single files
+
+    Returns
+    -------
+    list of str
+        sorted paths of all WAV files
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names if name.lower().endswith('.wav'))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+class BatchTagger:
+    """
+    Tags many WAV files in parallel worker processes.
+
+    Attributes
+    ----------
+    outputPath : str
+        JSON lines file receiving the results
+    workers : int
+        number of worker processes
+    predictorId : int
+        id of the predictor in ``predictors.csv``
+    hop : float
+        seconds between two predictions of a timeline
+
+    Methods
+    -------
+    finishedFiles()
+        returns the files which already have a result in the output file.
+    run(files)
+        tags all files which are not finished yet.
+    """
+    def __init__(self, outputPath, workers=BATCH_WORKERS, predictorId=START_PREDICTOR, hop=OFFLINE_PREDICTION_HOP):
+        """
+        Parameters
+        ----------
+        outputPath : str
+            JSON lines file receiving the results
+        workers : int
+            number of worker processes, None uses all cores
+        predictorId : int
+            id of the predictor in ``predictors.csv``
+        hop : float
+            seconds between two predictions of a timeline
+        """
+        self.outputPath = outputPath
+        self.workers = workers or os.cpu_count()
+        self.predictorId = int(predictorId)
+        self.hop = hop
+
+    def finishedFiles(self):
+        """returns the files which already have a result in the output file.
+        Files whose processing failed are tagged again.
+
+        Returns
+        -------
+        set of str
+            paths of the finished files
+        """
+        if not os.path.exists(self.outputPath):
+            return set()
+        finished = set()
+        with open(self.outputPath) as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue    # line truncated by an interrupted run
+                if 'file' in record and 'error' not in record:
+                    finished.add(record['file'])
+        return finished
+
+    def run(self, files):
+        """tags all files which are not finished yet and appends
+        the results to the output file as soon as they are available.
+
+        Parameters
+        ----------
+        files : list of str
+            paths of the WAV files
+
+        Returns
+        -------
+        int
+            number of files tagged successfully in this run
+        """
+        finished = self.finishedFiles()
+        files = [file for file in files if file not in finished]
+        if not files:
+            return 0
+
+        numThreads = max(1, os.cpu_count() // self.workers)
+        newOutput = not os.path.exists(self.outputPath) or os.path.getsize(self.outputPath) == 0
+        if not newOutput:
+            with open(self.outputPath, 'rb') as file:
+                file.seek(-1, os.SEEK_END)
+                truncated = file.read() != b'\n'     # last line of an interrupted run
+        succeeded = 0
+        with open(self.outputPath, 'a') as output, \
+                ProcessPoolExecutor(max_workers=self.workers, initializer=_initWorker,
+                                    initargs=(self.predictorId, numThreads)) as pool:
+            if not newOutput and truncated:
+                output.write('\n')
+            futures = [pool.submit(_tagWorker, file, self.hop) for file in files]
+            for future in as_completed(futures):
+                record, classes = future.result()
+                if newOutput:
+                    output.write(json.dumps({'classes': classes}) + '\n')
+                    newOutput = False
+                output.write(json.dumps(record) + '\n')
+                output.flush()
+                succeeded += 'error' not in record
+        return succeeded
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tag directories or lists of WAV files on all cores.')
+    parser.add_argument('paths', nargs='+', help='directories and WAV files')
+    parser.add_argument('--output', required=True, help='JSON lines output file, existing results are skipped')
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS, help='number of worker processes')
+    parser.add_argument('--predictor', type=int, default=int(START_PREDICTOR), help='id of the predictor')
+    parser.add_argument('--hop', type=float, default=OFFLINE_PREDICTION_HOP, help='seconds between predictions')
+    args = parser.parse_args()
+
+    tagger = BatchTagger(args.output, args.workers, args.predictor, args.hop)
+    print('tagged {} files'.format(tagger.run(collectFiles(args.paths))))
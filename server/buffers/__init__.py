@@ -0,0 +1,4 @@
+"""This package contains the preallocated buffers shared between
+producers and consumers of the backend system.
+
+"""
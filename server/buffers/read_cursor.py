@@ -0,0 +1,161 @@
+"""This module implements read cursors for consumers of a
+``SequenceRingBuffer``.
+
+Every consumer keeps its own cursor which points to the next row it has not
+processed yet. When a consumer wakes up, it reads all rows between its cursor
+and the head of the ring buffer in one batch, so no row is silently skipped
+if the consumer falls behind. If the lag exceeds a bound, one of the
+following policies is applied:
+
+-   ``catchup``: process all rows which are still available
+-   ``drop``: drop the oldest rows and process the newest ``maxLag`` rows
+-   ``resync``: drop everything except the most recent row
+
+Rows which have already been overwritten in the ring buffer are counted as
+dropped in any case.
+A consumer which starts while the ring buffer is already filled, e.g. a
+predictor replacing another one, can fill its sliding window with the newest
+rows first (``readBacklog()``) and continue after them with its cursor.
+
+"""
+import numpy as np
+
+LAG_POLICY_CATCHUP = 'catchup'
+LAG_POLICY_DROP = 'drop'
+LAG_POLICY_RESYNC = 'resync'
+LAG_POLICIES = (LAG_POLICY_CATCHUP, LAG_POLICY_DROP, LAG_POLICY_RESYNC)
+
+
+class ReadCursor:
+    """
+    Read position of a single consumer in a ring buffer.
+
+    Attributes
+    ----------
+    ring : SequenceRingBuffer
+        the ring buffer the consumer reads from
+    maxLag : int
+        number of pending rows above which the lag policy is applied
+    policy : str
+        one of ``catchup``, ``drop`` or ``resync``
+    position : int
+        sequence number of the next row to be processed
+    lag : int
+        number of pending rows at the last read
+    maxLagSeen : int
+        largest lag observed so far
+    processed : int
+        number of rows handed to the consumer
+    dropped : int
+        number of rows the consumer never received
+
+    Methods
+    -------
+    readPending()
+        returns all rows the consumer has to process now.
+    getStats()
+        returns lag and drop counters.
+    """
+    def __init__(self, ring, maxLag, policy=LAG_POLICY_CATCHUP, position=None):
+        """
+        Parameters
+        ----------
+        ring : SequenceRingBuffer
+            the ring buffer the consumer reads from
+        maxLag : int
+            number of pending rows above which the lag policy is applied
+        policy : str
+            one of ``catchup``, ``drop`` or ``resync``
+        position : int
+            sequence number of the first row to be processed,
+            defaults to the current head of the ring buffer
+        """
+        if policy not in LAG_POLICIES:
+            raise ValueError('unknown lag policy {}, expected one of {}'.format(policy, LAG_POLICIES))
+        self.ring = ring
+        self.maxLag = maxLag
+        self.policy = policy
+        self.position = ring.head if position is None else position
+        self.lag = 0
+        self.maxLagSeen = 0
+        self.processed = 0
+        self.dropped = 0
+
+    def readPending(self):
+        """returns all rows the consumer has to process now with
+        respect to the lag policy and advances the cursor.
+
+        Returns
+        -------
+        numpy array
+            copy of the pending rows stacked along the first axis,
+            may be empty
+        """
+        while True:
+            head, tail = self.ring.head, self.ring.tail
+            start = self._applyPolicy(head, tail)
+            out = np.empty((head - start,) + self.ring.buffer.shape[1:], dtype=self.ring.buffer.dtype)
+            try:
+                rows = self.ring.read(start, head, out=out)
+                break
+            except IndexError:
+                continue    # producer overwrote rows in the meantime, retry with the new tail
+
+        self.lag = head - self.position
+        self.maxLagSeen = max(self.maxLagSeen, self.lag)
+        self.dropped += start - self.position
+        self.processed += head - start
+        self.position = head
+        return rows
+
+    def _applyPolicy(self, head, tail):
+        # overwritten or cleared rows are lost in any case
+        start = max(self.position, tail)
+        if head - self.position > self.maxLag:
+            if self.policy == LAG_POLICY_DROP:
+                start = max(start, head - self.maxLag)
+            elif self.policy == LAG_POLICY_RESYNC:
+                start = max(start, head - 1)
+        return min(start, head)
+
+    def getStats(self):
+        """returns lag and drop counters of the consumer.
+
+        Returns
+        -------
+        dict
+            a dictionary with the current and maximum lag, the number of
+            processed and dropped rows and the lag policy
+        """
+        return {'lag': self.lag, 'maxLag': self.maxLagSeen, 'processed': self.processed,
+                'dropped': self.dropped, 'policy': self.policy}
+
+
+def readBacklog(ring, count, head=None):
+    """returns the newest rows which are still held by a ring buffer.
+
+    Parameters
+    ----------
+    ring : SequenceRingBuffer
+        the ring buffer
+    count : int
+        maximum number of rows
+    head : int
+        sequence number after the last row, defaults to the current head of the ring buffer
+
+    Returns
+    -------
+    tuple (int, numpy array)
+        the sequence number after the last row, to be used as position of a
+        cursor, and a copy of up to ``count`` rows stacked along the first axis
+    """
+    stop = ring.head if head is None else head
+    while True:
+        start = min(stop, max(ring.tail, stop - count))
+        out = np.empty((stop - start,) + ring.buffer.shape[1:], dtype=ring.buffer.dtype)
+        if start == stop:
+            return stop, out
+        try:
+            return stop, ring.read(start, stop, out=out)
+        except IndexError:
+            continue    # producer overwrote rows in the meantime, retry with the new tail
@@ -0,0 +1,319 @@
+"""This module implements preallocated ring buffers which are indexed by
+monotonically increasing sequence numbers.
+
+In contrast to an index wrapped modulo the buffer size, a sequence number
+never repeats. Consumers can therefore tell exactly how many rows have been
+written since they last looked and whether the rows they are interested in
+have already been overwritten. All storage is allocated once, so writing a
+new row never allocates memory. The storage and the sequence numbers can
+also be placed in shared memory (see ``SharedRingMemory``), so that worker
+processes read and write the same ring buffer.
+
+"""
+import numpy as np
+
+from threading import Lock
+
+
+class SequenceRingBuffer:
+    """
+    Preallocated ring buffer of equally shaped rows indexed by sequence numbers.
+
+    Attributes
+    ----------
+    buffer : numpy array
+        preallocated storage with one row per sequence number
+    counters : 1d numpy array of int64 values
+        holds ``head`` and ``tail``
+    storage : SharedRingMemory
+        shared memory holding buffer and counters, None if they are private to the process
+    size : int
+        maximum number of rows kept in the ring buffer
+    head : int
+        sequence number of the next row to be written. The most
+        recent row therefore has the sequence number ``head - 1``.
+    tail : int
+        sequence number of the oldest row which is still available
+    lock : threading.Lock
+        guards concurrent writes and reads of the threads of a process. Across
+        processes, there is a single writer and readers check after a copy that
+        the rows have not been overwritten in the meantime.
+
+    Methods
+    -------
+    put(row)
+        appends a single row.
+    putMany(rows)
+        appends several rows at once.
+    isAvailable(start, stop)
+        checks whether a range of rows can still be read.
+    view(seq)
+        returns a zero-copy view of a single row.
+    read(start, stop, out)
+        returns the rows of a sequence range.
+    latest()
+        returns the sequence number and a copy of the most recent row.
+    clear()
+        discards all rows without resetting the sequence numbers.
+    """
+    def __init__(self, size, rowShape, dtype, storage=None):
+        """
+        Parameters
+        ----------
+        size : int
+            maximum number of rows kept in the ring buffer
+        rowShape : int or tuple of int
+            shape of a single row
+        dtype : numpy dtype
+            data type of the stored values
+        storage : SharedRingMemory
+            shared memory of the same size, shape and dtype holding
+            buffer and counters, None allocates private memory
+        """
+        rowShape = rowShape if isinstance(rowShape, tuple) else (rowShape,)
+        if storage is None:
+            self.buffer = np.zeros((size,) + rowShape, dtype=dtype)
+            self.counters = np.zeros(2, dtype=np.int64)
+        else:
+            self.buffer, self.counters = storage.buffer, storage.counters
+        self.storage = storage
+        self.size = size
+        self.lock = Lock()
+
+    @property
+    def head(self):
+        """sequence number of the next row to be written"""
+        return int(self.counters[0])
+
+    @head.setter
+    def head(self, value):
+        self.counters[0] = value
+
+    @property
+    def tail(self):
+        """sequence number of the oldest row which is still available"""
+        return int(self.counters[1])
+
+    @tail.setter
+    def tail(self, value):
+        self.counters[1] = value
+
+    def __len__(self):
+        """Number of rows which can currently be read."""
+        return self.head - self.tail
+
+    def put(self, row):
+        """appends a single row and advances the sequence number.
+
+        Parameters
+        ----------
+        row : numpy array
+            row with the shape given at construction
+
+        Returns
+        -------
+        int
+            sequence number assigned to the row
+        """
+        with self.lock:
+            seq = self.head
+            self._reserve(1)
+            self.buffer[seq % self.size] = row
+            self._advance(1)
+        return seq
+
+    def putMany(self, rows):
+        """appends several rows with at most two block copies.
+
+        Parameters
+        ----------
+        rows : numpy array
+            rows stacked along the first axis
+
+        Returns
+        -------
+        int
+            sequence number assigned to the first row which is kept,
+            if there are more rows than the ring buffer holds
+        """
+        skipped = max(0, len(rows) - self.size)
+        rows = rows[skipped:]
+        with self.lock:
+            # rows which would be overwritten right away still get their sequence numbers
+            self._advance(skipped)
+            seq = self.head
+            self._reserve(len(rows))
+            pos = seq % self.size
+            n = min(len(rows), self.size - pos)
+            self.buffer[pos:pos + n] = rows[:n]
+            self.buffer[:len(rows) - n] = rows[n:]
+            self._advance(len(rows))
+        return seq
+
+    def _reserve(self, n):
+        # the tail is moved before rows are overwritten, so a reader in another process detects the overwrite
+        self.tail = max(self.tail, self.head + n - self.size)
+
+    def _advance(self, n):
+        self.head += n
+
+    def isAvailable(self, start, stop=None):
+        """checks whether the rows ``start`` to ``stop - 1`` can still be read.
+
+        Parameters
+        ----------
+        start : int
+            sequence number of the first row
+        stop : int
+            sequence number after the last row, defaults to ``start + 1``
+
+        Returns
+        -------
+        bool
+            True if all rows are written and not yet overwritten
+        """
+        stop = start + 1 if stop is None else stop
+        return self.tail <= start <= stop <= self.head
+
+    def view(self, seq):
+        """returns a zero-copy view of a single row.
+
+        Note
+        ----
+        The view stays valid until the row gets overwritten by
+        the producer, i.e. ``size`` rows later.
+
+        Parameters
+        ----------
+        seq : int
+            sequence number of the requested row
+
+        Returns
+        -------
+        numpy array
+            view into the storage of the ring buffer
+
+        Raises
+        ------
+        IndexError
+            if the row has not been written yet or was already overwritten
+        """
+        if not self.isAvailable(seq):
+            raise IndexError('row {} is not available in ring buffer'.format(seq))
+        return self.buffer[seq % self.size]
+
+    def read(self, start, stop, out=None):
+        """returns the rows ``start`` to ``stop - 1``.
+
+        If the range does not wrap around the end of the storage and no
+        ``out`` array is given, a zero-copy view is returned. Otherwise the
+        rows are copied into ``out`` (or a new array).
+
+        Parameters
+        ----------
+        start : int
+            sequence number of the first row
+        stop : int
+            sequence number after the last row
+        out : numpy array
+            optional preallocated array receiving the rows
+
+        Returns
+        -------
+        numpy array
+            the rows stacked along the first axis
+
+        Raises
+        ------
+        IndexError
+            if one of the rows has not been written yet or was already overwritten
+        """
+        with self.lock:
+            if not self.isAvailable(start, stop):
+                raise IndexError('rows {} to {} are not available in ring buffer'.format(start, stop))
+            pos = start % self.size
+            n = stop - start
+            if pos + n <= self.size and out is None:
+                return self.buffer[pos:pos + n]
+            if out is None:
+                out = np.empty((n,) + self.buffer.shape[1:], dtype=self.buffer.dtype)
+            first = min(n, self.size - pos)
+            out[:first] = self.buffer[pos:pos + first]
+            out[first:n] = self.buffer[:n - first]
+            if self.storage is not None and self.tail > start:
+                # a writer in another process overwrote rows during the copy
+                raise IndexError('rows {} to {} have been overwritten while reading'.format(start, stop))
+            return out
+
+    def latest(self):
+        """returns the sequence number and a copy of the most recent row.
+
+        Returns
+        -------
+        tuple of (int, numpy array)
+            sequence number and row, or ``(None, None)`` if the
+            ring buffer is empty
+        """
+        with self.lock:
+            if self.head == self.tail:
+                return None, None
+            seq = self.head - 1
+            return seq, self.buffer[seq % self.size].copy()
+
+    def clear(self):
+        """discards all rows. The sequence numbers keep increasing
+        monotonically so that cursors of consumers stay valid.
+        """
+        with self.lock:
+            self.tail = self.head
+
+
+class AudioRingBuffer(SequenceRingBuffer):
+    """
+    Ring buffer of 16 bit audio chunks. Chunks are converted from
+    bytes to samples exactly once when they are written.
+
+    Methods
+    -------
+    putBytes(chunk)
+        converts an audio chunk encoded as byte string and appends it.
+    """
+    def __init__(self, size, chunkSize, dtype=np.int16, storage=None):
+        """
+        Parameters
+        ----------
+        size : int
+            maximum number of audio chunks kept in the ring buffer
+        chunkSize : int
+            number of samples per audio chunk
+        dtype : numpy dtype
+            sample format of the audio chunks
+        storage : SharedRingMemory
+            shared memory holding the ring buffer, None allocates private memory
+        """
+        SequenceRingBuffer.__init__(self, size, chunkSize, dtype, storage)
+        self.chunkSize = chunkSize
+
+    def putBytes(self, chunk):
+        """converts an audio chunk encoded as byte string and appends it.
+        Incomplete chunks (e.g. at the end of an audio file) are padded with zeros.
+
+        Parameters
+        ----------
+        chunk : bytes
+            an array of audio sample values encoded as byte string
+
+        Returns
+        -------
+        int
+            sequence number assigned to the chunk
+        """
+        samples = np.frombuffer(chunk, dtype=self.buffer.dtype)
+        with self.lock:
+            seq = self.head
+            self._reserve(1)
+            row = self.buffer[seq % self.size]
+            row[:len(samples)] = samples
+            row[len(samples):] = 0
+            self._advance(1)
+        return seq
@@ -0,0 +1,171 @@
+"""This module implements sequence-aware wake-ups of consumer threads.
+
+A ``SequenceNotifier`` publishes the head sequence number of a ring buffer
+(or sliding window). Every consumer thread holds its own ``Subscription``
+and waits until the published sequence reaches the sequence it has seen last
+plus a batch size. In contrast to a shared ``threading.Condition``:
+
+-   only subscribers whose target has been reached are woken up, so a
+    consumer which processes chunks in batches of N wakes up once per N chunks
+-   the predicate is checked under the lock of the subscription, so a
+    sequence published just before ``wait()`` is never lost
+-   ``cancel()`` wakes the thread immediately, so stopping a thread
+    does not depend on further audio chunks
+
+"""
+from threading import Condition, Lock
+
+
+class SequenceNotifier:
+    """
+    Publishes a monotonically increasing sequence number to subscribers.
+
+    Attributes
+    ----------
+    sequence : int
+        the sequence number published last
+    subscriptions : list of Subscription
+        the active subscriptions
+    lock : threading.Lock
+        guards the list of subscriptions
+
+    Methods
+    -------
+    subscribe(batch)
+        returns a new subscription of a consumer.
+    publish(sequence)
+        publishes a new sequence number and wakes due subscribers.
+    """
+    def __init__(self, sequence=0):
+        """
+        Parameters
+        ----------
+        sequence : int
+            the initial sequence number
+        """
+        self.sequence = sequence
+        self.subscriptions = []
+        self.lock = Lock()
+
+    def subscribe(self, batch=1):
+        """returns a new subscription of a consumer.
+
+        Parameters
+        ----------
+        batch : int
+            number of new sequence numbers which wake up the consumer
+
+        Returns
+        -------
+        Subscription
+            the subscription, to be cancelled once the consumer stops
+        """
+        subscription = Subscription(self, batch)
+        with self.lock:
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def publish(self, sequence):
+        """publishes a new sequence number and wakes up all subscribers
+        whose target has been reached.
+
+        Parameters
+        ----------
+        sequence : int
+            the new sequence number, e.g. the head of a ring buffer
+        """
+        with self.lock:
+            self.sequence = sequence
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            subscription.notify(sequence)
+
+    def _remove(self, subscription):
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+
+class Subscription:
+    """
+    Wake-up channel of a single consumer thread.
+
+    Attributes
+    ----------
+    notifier : SequenceNotifier
+        the notifier publishing the sequence numbers
+    batch : int
+        number of new sequence numbers which wake up the consumer
+    target : int
+        sequence number the consumer currently waits for
+    cancelled : bool
+        True once the subscription has been cancelled
+    condition : threading.Condition
+        condition of this subscription only
+
+    Methods
+    -------
+    wait(lastSeen, timeout)
+        blocks until ``batch`` sequence numbers after ``lastSeen`` are published.
+    notify(sequence)
+        wakes up the consumer if the sequence reached its target.
+    cancel()
+        wakes up the consumer for good and unsubscribes it.
+    """
+    def __init__(self, notifier, batch=1):
+        """
+        Parameters
+        ----------
+        notifier : SequenceNotifier
+            the notifier publishing the sequence numbers
+        batch : int
+            number of new sequence numbers which wake up the consumer
+        """
+        self.notifier = notifier
+        self.batch = batch
+        self.target = None
+        self.cancelled = False
+        self.condition = Condition()
+
+    def wait(self, lastSeen, timeout=None):
+        """blocks until at least ``batch`` sequence numbers after ``lastSeen``
+        have been published, the subscription is cancelled or the timeout has passed.
+
+        Parameters
+        ----------
+        lastSeen : int
+            the sequence number the consumer has processed up to
+        timeout : float
+            a timeout value in seconds, None waits without limit
+
+        Returns
+        -------
+        bool
+            True if the target has been reached, False on timeout or cancellation
+        """
+        with self.condition:
+            self.target = lastSeen + max(1, self.batch)
+            self.condition.wait_for(lambda: self.cancelled or self.notifier.sequence >= self.target, timeout)
+            reached = not self.cancelled and self.notifier.sequence >= self.target
+            self.target = None
+            return reached
+
+    def notify(self, sequence):
+        """wakes up the consumer if the sequence reached its target.
+
+        Parameters
+        ----------
+        sequence : int
+            the sequence number published last
+        """
+        with self.condition:
+            if self.target is not None and sequence >= self.target:
+                self.condition.notify()
+
+    def cancel(self):
+        """wakes up the consumer for good and unsubscribes it.
+        """
+        with self.condition:
+            self.cancelled = True
+            self.condition.notify()
+        self.notifier._remove(self)
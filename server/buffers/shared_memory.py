@@ -0,0 +1,216 @@
+"""This module implements the shared memory blocks which link the
+backend process with its worker processes (see ``server.workers``).
+
+``SharedRingMemory`` holds the storage and the sequence numbers of a
+``SequenceRingBuffer``, so the producer thread writes audio chunks and the
+feature process writes spectrogram columns into memory which all processes
+map directly. ``SharedResultSlot`` hands the newest result of a worker (e.g.
+class probabilities) back to the backend process. It is double buffered: the
+writer always fills the buffer which is not published, and a reader copies
+the published buffer again if a new result was published during the copy.
+
+Both are created by the owning process and attached by the workers with
+their ``spec``, which is small and picklable. Only the creator unlinks the
+shared memory.
+
+"""
+import numpy as np
+
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from server.buffers.ring_buffer import SequenceRingBuffer
+
+# bytes reserved for the counters in front of the data, keeps the data aligned
+HEADER_SIZE = 64
+
+
+def openMemory(name, size):
+    # creates a new block if name is None, else attaches an existing one
+    if name is None:
+        return SharedMemory(create=True, size=size)
+    # attaching registers the block again. Workers started by multiprocessing share the resource tracker
+    # of the creator, where this is a no-op. Any other process starts its own tracker, which would unlink
+    # the block when that process exits, so the block is unregistered there after attaching
+    ownTracker = resource_tracker._resource_tracker._fd is None
+    memory = SharedMemory(name=name)
+    if ownTracker:
+        resource_tracker.unregister(memory._name, 'shared_memory')
+    return memory
+
+
+class SharedRingMemory:
+    """
+    Shared memory block holding the storage and the counters of a ring buffer.
+
+    Attributes
+    ----------
+    memory : SharedMemory
+        the shared memory block
+    counters : 1d numpy array of int64 values
+        ``head`` and ``tail`` of the ring buffer
+    buffer : numpy array
+        storage of the rows of the ring buffer
+    spec : tuple
+        size, row shape, dtype and name to attach the block in another process
+    owner : bool
+        True if this process created the block
+
+    Methods
+    -------
+    release()
+        closes the block and unlinks it if this process created it.
+    """
+    def __init__(self, size, rowShape, dtype, name=None):
+        """
+        Parameters
+        ----------
+        size : int
+            maximum number of rows kept in the ring buffer
+        rowShape : int or tuple of int
+            shape of a single row
+        dtype : numpy dtype
+            data type of the stored values
+        name : str
+            name of an existing block to attach, None creates a new block
+        """
+        rowShape = tuple(rowShape) if isinstance(rowShape, (tuple, list)) else (rowShape,)
+        dtype = np.dtype(dtype)
+        nbytes = HEADER_SIZE + size * int(np.prod(rowShape)) * dtype.itemsize
+        self.owner = name is None
+        self.memory = openMemory(name, nbytes)
+        self.counters = np.ndarray(2, dtype=np.int64, buffer=self.memory.buf)
+        self.buffer = np.ndarray((size,) + rowShape, dtype=dtype, buffer=self.memory.buf, offset=HEADER_SIZE)
+        if self.owner:
+            self.counters[:] = 0
+        self.spec = (size, rowShape, dtype.str, self.memory.name)
+
+    def release(self):
+        """closes the block and unlinks it if this process created it.
+        """
+        self.counters = self.buffer = None
+        try:
+            self.memory.close()
+        except BufferError:
+            pass    # views of the rows are still alive, the mapping is dropped with the process
+        if self.owner:
+            self.memory.unlink()
+
+
+class SharedResultSlot:
+    """
+    Double buffered shared memory slot for the newest result of a worker.
+
+    Attributes
+    ----------
+    memory : SharedMemory
+        the shared memory block
+    sequence : 1d numpy array of int64 values
+        number of published results
+    heads : 1d numpy array of int64 values
+        sequence number of the input of the result in each buffer
+    values : 2d numpy array of float32 values
+        the two buffers of the result
+    stats : 1d numpy array of float64 values
+        statistics of the worker, published with every result
+    spec : tuple
+        length of a result, number of statistics and name to attach the block in another process
+    owner : bool
+        True if this process created the block
+
+    Methods
+    -------
+    write(values, head, stats)
+        publishes a new result.
+    read()
+        returns the newest result.
+    release()
+        closes the block and unlinks it if this process created it.
+    """
+    def __init__(self, length, numStats=0, name=None):
+        """
+        Parameters
+        ----------
+        length : int
+            number of values of a result
+        numStats : int
+            number of statistics published with every result
+        name : str
+            name of an existing block to attach, None creates a new block
+        """
+        nbytes = HEADER_SIZE + 2 * length * 4 + numStats * 8
+        self.owner = name is None
+        self.memory = openMemory(name, nbytes)
+        self.sequence = np.ndarray(1, dtype=np.int64, buffer=self.memory.buf)
+        self.heads = np.ndarray(2, dtype=np.int64, buffer=self.memory.buf, offset=8)
+        self.values = np.ndarray((2, length), dtype=np.float32, buffer=self.memory.buf, offset=HEADER_SIZE)
+        self.stats = np.ndarray(numStats, dtype=np.float64, buffer=self.memory.buf,
+                                offset=HEADER_SIZE + 2 * length * 4)
+        if self.owner:
+            self.sequence[:] = 0
+        self.spec = (length, numStats, self.memory.name)
+
+    def write(self, values, head, stats=None):
+        """publishes a new result. There must be a single writer.
+
+        Parameters
+        ----------
+        values : 1d numpy array of float values
+            the result
+        head : int
+            sequence number of the input of the result
+        stats : 1d numpy array of float values
+            statistics of the worker
+        """
+        sequence = int(self.sequence[0]) + 1
+        self.values[sequence % 2] = values
+        self.heads[sequence % 2] = head
+        if stats is not None:
+            self.stats[:] = stats
+        self.sequence[0] = sequence
+
+    def read(self):
+        """returns the newest result.
+
+        Returns
+        -------
+        tuple (int, int, 1d numpy array of float32 values)
+            number of published results, sequence number of the input
+            and a copy of the result, ``(0, None, None)`` before the first result
+        """
+        while True:
+            sequence = int(self.sequence[0])
+            if sequence == 0:
+                return 0, None, None
+            values, head = self.values[sequence % 2].copy(), int(self.heads[sequence % 2])
+            # the writer only touches this buffer again after it published the other one
+            if int(self.sequence[0]) == sequence:
+                return sequence, head, values
+
+    def release(self):
+        """closes the block and unlinks it if this process created it.
+        """
+        self.sequence = self.heads = self.values = self.stats = None
+        try:
+            self.memory.close()
+        except BufferError:
+            pass    # views of the result are still alive, the mapping is dropped with the process
+        if self.owner:
+            self.memory.unlink()
+
+
+def attachRing(spec):
+    """Attaches the ring buffer of another process.
+
+    Parameters
+    ----------
+    spec : tuple
+        the ``spec`` of the ``SharedRingMemory`` of the ring buffer
+
+    Returns
+    -------
+    SequenceRingBuffer
+        a ring buffer on the shared storage
+    """
+    size, rowShape, dtype, _ = spec
+    return SequenceRingBuffer(size, rowShape, dtype, SharedRingMemory(*spec))
@@ -0,0 +1,164 @@
+"""This module implements a circular sliding window over spectrogram
+columns.
+
+Appending a column to a plain 2d array requires shifting the whole array by
+one column. Instead, the sliding window keeps its columns in a circular
+storage of twice the window width where every column is written twice
+(at ``pos`` and at ``pos + width``). Hence, the time-ordered window is
+always available as the slice ``[:, pos:pos + width]`` and appending costs
+two column writes. A contiguous copy is only materialized when a reader
+asks for a snapshot.
+
+"""
+import numpy as np
+
+from threading import Lock
+
+
+class SlidingWindow:
+    """
+    Circular sliding window of spectrogram columns.
+
+    Attributes
+    ----------
+    storage : 2d numpy array of float values
+        circular storage holding every column twice
+    width : int
+        number of columns in the sliding window
+    pos : int
+        storage index of the oldest column in the window
+    head : int
+        number of columns appended so far
+    lock : threading.Lock
+        guarantees that readers get a consistent snapshot
+
+    Methods
+    -------
+    append(column)
+        appends a new column and drops the oldest one.
+    extend(columns)
+        appends several columns at once.
+    view()
+        returns a zero-copy, time-ordered view of the window.
+    snapshot(out)
+        returns a consistent, contiguous copy of the window.
+    snapshotWithHead(out)
+        returns a snapshot together with the number of columns appended so far.
+    clear()
+        resets all columns to zero.
+    """
+    def __init__(self, nBins, width, dtype=np.float32):
+        """
+        Parameters
+        ----------
+        nBins : int
+            number of frequency bins per column
+        width : int
+            number of columns in the sliding window
+        dtype : numpy dtype
+            data type of the stored values
+        """
+        self.storage = np.zeros((nBins, 2 * width), dtype=dtype)
+        self.width = width
+        self.pos = 0
+        self.head = 0
+        self.lock = Lock()
+
+    @property
+    def shape(self):
+        """shape of the time-ordered window"""
+        return self.storage.shape[0], self.width
+
+    def append(self, column):
+        """appends a new column and drops the oldest one in O(nBins).
+
+        Parameters
+        ----------
+        column : 1d numpy array of float values
+            the column to be appended
+        """
+        with self.lock:
+            self.storage[:, self.pos] = column
+            self.storage[:, self.pos + self.width] = column
+            self.pos = (self.pos + 1) % self.width
+            self.head += 1
+
+    def extend(self, columns):
+        """appends several columns at once and drops the oldest ones.
+
+        Parameters
+        ----------
+        columns : 2d numpy array of float values
+            the columns to be appended stacked along the first axis,
+            i.e. of shape ``(n, nBins)``
+        """
+        total = len(columns)
+        columns = columns[-self.width:]     # older columns would be dropped anyway
+        n = len(columns)
+        with self.lock:
+            positions = (self.pos + np.arange(n)) % self.width
+            self.storage[:, positions] = columns.T
+            self.storage[:, positions + self.width] = columns.T
+            self.pos = (self.pos + n) % self.width
+            self.head += total
+
+    def view(self):
+        """returns a zero-copy, time-ordered view of the window.
+
+        Note
+        ----
+        The view is not a snapshot, concurrently appended columns
+        become visible while the view is read.
+
+        Returns
+        -------
+        2d numpy array of float values
+            non-contiguous view of shape ``(nBins, width)``
+        """
+        return self.storage[:, self.pos:self.pos + self.width]
+
+    def snapshot(self, out=None):
+        """returns a consistent, contiguous copy of the window.
+
+        Parameters
+        ----------
+        out : 2d numpy array of float values
+            optional preallocated array of shape ``(nBins, width)`` receiving the window
+
+        Returns
+        -------
+        2d numpy array of float values
+            copy of the time-ordered window
+        """
+        with self.lock:
+            return self._copy(out)
+
+    def snapshotWithHead(self, out=None):
+        """returns a consistent, contiguous copy of the window together
+        with the number of columns appended up to this copy.
+
+        Parameters
+        ----------
+        out : 2d numpy array of float values
+            optional preallocated array of shape ``(nBins, width)`` receiving the window
+
+        Returns
+        -------
+        tuple (int, 2d numpy array of float values)
+            the head of the window and the copy of the time-ordered window
+        """
+        with self.lock:
+            return self.head, self._copy(out)
+
+    def _copy(self, out):
+        window = self.storage[:, self.pos:self.pos + self.width]
+        if out is None:
+            return np.ascontiguousarray(window)
+        out[...] = window
+        return out
+
+    def clear(self):
+        """resets all columns to zero.
+        """
+        with self.lock:
+            self.storage[...] = 0
@@ -15,3 +15,83 @@ SAMPLE_RATE = 32000
 N_CHANNELS = 1
 
 BUFFER_SIZE = 1000    # size of ring buffer
+
+# spectrogram front-end settings shared by all consumers
+SPEC_FRAME_SIZE = 1024
+SPEC_HOP_SIZE = 128
+SPEC_NUM_BANDS = 26     # bands per octave of the logarithmic filterbank
+SPEC_FMIN = 20
+SPEC_FMAX = 14000
+SPEC_NUM_BINS = 128     # number of frequency bins delivered by the filterbank
+
+FEATURE_BUFFER_SIZE = 1000    # size of ring buffer holding spectrogram columns
+SLIDING_WINDOW_SIZE = 256     # number of spectrogram columns in a sliding window
+
+# consumers falling behind by more than CONSUMER_MAX_LAG chunks apply CONSUMER_LAG_POLICY:
+# 'catchup' processes every chunk still buffered, 'drop' only the newest CONSUMER_MAX_LAG
+# chunks and 'resync' only the most recent chunk
+CONSUMER_MAX_LAG = 64
+CONSUMER_LAG_POLICY = 'catchup'
+
+# offline tagging of audio files
+OFFLINE_PREDICTION_HOP = 1.0    # seconds between two predictions of the timeline
+OFFLINE_BATCH_SIZE = 16         # number of windows per forward pass
+OFFLINE_READ_CHUNKS = 1024      # number of audio chunks decoded at once
+
+# batch tagging of audio archives
+BATCH_WORKERS = None    # number of worker processes, None uses all cores
+
+# micro-batching of predictions, a batch is closed once it is full or its oldest window waited INFERENCE_MAX_WAIT seconds
+INFERENCE_MAX_BATCH_SIZE = 8
+INFERENCE_MAX_WAIT = 0.005
+INFERENCE_REQUEST_TIMEOUT = 2.0     # seconds a prediction waits for its batch before it is computed directly
+
+# audio sessions, the default session is started with START_FILE and START_PREDICTOR
+DEFAULT_SESSION = 0
+CONSUMER_WAIT_TIMEOUT = 0.5     # seconds a waiting thread sleeps at most before it checks for a stop signal
+
+# INT8 quantized predictor, calibrated on QUANTIZATION_CALIBRATION_FILES (None uses the WAV files in server/files)
+QUANTIZATION_BACKEND = 'x86'    # 'qnnpack' on ARM CPUs
+QUANTIZATION_CALIBRATION_FILES = None
+QUANTIZATION_CALIBRATION_HOP = 0.5    # seconds between two calibration windows
+
+# live predictions run every PREDICTION_HOP chunks (or every PREDICTION_HOP_MS milliseconds if not None).
+# The hop is widened up to PREDICTION_MAX_HOP chunks while inference uses more than PREDICTION_MAX_LOAD of real time
+PREDICTION_HOP = 1
+PREDICTION_HOP_MS = None
+PREDICTION_MAX_LOAD = 0.5
+PREDICTION_MAX_HOP = 64
+
+# rendering of spectrogram JPEGs, each version of a spectrogram is rendered once per scale and quality
+RENDER_SCALE = 3            # upscaling factor of the spectrogram
+RENDER_JPEG_QUALITY = 95
+RENDER_CACHE_SIZE = 32      # number of renditions kept in the LRU cache
+STREAM_MAX_FPS = 25         # default maximum frame rate of a streaming client
+STREAM_WAIT_TIMEOUT = 1.0   # seconds a stream waits for a new spectrogram before it checks its session
+
+# push of predictions via server-sent events, clients may override these defaults per connection
+PUSH_TOP_K = None           # number of reported classes, None reports all classes
+PUSH_MIN_DELTA = 0.0        # minimum change of a probability which is reported
+PUSH_MAX_RATE = 10          # maximum number of messages per second
+PUSH_KEEPALIVE = 15.0       # seconds without a message after which a comment keeps the connection alive
+
+# execution mode, 'processes' runs feature extraction and inference of every session in worker processes
+# linked by shared memory instead of threads (predictors without predictBatch() keep running as threads)
+EXECUTION_MODE = 'threads'
+WORKER_POLL_INTERVAL = 0.005    # seconds between two checks of a worker process for new input
+WORKER_TORCH_THREADS = None     # torch threads of an inference process, None lets torch decide
+
+# warm predictor pool, keeps up to PREDICTOR_POOL_SIZE predictors warmed up for instant switching. Least recently
+# used predictors are evicted first, also while the warm predictors hold more than PREDICTOR_POOL_MEMORY_MB
+PREDICTOR_POOL_SIZE = 4
+PREDICTOR_POOL_MEMORY_MB = 1024
+PREDICTOR_POOL_PRELOAD = []     # ids of predictors warmed up at startup in addition to START_PREDICTOR
+
+# switching of audio source and predictor, the new producer and predictor take over with their first chunk and
+# prediction, at the latest after SWITCH_PRIME_TIMEOUT seconds. The last SWITCH_HISTORY switches of a session are kept
+SWITCH_PRIME_TIMEOUT = 10.0
+SWITCH_HISTORY = 16
+
+# startup, the web server answers right away while START_PREDICTOR and the default session are prepared in the
+# background (see /health). STARTUP_REPORT prints the duration of every startup phase once the startup finished
+STARTUP_REPORT = True
@@ -0,0 +1,330 @@
+"""This module builds an inference-only version of ``baseline_net.Net``.
+
+At inference time, batch normalization is a fixed affine transform per
+channel and dropout is the identity. ``InferenceNet`` therefore folds every
+``convN_bn`` into the weights and bias of ``convN`` and has no dropout layers
+at all. The folded network is scripted and frozen with TorchScript, and the
+result is cached on disk next to the trained weights. A later startup loads
+the cached module instead of building it again, unless the weights are newer
+than the cache or the cache has been built with another torch version or
+another source code of the networks (see ``cacheKey()``).
+The output of the folded network matches ``Net``, which can be checked with
+``compareWithNet()``. Running this module prints the deviation and the
+latency of both networks on random input.
+
+"""
+import os
+import sys
+import time
+import hashlib
+import inspect
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from server.consumer.predictors.dcase_predictor_provider import baseline_net
+from server.consumer.predictors.dcase_predictor_provider.baseline_net import Net
+
+# maximum deviation of the logits from Net tolerated by compareWithNet()
+INFERENCE_TOLERANCE = 1e-3
+
+# names of the conv layers of Net in the order of the forward pass
+CONV_LAYERS = ['conv{}'.format(index) for index in range(1, 16)]
+
+# name of the file within a cached module which holds its cache key
+CACHE_KEY_FILE = 'cache_key'
+
+
+def foldBatchNorm(conv, bn):
+    """Folds a batch normalization layer in evaluation mode into the
+    preceding convolution.
+
+    Parameters
+    ----------
+    conv : nn.Conv2d
+        the convolution
+    bn : nn.BatchNorm2d
+        the batch normalization applied to the output of ``conv``
+
+    Returns
+    -------
+    nn.Conv2d
+        a new convolution with bias computing ``bn(conv(x))``
+    """
+    folded = nn.Conv2d(conv.in_channels, conv.out_channels, conv.kernel_size, stride=conv.stride,
+                       padding=conv.padding, bias=True)
+    with torch.no_grad():
+        scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+        bias = conv.bias if conv.bias is not None else torch.zeros_like(bn.running_mean)
+        folded.weight.copy_(conv.weight * scale.reshape(-1, 1, 1, 1))
+        folded.bias.copy_((bias - bn.running_mean) * scale + bn.bias)
+    return folded
+
+
+class InferenceNet(nn.Module):
+    """
+    ``Net`` with batch normalization folded into the convolutions and
+    without dropout. It computes the same logits as ``Net`` in evaluation mode.
+
+    Methods
+    -------
+    fromNet(net)
+        builds the folded network from a trained ``Net``.
+    forward(x)
+        computes the logits of a batch of spectrogram windows.
+    """
+    def __init__(self, convs):
+        """
+        Parameters
+        ----------
+        convs : list of nn.Conv2d
+            the folded convolutions conv1 to conv15
+        """
+        super(InferenceNet, self).__init__()
+        for name, conv in zip(CONV_LAYERS, convs):
+            setattr(self, name, conv)
+
+    @classmethod
+    def fromNet(cls, net):
+        """builds the folded network from a trained ``Net``.
+
+        Parameters
+        ----------
+        net : baseline_net.Net
+            the trained network
+
+        Returns
+        -------
+        InferenceNet
+            the folded network in evaluation mode
+        """
+        net.eval()
+        convs = [foldBatchNorm(getattr(net, name), getattr(net, name + '_bn')) for name in CONV_LAYERS]
+        return cls(convs).to(next(net.parameters()).device).eval()
+
+    def forward(self, x):
+        x = F.relu(self.conv1(x))
+        x = F.relu(self.conv2(x))
+        x = F.max_pool2d(x, (2, 2))
+
+        x = F.relu(self.conv3(x))
+        x = F.relu(self.conv4(x))
+        x = F.max_pool2d(x, (2, 2))
+
+        x = F.relu(self.conv5(x))
+        x = F.relu(self.conv6(x))
+        x = F.relu(self.conv7(x))
+        x = F.relu(self.conv8(x))
+        x = F.max_pool2d(x, (2, 2))
+
+        x = F.relu(self.conv9(x))
+        x = F.relu(self.conv10(x))
+        x = F.max_pool2d(x, (1, 2))
+
+        x = F.relu(self.conv11(x))
+        x = F.relu(self.conv12(x))
+        x = F.max_pool2d(x, (1, 2))
+
+        x = F.relu(self.conv13(x))
+        x = F.relu(self.conv14(x))
+        x = self.conv15(x)
+        x = torch.mean(x, dim=(2, 3))
+        return x
+
+
+def buildInferenceModel(weightsPath, device='cpu', cachePath=None):
+    """Returns the scripted and frozen inference network of the trained
+    weights. The module is loaded from the cache if it is up to date, otherwise
+    it is built from ``Net`` and written to the cache.
+
+    Parameters
+    ----------
+    weightsPath : str
+        path to the state dict of the trained ``Net``
+    device : str
+        device the network runs on
+    cachePath : str
+        path of the cached module, defaults to the weights path with
+        the suffix ``.inference.pt``
+
+    Returns
+    -------
+    torch.jit.ScriptModule
+        the frozen inference network
+    """
+    if cachePath is None:
+        cachePath = os.path.splitext(weightsPath)[0] + '.inference.pt'
+    key = cacheKey()
+    model = loadCachedModule(cachePath, weightsPath, key, device)
+    if model is None:
+        model = torch.jit.freeze(torch.jit.script(InferenceNet.fromNet(loadNet(weightsPath, device))))
+        saveCachedModule(model, cachePath, key)
+    return model
+
+
+def cacheKey(*sources):
+    """Returns the key of a cached module. It changes with the torch
+    version and with the source code of ``baseline_net`` and this module.
+
+    Parameters
+    ----------
+    sources : str
+        further source code or settings the cached module depends on
+
+    Returns
+    -------
+    str
+        hex digest of the torch version and the source code
+    """
+    digest = hashlib.sha1(torch.__version__.encode())
+    for source in (inspect.getsource(baseline_net), inspect.getsource(sys.modules[__name__])) + sources:
+        digest.update(source.encode())
+    return digest.hexdigest()
+
+
+def loadCachedModule(cachePath, weightsPath, key, device='cpu'):
+    """Loads a cached module if it is up to date.
+
+    Parameters
+    ----------
+    cachePath : str
+        path of the cached module
+    weightsPath : str
+        path to the state dict the module has been built from
+    key : str
+        the current cache key, see ``cacheKey()``
+    device : str
+        device the network runs on
+
+    Returns
+    -------
+    torch.jit.ScriptModule
+        the cached module, None if there is none, if the weights are newer
+        or if it has been cached with another key
+    """
+    if not os.path.exists(cachePath) or os.path.getmtime(cachePath) < os.path.getmtime(weightsPath):
+        return None
+    extraFiles = {CACHE_KEY_FILE: ''}
+    try:
+        model = torch.jit.load(cachePath, map_location=device, _extra_files=extraFiles)
+    except RuntimeError:
+        return None     # e.g. written by an incompatible torch version
+    if extraFiles[CACHE_KEY_FILE] != key.encode():
+        return None
+    return model.eval()
+
+
+def saveCachedModule(model, cachePath, key):
+    """Writes a module and its cache key to the cache.
+
+    Parameters
+    ----------
+    model : torch.jit.ScriptModule
+        the module
+    cachePath : str
+        path of the cached module
+    key : str
+        the current cache key, see ``cacheKey()``
+    """
+    try:
+        torch.jit.save(model, cachePath, _extra_files={CACHE_KEY_FILE: key})
+    except OSError:
+        pass    # read-only installation, the module is built again on next startup
+
+
+def loadNet(weightsPath, device='cpu'):
+    """Loads the trained ``Net``.
+
+    Parameters
+    ----------
+    weightsPath : str
+        path to the state dict of the trained ``Net``
+    device : str
+        device the network runs on
+
+    Returns
+    -------
+    baseline_net.Net
+        the network in evaluation mode
+    """
+    net = Net()
+    net.load_state_dict(torch.load(weightsPath, map_location=lambda storage, location: storage))
+    return net.to(device).eval()
+
+
+def tensorBytes(value):
+    # bytes of the tensors within a value, e.g. the packed weights of a quantized layer
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, (tuple, list)):
+        return sum(tensorBytes(elem) for elem in value)
+    if hasattr(value, '__getstate__') and not isinstance(value, (str, bytes)):
+        try:
+            return tensorBytes(value.__getstate__())
+        except (RuntimeError, TypeError):
+            return 0
+    return 0
+
+
+def modelMemory(model):
+    """Returns the number of bytes of the weights of a network. Frozen
+    TorchScript modules have no state dict, their weights are constants
+    of the graph.
+
+    Parameters
+    ----------
+    model : nn.Module or torch.jit.ScriptModule
+        the network
+
+    Returns
+    -------
+    int
+        bytes of all parameters, buffers and tensor constants
+    """
+    total = sum(tensorBytes(tensor) for tensor in model.state_dict().values())
+    if isinstance(model, torch.jit.ScriptModule):
+        total += sum(tensorBytes(node.output().toIValue()) for node in model.graph.findAllNodes('prim::Constant'))
+    return total
+
+
+def compareWithNet(net, model, windows):
+    """Computes the logits of ``windows`` with ``Net`` and with the
+    inference network and returns the maximum absolute deviation.
+
+    Parameters
+    ----------
+    net : baseline_net.Net
+        the trained network
+    model : nn.Module
+        the inference network to be checked
+    windows : 4d torch tensor
+        network input of shape ``(n, 1, nBins, windowSize)``
+
+    Returns
+    -------
+    float
+        maximum absolute deviation between both outputs
+    """
+    with torch.inference_mode():
+        return float((net.eval()(windows) - model(windows)).abs().max())
+
+
+if __name__ == '__main__':
+    from server.config.config import PROJECT_ROOT, SPEC_NUM_BINS, SLIDING_WINDOW_SIZE
+
+    weightsPath = os.path.join(PROJECT_ROOT, 'server/consumer/predictors/dcase_predictor_provider/baseline_net.pt')
+    net = loadNet(weightsPath)
+    model = buildInferenceModel(weightsPath)
+    windows = torch.rand(4, 1, SPEC_NUM_BINS, SLIDING_WINDOW_SIZE) * 3
+
+    deviation = compareWithNet(net, model, windows)
+    print('max deviation from Net: {:.2e} (tolerance {:.0e})'.format(deviation, INFERENCE_TOLERANCE))
+
+    window = windows[:1]
+    for name, forward in [('Net', net), ('inference', model)]:
+        with torch.inference_mode():
+            forward(window)     # warm up, the first call of a frozen module is optimized
+            start = time.perf_counter()
+            for _ in range(10):
+                forward(window)
+        print('per window: {} {:.1f} ms'.format(name, (time.perf_counter() - start) / 10 * 1e3))
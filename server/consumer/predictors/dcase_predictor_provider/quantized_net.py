@@ -0,0 +1,295 @@
+"""This module builds an INT8 version of ``baseline_net.Net`` for CPUs
+without a GPU.
+
+The folded ``InferenceNet`` (see ``inference_net``) is quantized with
+post-training static quantization: observers are inserted after every layer,
+real spectrogram windows are sent through the network to calibrate the value
+ranges of the activations, and finally the convolutions are replaced by INT8
+kernels of the configured backend (``x86`` or ``qnnpack`` on ARM). The windows
+are computed from the bundled audio files or from user-supplied WAV files by
+the same front end as in the live pipeline. Like the float module, the result
+is scripted, frozen and cached on disk next to the trained weights, keyed by
+the torch version, the backend and the source code of the networks.
+The backend builds the INT8 network in a worker process, because FX tracing
+patches ``torch.nn.Module.__call__`` of the whole process while it runs and
+would break predictors running in other threads.
+
+Running this module prints a report of the accuracy drift (top-1 agreement
+and mean absolute error of the probabilities) against latency and size of the
+float and the quantized network, e.g.:
+
+```bash
+python server/consumer/predictors/dcase_predictor_provider/quantized_net.py --calibrate room1.wav room2.wav
+```
+
+"""
+import io
+import os
+import sys
+import glob
+import inspect
+import time
+import tempfile
+import argparse
+import multiprocessing
+import numpy as np
+import torch
+
+from concurrent.futures import ProcessPoolExecutor
+
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+from server.config.config import PROJECT_ROOT, SPEC_NUM_BINS, SLIDING_WINDOW_SIZE, QUANTIZATION_BACKEND, \
+    QUANTIZATION_CALIBRATION_FILES, QUANTIZATION_CALIBRATION_HOP, OFFLINE_BATCH_SIZE
+from server.offline_tagger import OfflineTagger
+from server.consumer.predictors.dcase_predictor_provider.inference_net import InferenceNet, loadNet, cacheKey, \
+    loadCachedModule, saveCachedModule
+
+
+class _WindowCollector:
+    # stands in for a predictor of the offline tagger and keeps the windows
+    classes = []
+
+    def __init__(self):
+        self.windows = []
+
+    def predictBatch(self, windows):
+        self.windows.append(windows.copy())
+        return np.zeros((len(windows), 0), dtype=np.float32)
+
+
+def calibrationFiles(files=None):
+    """Returns the audio files used for calibration.
+
+    Parameters
+    ----------
+    files : list of str
+        user-supplied WAV files, if None ``QUANTIZATION_CALIBRATION_FILES``
+        or else the bundled files in ``server/files`` are used
+
+    Returns
+    -------
+    list of str
+        paths of the WAV files
+    """
+    files = files or QUANTIZATION_CALIBRATION_FILES
+    return files or sorted(glob.glob(os.path.join(PROJECT_ROOT, 'server/files/*.wav')))
+
+
+def collectWindows(files, hop=QUANTIZATION_CALIBRATION_HOP):
+    """Computes the spectrogram windows of audio files like the live pipeline.
+
+    Parameters
+    ----------
+    files : list of str
+        paths of the WAV files
+    hop : float
+        seconds between two windows
+
+    Returns
+    -------
+    3d numpy array of float values
+        windows of shape ``(n, nBins, windowSize)``
+    """
+    collector = _WindowCollector()
+    tagger = OfflineTagger(collector)
+    for file in files:
+        tagger.tagFile(file, hop)
+    if not collector.windows:
+        return np.zeros((0, SPEC_NUM_BINS, SLIDING_WINDOW_SIZE), dtype=np.float32)
+    return np.concatenate(collector.windows)
+
+
+def quantizeModel(net, windows, backend=QUANTIZATION_BACKEND):
+    """Quantizes a trained ``Net`` with post-training static quantization.
+
+    Parameters
+    ----------
+    net : baseline_net.Net
+        the trained network
+    windows : 3d numpy array of float values
+        calibration windows of shape ``(n, nBins, windowSize)``
+    backend : str
+        quantized engine of torch, e.g. ``x86`` or ``qnnpack``
+
+    Returns
+    -------
+    torch.jit.ScriptModule
+        the frozen INT8 network
+    """
+    torch.backends.quantized.engine = backend
+    model = InferenceNet.fromNet(net.cpu())
+    prepared = prepare_fx(model, get_default_qconfig_mapping(backend),
+                          example_inputs=(torch.zeros(1, 1, SPEC_NUM_BINS, SLIDING_WINDOW_SIZE),))
+    with torch.inference_mode():
+        for start in range(0, len(windows), OFFLINE_BATCH_SIZE):
+            prepared(torch.from_numpy(windows[start:start + OFFLINE_BATCH_SIZE, np.newaxis]))
+    return torch.jit.freeze(torch.jit.script(convert_fx(prepared)))
+
+
+def buildQuantizedModel(weightsPath, files=None, backend=QUANTIZATION_BACKEND, cachePath=None, rebuild=False):
+    """Returns the INT8 network of the trained weights. The module is
+    loaded from the cache if it is up to date, otherwise it is calibrated
+    and written to the cache.
+
+    Parameters
+    ----------
+    weightsPath : str
+        path to the state dict of the trained ``Net``
+    files : list of str
+        WAV files for calibration, see ``calibrationFiles()``
+    backend : str
+        quantized engine of torch, e.g. ``x86`` or ``qnnpack``
+    cachePath : str
+        path of the cached module, defaults to the weights path with
+        the suffix ``.int8.pt``
+    rebuild : bool
+        calibrate again even if the cache is up to date
+
+    Returns
+    -------
+    torch.jit.ScriptModule
+        the frozen INT8 network
+    """
+    if cachePath is None:
+        cachePath = os.path.splitext(weightsPath)[0] + '.int8.pt'
+    torch.backends.quantized.engine = backend
+    key = cacheKey(backend, inspect.getsource(sys.modules[__name__]))
+    model = None if rebuild else loadCachedModule(cachePath, weightsPath, key)
+    if model is None:
+        # a read-only installation calibrates again on next startup
+        model = quantizeInWorker(weightsPath, calibrationFiles(files), backend)
+        saveCachedModule(model, cachePath, key)
+    return model
+
+
+def quantizeInWorker(weightsPath, files, backend=QUANTIZATION_BACKEND):
+    """Calibrates and quantizes the trained ``Net`` in a worker process,
+    so FX tracing does not interfere with predictors of this process.
+
+    Parameters
+    ----------
+    weightsPath : str
+        path to the state dict of the trained ``Net``
+    files : list of str
+        WAV files for calibration
+    backend : str
+        quantized engine of torch, e.g. ``x86`` or ``qnnpack``
+
+    Returns
+    -------
+    torch.jit.ScriptModule
+        the frozen INT8 network
+    """
+    handle, modelPath = tempfile.mkstemp(suffix='.int8.pt')
+    os.close(handle)
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            pool.submit(_quantizeWorker, weightsPath, files, backend, modelPath).result()
+        return torch.jit.load(modelPath, map_location='cpu').eval()
+    finally:
+        os.remove(modelPath)
+
+
+def _quantizeWorker(weightsPath, files, backend, modelPath):
+    # runs in the worker process of quantizeInWorker()
+    torch.jit.save(quantizeModel(loadNet(weightsPath), collectWindows(files), backend), modelPath)
+
+
+def compareWithFloat(floatModel, quantModel, windows):
+    """Compares the class probabilities of the float and the INT8 network.
+
+    Parameters
+    ----------
+    floatModel : nn.Module
+        the float network
+    quantModel : nn.Module
+        the INT8 network
+    windows : 3d numpy array of float values
+        windows of shape ``(n, nBins, windowSize)``
+
+    Returns
+    -------
+    dict
+        share of windows with the same top-1 class and mean
+        absolute error of the probabilities
+    """
+    agreement, mae = [], []
+    with torch.inference_mode():
+        for start in range(0, len(windows), OFFLINE_BATCH_SIZE):
+            batch = torch.from_numpy(windows[start:start + OFFLINE_BATCH_SIZE, np.newaxis])
+            floatProbs = torch.softmax(floatModel(batch), dim=1)
+            quantProbs = torch.softmax(quantModel(batch), dim=1)
+            agreement.append((floatProbs.argmax(1) == quantProbs.argmax(1)).numpy())
+            mae.append((floatProbs - quantProbs).abs().mean(1).numpy())
+    return {'top1Agreement': float(np.concatenate(agreement).mean()),
+            'probabilityMAE': float(np.concatenate(mae).mean())}
+
+
+def measureLatency(model, window, repeats=10):
+    """Measures the latency of a single window.
+
+    Parameters
+    ----------
+    model : nn.Module
+        the network
+    window : 4d torch tensor
+        network input of shape ``(1, 1, nBins, windowSize)``
+    repeats : int
+        number of timed forward passes
+
+    Returns
+    -------
+    float
+        average latency in seconds
+    """
+    with torch.inference_mode():
+        model(window)   # warm up
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model(window)
+    return (time.perf_counter() - start) / repeats
+
+
+def modelSize(model):
+    """Returns the size of the serialized network.
+
+    Parameters
+    ----------
+    model : nn.Module
+        the network
+
+    Returns
+    -------
+    int
+        size in bytes
+    """
+    buffer = io.BytesIO()
+    if isinstance(model, torch.jit.ScriptModule):
+        torch.jit.save(model, buffer)
+    else:
+        torch.save(model.state_dict(), buffer)
+    return len(buffer.getvalue())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calibrate the INT8 network and report its accuracy drift.')
+    parser.add_argument('--calibrate', nargs='+', help='WAV files for calibration, recalibrates the cached network')
+    parser.add_argument('--evaluate', nargs='+', help='WAV files for the report, defaults to the calibration files')
+    parser.add_argument('--backend', default=QUANTIZATION_BACKEND, help='quantized engine, e.g. x86 or qnnpack')
+    args = parser.parse_args()
+
+    weightsPath = os.path.join(PROJECT_ROOT, 'server/consumer/predictors/dcase_predictor_provider/baseline_net.pt')
+    net = loadNet(weightsPath)
+    floatModel = InferenceNet.fromNet(net)
+    quantModel = buildQuantizedModel(weightsPath, args.calibrate, args.backend, rebuild=args.calibrate is not None)
+    windows = collectWindows(args.evaluate or calibrationFiles(args.calibrate))
+
+    drift = compareWithFloat(floatModel, quantModel, windows)
+    print('windows: {}, top-1 agreement: {:.1%}, probability MAE: {:.2e}'.format(
+        len(windows), drift['top1Agreement'], drift['probabilityMAE']))
+    window = torch.from_numpy(windows[:1, np.newaxis])
+    for name, model in [('float', floatModel), ('int8', quantModel)]:
+        print('{}: {:.1f} ms per window, {:.1f} MB'.format(name, measureLatency(model, window) * 1e3,
+                                                          modelSize(model) / 2 ** 20))
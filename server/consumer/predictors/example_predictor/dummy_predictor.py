@@ -2,13 +2,15 @@
 for a new predictor. At the end of each prediction iteration
 it is essential to call the method
 ``onNewPredictionCalculated(probs)`` of ``AudioTaggerManager``
-and send it the new predictions.
+and send it the new predictions. Between two predictions the
+thread waits for the next spectrogram column of the manager.
 
 """
 import random
 
 from threading import Thread, Event
 
+from server.config.config import CONSUMER_WAIT_TIMEOUT
 from server.consumer.predictors.predictor_contract import PredictorContract
 
 class PredictionThread(Thread):
@@ -20,6 +22,8 @@ class PredictionThread(Thread):
     ----------
     provider : PredictorContract
         reference to the predictor the thread belongs to
+    subscription : Subscription
+        wakes the thread up when a new spectrogram column is available
     _stopevent : threading.Event
         indicator for stopping a thread loop
 
@@ -41,19 +45,21 @@ class PredictionThread(Thread):
             the name of the thread
         """
         self.provider = provider
+        self.subscription = provider.manager.featureNotifier.subscribe()
         self._stopevent = Event()
         Thread.__init__(self, name=name)
 
     def run(self):
-        """Periodically computes new predictions based on
-        the currently available sliding window. After each iteration
-        the method informs ``AudioTaggerManager`` about the new
-        predictions.
+        """Computes a new prediction for every new spectrogram column.
+        After each iteration the method informs ``AudioTaggerManager``
+        about the new predictions.
         """
         while not self._stopevent.isSet():
+            lastSeen = self.subscription.notifier.sequence
             if len(self.provider.manager.sharedMemory) > 0:   # start consuming once the producer has started
-                probs = self.provider.manager.predProvider.predict()
+                probs = self.provider.predict()
                 self.provider.manager.onNewPredictionCalculated(probs)
+            self.subscription.wait(lastSeen, CONSUMER_WAIT_TIMEOUT)
 
     def join(self, timeout=None):
         """Stops the thread.
@@ -69,6 +75,7 @@ class PredictionThread(Thread):
 
         """
         self._stopevent.set()
+        self.subscription.cancel()
         Thread.join(self, timeout)
 
 class DummyPredictor(PredictorContract):
@@ -0,0 +1,262 @@
+"""This module implements a micro-batching scheduler for predictors.
+
+Running a network on a single window pays the full per-call overhead of the
+framework for every prediction. If several windows are ready at about the
+same time (multiple streams, catch-up after a stall), the scheduler collects
+them into one batch and runs a single forward pass. A batch is closed as soon
+as it holds ``maxBatchSize`` windows or the oldest window has waited for
+``maxWait`` seconds, which bounds the latency added for live streams.
+The results are routed back to the callers which submitted the windows.
+Once the scheduler is stopped, it rejects new windows and fails the windows
+which are still pending, so no caller waits for a result which never comes.
+
+"""
+import time
+import numpy as np
+
+from queue import Queue, Empty
+from threading import Thread, Event, Lock
+
+from server.config.config import INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT, INFERENCE_REQUEST_TIMEOUT
+
+
+class InferenceRequest:
+    """
+    A window submitted to the scheduler and, once processed, its result.
+
+    Attributes
+    ----------
+    window : numpy array
+        the network input of a single prediction
+    callback : callable
+        optional function called with the request once it is done
+    result : numpy array
+        the network output of the window
+    error : Exception
+        the exception raised by the forward pass, if any
+
+    Methods
+    -------
+    wait(timeout)
+        blocks until the request is done and returns its result.
+    """
+    def __init__(self, window, callback=None):
+        """
+        Parameters
+        ----------
+        window : numpy array
+            the network input of a single prediction
+        callback : callable
+            optional function called with the request once it is done
+        """
+        self.window = window
+        self.callback = callback
+        self.result = None
+        self.error = None
+        self._done = Event()
+
+    def setDone(self, result=None, error=None):
+        self.result, self.error = result, error
+        self._done.set()
+        if self.callback is not None:
+            self.callback(self)
+
+    def wait(self, timeout=None):
+        """blocks until the request is done and returns its result.
+
+        Parameters
+        ----------
+        timeout : float
+            a timeout value in seconds, None waits forever
+
+        Returns
+        -------
+        numpy array
+            the network output of the window
+
+        Raises
+        ------
+        TimeoutError
+            if the request is not done within ``timeout``
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError('inference request not done within {} seconds'.format(timeout))
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class InferenceScheduler(Thread):
+    """
+    Thread collecting submitted windows into batches for a single forward pass.
+
+    Attributes
+    ----------
+    predictBatch : callable
+        function mapping a batch of windows to a batch of results
+    maxBatchSize : int
+        maximum number of windows per forward pass
+    maxWait : float
+        maximum time in seconds a window waits for further windows
+    queue : Queue
+        pending inference requests
+    numBatches : int
+        number of forward passes executed so far
+    numRequests : int
+        number of windows processed so far
+    lock : threading.Lock
+        makes stopping the scheduler atomic with respect to submitting a window
+    _stopevent : threading.Event
+        indicator for stopping a thread loop
+
+    Methods
+    -------
+    submit(window, callback)
+        enqueues a window and returns its request.
+    predict(window, timeout)
+        enqueues a window and blocks until its result is available.
+    getStats()
+        returns batch statistics.
+    run()
+        method triggered when start() method is called.
+    join()
+        sends stop signal to thread.
+    """
+    def __init__(self, predictBatch, maxBatchSize=INFERENCE_MAX_BATCH_SIZE, maxWait=INFERENCE_MAX_WAIT,
+                 name='InferenceScheduler'):
+        """
+        Parameters
+        ----------
+        predictBatch : callable
+            function mapping a batch of windows to a batch of results
+        maxBatchSize : int
+            maximum number of windows per forward pass
+        maxWait : float
+            maximum time in seconds a window waits for further windows
+        name : str
+            the name of the thread
+        """
+        self.predictBatch = predictBatch
+        self.maxBatchSize = maxBatchSize
+        self.maxWait = maxWait
+        self.queue = Queue()
+        self.numBatches = 0
+        self.numRequests = 0
+        self.lock = Lock()
+        self._stopevent = Event()
+        Thread.__init__(self, name=name, daemon=True)
+
+    def submit(self, window, callback=None):
+        """enqueues a window for the next batch.
+
+        Parameters
+        ----------
+        window : numpy array
+            the network input of a single prediction, it must not
+            be modified until the request is done
+        callback : callable
+            optional function called with the request once it is done
+
+        Returns
+        -------
+        InferenceRequest
+            the request which receives the result
+
+        Raises
+        ------
+        RuntimeError
+            if the scheduler has already been stopped
+        """
+        request = InferenceRequest(window, callback)
+        with self.lock:
+            # a window enqueued after the stop would never be processed nor failed
+            if self._stopevent.isSet():
+                raise RuntimeError('inference scheduler stopped')
+            self.queue.put(request)
+        return request
+
+    def predict(self, window, timeout=INFERENCE_REQUEST_TIMEOUT):
+        """enqueues a window and blocks until its result is available.
+
+        Parameters
+        ----------
+        window : numpy array
+            the network input of a single prediction
+        timeout : float
+            maximum time in seconds to wait for the result
+
+        Returns
+        -------
+        numpy array
+            the network output of the window
+
+        Raises
+        ------
+        RuntimeError
+            if the scheduler has been stopped before the window was processed
+        TimeoutError
+            if the result is not available within ``timeout``
+        """
+        return self.submit(window).wait(timeout)
+
+    def getStats(self):
+        """returns batch statistics of the scheduler.
+
+        Returns
+        -------
+        dict
+            number of forward passes, processed windows and average batch size
+        """
+        return {'batches': self.numBatches, 'requests': self.numRequests,
+                'averageBatchSize': self.numRequests / self.numBatches if self.numBatches else 0.0}
+
+    def run(self):
+        """Collects pending requests into batches and runs a forward pass per batch.
+        """
+        while not self._stopevent.isSet():
+            try:
+                batch = [self.queue.get(timeout=0.1)]
+            except Empty:
+                continue
+
+            deadline = time.monotonic() + self.maxWait
+            while len(batch) < self.maxBatchSize:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+                except Empty:
+                    break
+            self._process(batch)
+
+        # release callers still waiting for a result, no window is enqueued after the stop
+        while not self.queue.empty():
+            self.queue.get_nowait().setDone(error=RuntimeError('inference scheduler stopped'))
+
+    def _process(self, batch):
+        try:
+            results = self.predictBatch(np.stack([request.window for request in batch]))
+        except Exception as e:
+            for request in batch:
+                request.setDone(error=e)
+            return
+        self.numBatches += 1
+        self.numRequests += len(batch)
+        for request, result in zip(batch, results):
+            request.setDone(result)
+
+    def join(self, timeout=None):
+        """Stops the thread.
+
+        This method tries to stop a thread. When timeout has passed
+        and the thread could not be stopped yet, the program continues.
+        If timeout is set to None, join blocks until the thread is stopped.
+
+        Parameters
+        ----------
+        timeout : float
+            a timeout value in seconds
+
+        """
+        with self.lock:
+            self._stopevent.set()
+        Thread.join(self, timeout)
@@ -0,0 +1,158 @@
+"""This module implements the pacing of live predictions.
+
+Running the network on every new spectrogram column is only possible if
+a forward pass takes less time than an audio chunk lasts. The pacer decides
+when the next prediction is due: once the sliding window advanced by a
+configured hop (``PREDICTION_HOP`` chunks or ``PREDICTION_HOP_MS``
+milliseconds). It measures the time of every forward pass and widens the hop
+as soon as inference would use more than ``PREDICTION_MAX_LOAD`` of real
+time, so audio capture and visualisation keep running under overload and only
+the prediction rate degrades. Once inference gets faster again, the hop returns
+to its configured value. Windows which are passed over while the predictor is
+busy are counted as skipped. Predictors which can only reuse work for certain
+hops (see ``streaming_net``) restrict the hop to multiples of a step.
+
+"""
+import math
+import time
+
+from threading import Lock
+
+from server.config.config import CHUNK_SIZE, SAMPLE_RATE, PREDICTION_HOP, PREDICTION_HOP_MS, PREDICTION_MAX_LOAD, \
+    PREDICTION_MAX_HOP
+
+# weight of the newest measurement in the moving averages
+SMOOTHING = 0.2
+
+
+class PredictionPacer:
+    """
+    Decides when a predictor runs its next prediction and adapts the hop
+    to the measured inference time.
+
+    Attributes
+    ----------
+    baseHop : int
+        configured number of chunks between two predictions
+    hop : int
+        current number of chunks between two predictions
+    maxLoad : float
+        share of real time inference may use before the hop is widened
+    maxHop : int
+        upper bound of the hop
+    step : int
+        every hop is a multiple of step
+    lastHead : int
+        number of spectrogram columns in the sliding window at the previous prediction
+    inferenceTime : float
+        moving average of the duration of a prediction in seconds
+    interval : float
+        moving average of the time between two predictions in seconds
+    predictions : int
+        number of predictions so far
+    skipped : int
+        number of due windows which were not predicted
+    lock : threading.Lock
+        guards the statistics
+
+    Methods
+    -------
+    isDue(head)
+        returns True if the next prediction is due.
+    record(head, duration)
+        updates hop and statistics after a prediction.
+    getStats()
+        returns hop, inference time, load and the effective prediction rate.
+    """
+    def __init__(self, hop=PREDICTION_HOP, hopMs=PREDICTION_HOP_MS, maxLoad=PREDICTION_MAX_LOAD,
+                 maxHop=PREDICTION_MAX_HOP, step=1):
+        """
+        Parameters
+        ----------
+        hop : int
+            number of chunks between two predictions
+        hopMs : float
+            milliseconds between two predictions, overrides ``hop`` if not None
+        maxLoad : float
+            share of real time inference may use before the hop is widened
+        maxHop : int
+            upper bound of the hop
+        step : int
+            hops are rounded up to multiples of step
+        """
+        self.chunkDuration = CHUNK_SIZE / SAMPLE_RATE
+        if hopMs is not None:
+            hop = math.ceil(hopMs / 1000 / self.chunkDuration)
+        self.step = max(1, int(step))
+        self.baseHop = self._align(max(1, int(hop)))
+        self.hop = self.baseHop
+        self.maxLoad = maxLoad
+        self.maxHop = self._align(max(self.baseHop, maxHop))
+        self.lastHead = None
+        self.lastTime = None
+        self.inferenceTime = 0.0
+        self.interval = 0.0
+        self.predictions = 0
+        self.skipped = 0
+        self.lock = Lock()
+
+    def isDue(self, head):
+        """returns True if the next prediction is due.
+
+        Parameters
+        ----------
+        head : int
+            number of spectrogram columns in the sliding window
+
+        Returns
+        -------
+        bool
+            True if the window advanced by at least the current hop
+            since the previous prediction
+        """
+        return self.lastHead is None or head - self.lastHead >= self.hop
+
+    def record(self, head, duration):
+        """updates hop and statistics after a prediction.
+
+        Parameters
+        ----------
+        head : int
+            number of spectrogram columns in the predicted sliding window
+        duration : float
+            duration of the prediction in seconds
+        """
+        now = time.monotonic()
+        with self.lock:
+            if self.lastHead is not None:
+                self.skipped += max(0, (head - self.lastHead) // self.hop - 1)
+                self.interval += SMOOTHING * ((now - self.lastTime) - self.interval) if self.interval \
+                    else now - self.lastTime
+            self.inferenceTime += SMOOTHING * (duration - self.inferenceTime) if self.predictions else duration
+            self.predictions += 1
+            self.lastHead, self.lastTime = head, now
+
+            # smallest hop at which inference uses at most maxLoad of real time
+            required = math.ceil(self.inferenceTime / (self.chunkDuration * self.maxLoad))
+            self.hop = min(self.maxHop, self._align(max(self.baseHop, required)))
+
+    def _align(self, hop):
+        # smallest multiple of step which is at least hop
+        return -(-hop // self.step) * self.step
+
+    def getStats(self):
+        """returns hop, inference time, load and the effective prediction rate.
+
+        Returns
+        -------
+        dict
+            a dictionary with the configured and current hop in chunks, the
+            average inference time in milliseconds, the share of real time
+            used for inference, the effective predictions per second and
+            the number of predictions and skipped windows
+        """
+        with self.lock:
+            rate = 1.0 / self.interval if self.interval > 0 else 0.0
+            return {'baseHop': self.baseHop, 'hop': self.hop, 'inferenceTime': self.inferenceTime * 1000,
+                    'load': self.inferenceTime * rate, 'predictionRate': rate,
+                    'predictions': self.predictions, 'skipped': self.skipped}
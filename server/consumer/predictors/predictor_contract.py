@@ -21,6 +21,12 @@ class PredictorContract:
         start the predictor to do work.
     stop()
         stop the predictor to do work.
+    warmUp()
+        prepares the predictor before it is handed to a session.
+    memorySize()
+        returns the memory held by the warm predictor.
+    release()
+        frees the resources of a warm predictor which is not used anymore.
 
     """
 
@@ -56,3 +62,28 @@ class PredictorContract:
         """
         raise NotImplementedError
 
+    def warmUp(self):
+        """prepares the predictor before it is handed to a session,
+        e.g. loads its model and runs a first prediction. Predictors
+        without expensive preparation do not need to override it.
+
+        """
+        pass
+
+    def memorySize(self):
+        """returns the memory held by the warm predictor.
+
+        Returns
+        -------
+        int
+            approximate number of bytes, 0 if unknown
+
+        """
+        return 0
+
+    def release(self):
+        """frees the resources of a warm predictor which has been
+        evicted from the predictor pool without being started.
+
+        """
+        pass
@@ -0,0 +1,321 @@
+"""This module implements a pool of warm predictors.
+
+Changing the predictor of a session constructs a new predictor object. The
+first instance of a predictor class loads and prepares its network, which
+takes seconds, and a predictor running in a worker process has to start the
+process first. The pool therefore keeps one constructed and warmed up spare
+predictor per predictor id. A session takes the spare and a background thread
+prepares the next one, so switching to a warm predictor takes milliseconds.
+Predictors listed in ``PREDICTOR_POOL_PRELOAD`` are warmed up at startup.
+The pool holds at most ``PREDICTOR_POOL_SIZE`` predictors and evicts the
+least recently used ones while the memory of the warm predictors exceeds
+``PREDICTOR_POOL_MEMORY_MB``. Evicting a predictor does not affect sessions
+which are running it.
+
+"""
+import time
+
+from collections import OrderedDict
+from queue import Queue, Empty
+from threading import Thread, Event, Condition
+
+from server.config.config import PREDICTOR_POOL_SIZE, PREDICTOR_POOL_MEMORY_MB, CONSUMER_WAIT_TIMEOUT
+
+# states of a predictor id in the pool
+STATE_COLD = 'cold'
+STATE_WARMING = 'warming'
+STATE_WARM = 'warm'
+STATE_FAILED = 'failed'
+
+
+class PoolEntry:
+    """
+    A predictor id in the pool.
+
+    Attributes
+    ----------
+    state : str
+        one of ``'warming'``, ``'warm'`` or ``'failed'``
+    spare : PredictorContract
+        the warmed up predictor which is handed to the next session, None while warming
+    memory : int
+        bytes held by a warm predictor
+    warmUpTime : float
+        seconds the last warm up took
+    error : str
+        message of the exception which made the warm up fail
+    """
+    def __init__(self):
+        self.state = STATE_WARMING
+        self.spare = None
+        self.memory = 0
+        self.warmUpTime = None
+        self.error = None
+
+
+class WarmUpThread(Thread):
+    """
+    Thread for warming up the predictors requested by the pool.
+
+    Attributes
+    ----------
+    pool : PredictorPool
+        reference to the pool the thread belongs to
+    requests : queue.Queue
+        predictor ids to be warmed up
+    _stopevent : threading.Event
+        indicator for stopping a thread loop
+
+    Methods
+    -------
+    run()
+        method triggered when start() method is called.
+
+    join()
+        sends stop signal to thread.
+    """
+    def __init__(self, pool, name='WarmUpThread'):
+        """
+        Parameters
+        ----------
+        pool : PredictorPool
+            reference to the pool the thread belongs to
+        name : str
+            the name of the thread
+        """
+        self.pool = pool
+        self.requests = Queue()
+        self._stopevent = Event()
+        Thread.__init__(self, name=name, daemon=True)
+
+    def run(self):
+        """Warms up the requested predictors one after another.
+        """
+        while not self._stopevent.is_set():
+            try:
+                predictorId = self.requests.get(timeout=CONSUMER_WAIT_TIMEOUT)
+            except Empty:
+                continue
+            self.pool.refill(predictorId)
+
+    def join(self, timeout=None):
+        """Stops the thread.
+
+        This method tries to stop a thread. When timeout has passed
+        and the thread could not be stopped yet, the program continues.
+        If timeout is set to None, join blocks until the thread is stopped.
+
+        Parameters
+        ----------
+        timeout : float
+            a timeout value in seconds
+
+        """
+        self._stopevent.set()
+        Thread.join(self, timeout)
+
+
+class PredictorPool:
+    """
+    Pool of warm predictors keyed by predictor id.
+
+    Attributes
+    ----------
+    predList : list
+        list of available predictors
+    factory : callable
+        creates a new, not yet warmed up predictor of a predictor id
+    maxSize : int
+        maximum number of predictor ids kept warm
+    memoryBudget : int
+        bytes the warm predictors may hold
+    entries : OrderedDict
+        pool entry per predictor id, least recently used first
+    condition : threading.Condition
+        guards the entries and signals finished warm ups
+    warmUpThread : WarmUpThread
+        prepares the spare predictors in the background
+    preload : list of int
+        ids of the predictors warmed up at startup
+
+    Methods
+    -------
+    start(preload)
+        starts warming up predictors in the background.
+    stop()
+        stops the background warm up and releases all spare predictors.
+    acquire(predictorId)
+        returns a warm predictor of a predictor id.
+    refill(predictorId)
+        warms up the spare predictor of a predictor id.
+    getStatus()
+        returns the state of every available predictor.
+    isReady()
+        checks whether all preloaded predictors are warm.
+    """
+    def __init__(self, predList, factory, maxSize=PREDICTOR_POOL_SIZE, memoryBudget=PREDICTOR_POOL_MEMORY_MB):
+        """
+        Parameters
+        ----------
+        predList : list
+            list of available predictors
+        factory : callable
+            creates a new, not yet warmed up predictor of a predictor id
+        maxSize : int
+            maximum number of predictor ids kept warm
+        memoryBudget : float
+            megabytes the warm predictors may hold
+        """
+        self.predList = predList
+        self.factory = factory
+        self.maxSize = maxSize
+        self.memoryBudget = int(memoryBudget * 2 ** 20)
+        self.entries = OrderedDict()
+        self.condition = Condition()
+        self.warmUpThread = WarmUpThread(self)
+        self.preload = []
+
+    def start(self, preload=()):
+        """starts warming up predictors in the background.
+
+        Parameters
+        ----------
+        preload : list of int
+            ids of the predictors to be warmed up right away
+        """
+        self.preload = list(preload)
+        self.warmUpThread.start()
+        for predictorId in self.preload:
+            self.warmUpThread.requests.put(predictorId)
+
+    def stop(self):
+        """stops the background warm up and releases all spare predictors.
+        """
+        self.warmUpThread.join()
+        with self.condition:
+            spares = [entry.spare for entry in self.entries.values() if entry.spare is not None]
+            self.entries.clear()
+        for spare in spares:
+            spare.release()
+
+    def acquire(self, predictorId):
+        """returns a warm predictor of a predictor id. If the pool holds
+        a spare, it is returned right away, if the spare is being warmed up,
+        the call waits for it. Otherwise the predictor is warmed up by the
+        caller. Afterwards the next spare is warmed up in the background.
+
+        Parameters
+        ----------
+        predictorId : int
+            id of the predictor in ``predictors.csv``
+
+        Returns
+        -------
+        PredictorContract
+            a warm predictor which has not been started yet
+        """
+        with self.condition:
+            entry = self.entries.get(predictorId)
+            while entry is not None and entry.state == STATE_WARMING and entry.spare is None:
+                self.condition.wait()
+                entry = self.entries.get(predictorId)
+            predictor = None
+            if entry is not None and entry.spare is not None:
+                predictor, entry.spare = entry.spare, None
+                self.entries.move_to_end(predictorId)
+
+        if predictor is None:
+            predictor = self.factory(predictorId)
+            predictor.warmUp()
+            with self.condition:
+                if predictorId in self.entries:
+                    self.entries.move_to_end(predictorId)
+        self.warmUpThread.requests.put(predictorId)
+        return predictor
+
+    def refill(self, predictorId):
+        """warms up the spare predictor of a predictor id unless the pool
+        holds one already and evicts predictors which exceed the limits of
+        the pool.
+
+        Parameters
+        ----------
+        predictorId : int
+            id of the predictor in ``predictors.csv``
+        """
+        with self.condition:
+            entry = self.entries.get(predictorId)
+            if entry is not None and (entry.spare is not None or entry.state == STATE_WARMING):
+                return
+            if entry is None:
+                entry = self.entries[predictorId] = PoolEntry()
+            entry.state = STATE_WARMING
+
+        start = time.perf_counter()
+        try:
+            predictor = self.factory(predictorId)
+            predictor.warmUp()
+        except Exception as exception:
+            with self.condition:
+                entry.state, entry.error = STATE_FAILED, str(exception)
+                self.condition.notify_all()
+            return
+
+        with self.condition:
+            if self.entries.get(predictorId) is not entry:
+                evicted = [predictor]   # the entry has been evicted during the warm up
+            else:
+                entry.spare, entry.state, entry.error = predictor, STATE_WARM, None
+                entry.memory = predictor.memorySize()
+                entry.warmUpTime = time.perf_counter() - start
+                evicted = self._evict(predictorId)
+            self.condition.notify_all()
+        for spare in evicted:
+            spare.release()
+
+    def _evict(self, keep):
+        # removes least recently used warm entries until the pool is within its limits,
+        # entries whose spare is in use by a session are skipped until they got a new spare
+        evicted = []
+        while True:
+            warm = [predictorId for predictorId, entry in self.entries.items() if entry.state == STATE_WARM]
+            memory = sum(self.entries[predictorId].memory for predictorId in warm)
+            candidates = [predictorId for predictorId in warm
+                          if predictorId != keep and self.entries[predictorId].spare is not None]
+            if not candidates or (len(warm) <= self.maxSize and memory <= self.memoryBudget):
+                return evicted
+            evicted.append(self.entries.pop(candidates[0]).spare)
+
+    def getStatus(self):
+        """returns the state of every available predictor.
+
+        Returns
+        -------
+        list
+            a dictionary per predictor with its id, its state (``'cold'``,
+            ``'warming'``, ``'warm'`` or ``'failed'``), the bytes it holds,
+            the duration of its last warm up and the error of a failed warm up
+        """
+        with self.condition:
+            status = []
+            for elem in self.predList:
+                entry = self.entries.get(elem['id'])
+                if entry is None:
+                    status.append({'id': elem['id'], 'displayname': elem['displayname'], 'state': STATE_COLD,
+                                   'memory': 0, 'warmUpTime': None, 'error': None})
+                else:
+                    status.append({'id': elem['id'], 'displayname': elem['displayname'], 'state': entry.state,
+                                   'memory': entry.memory, 'warmUpTime': entry.warmUpTime, 'error': entry.error})
+            return status
+
+    def isReady(self):
+        """checks whether all preloaded predictors are warm.
+
+        Returns
+        -------
+        bool
+            True once every predictor of ``preload`` has been warmed up
+        """
+        with self.condition:
+            return all(predictorId in self.entries and self.entries[predictorId].state == STATE_WARM
+                       for predictorId in self.preload)
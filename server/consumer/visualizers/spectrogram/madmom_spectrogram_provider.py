@@ -1,26 +1,22 @@
-"""This module implements a consumer which takes audio input
-chunks and computes the corresponding spectrogram for
-visual representation. It takes audio chunks from the shared
-memory in ``AudioTaggerManager`` based on the global timing
-variable ``tGroundTruth``.
-Due to performance issues, the computations are cached and only the
-audio chunk indicated by ``tGroundTruth`` is computed newly by a
-separate Thread (SlidingWindowThread). Finally, this produces a cached spectrogram as a
-sliding window over time.
+"""This module implements a consumer which takes the spectrogram
+columns of incoming audio chunks and assembles them for
+visual representation. The columns are computed once by the shared
+feature extraction stage of ``AudioTaggerManager`` and read from its
+feature ring.
+Due to performance issues, the spectrogram is cached and only the
+newest column is appended by a separate Thread (VisualisationThread).
+Finally, this produces a cached spectrogram as a sliding window over time.
 Finally the method ``onNewVisualisationCalculated(spec)`` informs the ``AudioTaggerManager``
 that a new spectrogram is available.
 """
 import time
-import numpy as np
 
 from threading import Thread, Event
 
-from madmom.audio.signal import SignalProcessor, FramedSignalProcessor
-from madmom.audio.spectrogram import SpectrogramProcessor, LogarithmicFilteredSpectrogramProcessor
-from madmom.audio.filters import LogFilterbank
-from madmom.processors import SequentialProcessor
-
-from server.config.config import BUFFER_SIZE
+from server.config.config import SPEC_NUM_BINS, SLIDING_WINDOW_SIZE, CONSUMER_MAX_LAG, \
+    CONSUMER_LAG_POLICY, CONSUMER_WAIT_TIMEOUT
+from server.buffers.sliding_window import SlidingWindow
+from server.buffers.read_cursor import ReadCursor
 from server.consumer.visualizers.visualisation_contract import VisualisationContract
 
 
@@ -34,6 +30,8 @@ class VisualisationThread(Thread):
        ----------
        provider : VisualisationContract
            reference to the visualizer the thread belongs to
+       subscription : Subscription
+           wake-up channel of the thread for new spectrogram columns
        _stopevent : threading.Event
            indicator for stopping a thread loop
 
@@ -55,20 +53,25 @@ class VisualisationThread(Thread):
             the name of the thread
         """
         self.provider = provider
+        self.subscription = provider.manager.featureNotifier.subscribe()
         self._stopevent = Event()
         Thread.__init__(self, name=name)
 
     def run(self):
-        """Periodically computes sliding windows. At the end
-        of each iteration, the manager is informed that a new
+        """Periodically computes sliding windows. Whenever new columns
+        have been appended, the manager is informed that a new
         spectrogram has been computed.
         """
+        window = self.provider.sliding_window
         while not self._stopevent.isSet():
             if len(self.provider.manager.sharedMemory) > 0: # start consuming once the producer has started
+                head = window.head
                 spec = self.provider.computeSpectrogram()
-                self.provider.manager.onNewVisualisationCalculated(spec)
-            with self.provider.condition:
-                self.provider.condition.wait()
+                # wake-ups without new columns (e.g. timeouts after the audio file ended) keep the current version
+                if window.head != head:
+                    # the column count allows clients to fetch only the new columns
+                    self.provider.manager.onNewVisualisationCalculated(spec, window.head)
+            self.subscription.wait(self.provider.cursor.position, CONSUMER_WAIT_TIMEOUT)
 
     def join(self, timeout=None):
         """Stops the thread.
@@ -84,65 +87,61 @@ class VisualisationThread(Thread):
 
         """
         self._stopevent.set()
+        self.subscription.cancel()
         Thread.join(self, timeout)
 
 
 class MadmomSpectrogramProvider(VisualisationContract):
     """
     Implementation of a VisualisationContract. This class
-    computes new spectrograms based on the most current
-    audio chunks which is indicated via ``tGroundTruth``.
+    assembles new spectrograms from the most current
+    spectrogram columns published to the feature ring.
 
     Attributes
     ----------
-    sig_proc : madmom.Processor
-        processor which outputs sampled audio signals
-    fsig_proc : madmom.Processor
-        processor which produces overlapping frames based on sampled signals
-    spec_proc : madmom.Processor
-        processor which computes a spectrogram with stft based on framed signals
-    filt_proc : madmom.Processor
-        processor which filters and scales a spectrogram
-    processorPipeline : SequentialProcessor
-        creates pipeline of elements of type madmom.Processor
-    sliding_window : 2d numpy array
-        cache for previously calculated spectrograms
-    lastProceededGroundTruth : int
-        variable to keep track of the last processed audio chunk
+    sliding_window : SlidingWindow
+        circular cache for previously calculated spectrograms
+    cursor : ReadCursor
+        read position of the consumer in the feature ring
     visThread:
         reference pointing to the sliding window thread
 
     Methods
     -------
+    registerManager()
+       set reference to the audio tagger manager and open a cursor on its feature ring.
     start()
        starts all necessary sub tasks of this visualizer.
     stop()
        stops all necessary sub tasks of this visualizer.
     computeSpectrogram()
-       compute a spectrogram based on the most current audio chunk.
+       update the spectrogram with all new spectrogram columns.
     """
 
-    # madmom pipeline for spectrogram calculation
-    sig_proc = SignalProcessor(num_channels=1, sample_rate=32000, norm=True)
-    fsig_proc = FramedSignalProcessor(frame_size=1024, hop_size=128, origin='future')
-    spec_proc = SpectrogramProcessor(frame_size=1024)
-    filt_proc = LogarithmicFilteredSpectrogramProcessor(filterbank=LogFilterbank, num_bands=26, fmin=20, fmax=14000)
-    processorPipeline = SequentialProcessor([sig_proc, fsig_proc, spec_proc, filt_proc])
-
-    def __init__(self, condition):
+    def __init__(self):
         """
         Parameters
         ----------
-        sliding_window : 2d numpy array
-           cache for previously calculated spectrograms
-        lastProceededGroundTruth : int
-           variable to keep track of the last processed audio chunk
+        sliding_window : SlidingWindow
+           circular cache for previously calculated spectrograms
         """
 
         # sliding window as cache
-        self.sliding_window = np.zeros((128, 256), dtype=np.float32)
-        self.lastProceededGroundTruth = None
-        self.condition = condition
+        self.sliding_window = SlidingWindow(SPEC_NUM_BINS, SLIDING_WINDOW_SIZE)
+        self.cursor = None
+
+    def registerManager(self, manager):
+        """set reference to the audio tagger manager and open a
+        cursor on its feature ring.
+
+        Parameters
+        ----------
+        manager : AudioTaggerManager
+            reference to the audio tagger manager object
+
+        """
+        VisualisationContract.registerManager(self, manager)
+        self.cursor = ReadCursor(manager.featureRing, CONSUMER_MAX_LAG, CONSUMER_LAG_POLICY)
 
     def start(self):
         """Start all sub tasks necessary for continuous spectrograms.
@@ -156,32 +155,18 @@ class MadmomSpectrogramProvider(VisualisationContract):
         self.visThread.join()
 
     def computeSpectrogram(self):
-        """This methods first access the global time variable ``tGroundTruth``
-        and reads audio chunk the time variable points to. Afterwards, the defined
-        madmom pipeline is processed to get the spectrogram representation of the
-        single chunk. Finally, the sliding window is updated with the new audio chunk
-        and a copy of the sliding window is returned to the calling thread.
+        """This methods reads all spectrogram columns between the cursor of
+        the consumer and the head of the feature ring of ``AudioTaggerManager``.
+        The columns have already been computed by the shared feature extraction
+        stage. Finally, the sliding window is updated with the new columns and a
+        copy of the sliding window is returned to the calling thread.
 
         Returns
         -------
         sliding_window : 2d numpy array of float values
             returns a copy of the current sliding window spectrogram
         """
-        # if thread faster than producer, do not consume same chunk multiple times
-        t = self.manager.tGroundTruth
-        if t != self.lastProceededGroundTruth:
-            frame = self.manager.sharedMemory[(t - 1) % BUFFER_SIZE]   # modulo avoids index under/overflow
-            frame = np.fromstring(frame, np.int16)
-            spectrogram = self.processorPipeline.process(frame)
-
-            frame = spectrogram[0]
-            if np.any(np.isnan(frame)):
-                frame = np.zeros_like(frame, dtype=np.float32)
-
-            # update sliding window
-            self.sliding_window[:, 0:-1] = self.sliding_window[:, 1::]
-            self.sliding_window[:, -1] = frame
-
-            self.lastProceededGroundTruth = t
+        # if thread falls behind, all missed columns are appended at once
+        self.sliding_window.extend(self.cursor.readPending())
 
-        return self.sliding_window.copy()
+        return self.sliding_window.snapshot()
@@ -0,0 +1,5 @@
+"""This package contains the feature extraction stage of the
+backend which turns audio chunks into spectrogram columns once
+and shares them with all consumers.
+
+"""
@@ -0,0 +1,55 @@
+"""This module implements the ring buffer which holds the spectrogram
+columns computed by the shared feature extraction stage.
+
+Every column is stored together with a monotonically increasing sequence
+number. Consumers remember the sequence number of the last column they
+have processed and can therefore tell exactly which columns are new.
+
+"""
+import numpy as np
+
+from server.buffers.ring_buffer import SequenceRingBuffer
+
+
+class FeatureRing(SequenceRingBuffer):
+    """
+    Ring buffer of spectrogram columns indexed by sequence numbers.
+
+    Methods
+    -------
+    get(seq)
+        returns a copy of the column with sequence number ``seq``.
+    """
+    def __init__(self, size, nBins, storage=None):
+        """
+        Parameters
+        ----------
+        size : int
+            maximum number of columns kept in the ring buffer
+        nBins : int
+            number of frequency bins per spectrogram column
+        storage : SharedRingMemory
+            shared memory holding the ring buffer, None allocates private memory
+        """
+        SequenceRingBuffer.__init__(self, size, nBins, np.float32, storage)
+
+    def get(self, seq):
+        """returns a copy of the column with sequence number ``seq``.
+
+        Parameters
+        ----------
+        seq : int
+            sequence number of the requested column
+
+        Returns
+        -------
+        1d numpy array of float values
+            copy of the requested spectrogram column
+
+        Raises
+        ------
+        IndexError
+            if the column has not been written yet or was already overwritten
+        """
+        with self.lock:
+            return self.view(seq).copy()
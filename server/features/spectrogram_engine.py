@@ -0,0 +1,190 @@
+"""This module implements a NumPy-native spectrogram front end which
+replaces the per-chunk madmom processor chain.
+
+The madmom pipeline (SignalProcessor, FramedSignalProcessor,
+SpectrogramProcessor and LogarithmicFilteredSpectrogramProcessor) builds
+several Python objects for every single chunk just to compute one
+spectrogram column. ``SpectrogramEngine`` precomputes the scaled window and
+the dense ``LogFilterbank`` matrix once and transforms any number of chunks
+with a single batched ``rfft`` and a single matrix multiplication. Its
+output matches the madmom pipeline within ``MADMOM_TOLERANCE``, which is
+checked with ``compareWithMadmom()`` by ``tests/test_spectrogram_engine.py``;
+running this module prints the deviation and the speedup on random audio.
+madmom is only needed to build the filterbank, so it is imported when the
+first engine is created and the live sessions of a process share a single
+engine (``sharedEngine()``).
+
+"""
+import time
+import numpy as np
+
+from functools import lru_cache
+
+from server.config.config import SAMPLE_RATE, N_CHANNELS, CHUNK_SIZE, SPEC_FRAME_SIZE, SPEC_HOP_SIZE, \
+    SPEC_NUM_BANDS, SPEC_FMIN, SPEC_FMAX
+
+# maximum deviation from the madmom pipeline tolerated by compareWithMadmom()
+MADMOM_TOLERANCE = 1e-4
+
+
+class SpectrogramEngine:
+    """
+    Batched spectrogram computation of audio chunks. Every chunk
+    contributes the log-filtered magnitude spectrum of its first frame,
+    just like the first column of the madmom pipeline.
+
+    Attributes
+    ----------
+    frameSize : int
+        number of samples of the analysed frame of each chunk
+    window : 1d numpy array of float values
+        hann window scaled to the range of 16 bit samples
+    filterbank : 2d numpy array of float values
+        dense logarithmic filterbank of shape ``(frameSize // 2, nBins)``
+    nBins : int
+        number of frequency bins of a spectrogram column
+
+    Methods
+    -------
+    process(chunks, out)
+        computes the spectrogram columns of a batch of audio chunks.
+    """
+    def __init__(self, sampleRate=SAMPLE_RATE, frameSize=SPEC_FRAME_SIZE, numBands=SPEC_NUM_BANDS,
+                 fmin=SPEC_FMIN, fmax=SPEC_FMAX):
+        """
+        Parameters
+        ----------
+        sampleRate : int
+            sample rate of the audio chunks
+        frameSize : int
+            number of samples of the analysed frame of each chunk
+        numBands : int
+            number of filterbank bands per octave
+        fmin : float
+            minimum frequency of the filterbank
+        fmax : float
+            maximum frequency of the filterbank
+        """
+        from madmom.audio.filters import LogFilterbank
+        from madmom.audio.stft import fft_frequencies
+
+        self.frameSize = frameSize
+        # madmom scales the window if the signal is given as 16 bit integers
+        self.window = (np.hanning(frameSize) / np.iinfo(np.int16).max).astype(np.float32)
+        binFrequencies = fft_frequencies(frameSize >> 1, sampleRate)
+        self.filterbank = np.asarray(LogFilterbank(binFrequencies, num_bands=numBands, fmin=fmin, fmax=fmax,
+                                                   norm_filters=True, unique_filters=True), dtype=np.float32)
+        self.nBins = self.filterbank.shape[1]
+
+    def process(self, chunks, out=None):
+        """computes the spectrogram columns of a batch of audio chunks.
+
+        Each chunk is normalized to the full 16 bit range (like
+        ``SignalProcessor(norm=True)``), windowed and transformed. Silent
+        chunks result in columns of zeros.
+
+        Parameters
+        ----------
+        chunks : 2d numpy array of int16 values
+            audio chunks stacked along the first axis
+        out : 2d numpy array of float values
+            optional preallocated array of shape ``(len(chunks), nBins)``
+
+        Returns
+        -------
+        2d numpy array of float values
+            one spectrogram column per chunk
+        """
+        chunks = np.atleast_2d(chunks)
+        frames = np.zeros((len(chunks), self.frameSize), dtype=np.float32)
+        n = min(self.frameSize, chunks.shape[1])
+        frames[:, :n] = chunks[:, :n]
+
+        # normalization is done per chunk, truncation mimics madmom's int16 cast
+        peak = np.abs(chunks.astype(np.int32)).max(axis=1, keepdims=True).astype(np.float32)
+        silent = peak[:, 0] == 0
+        peak[silent] = 1
+        frames *= np.iinfo(np.int16).max / peak
+        np.trunc(frames, out=frames)
+        frames *= self.window
+
+        magnitudes = np.abs(np.fft.rfft(frames, axis=1)[:, :self.frameSize >> 1]).astype(np.float32)
+        columns = np.dot(magnitudes, self.filterbank, out=out)
+        np.log10(columns + 1, out=columns)
+        columns[silent] = 0
+        return columns
+
+
+@lru_cache(maxsize=None)
+def sharedEngine():
+    """Returns the engine shared by all spectrogram stages of the process.
+    It is created on first use.
+
+    Returns
+    -------
+    SpectrogramEngine
+        engine with the spectrogram settings of config.py
+    """
+    return SpectrogramEngine()
+
+
+def madmomPipeline():
+    """Builds the original madmom pipeline the engine replaces.
+
+    Returns
+    -------
+    SequentialProcessor
+        madmom pipeline computing a log-filtered spectrogram of a chunk
+    """
+    from madmom.audio.signal import SignalProcessor, FramedSignalProcessor
+    from madmom.audio.spectrogram import SpectrogramProcessor, LogarithmicFilteredSpectrogramProcessor
+    from madmom.processors import SequentialProcessor
+    from madmom.audio.filters import LogFilterbank
+
+    return SequentialProcessor([
+        SignalProcessor(num_channels=N_CHANNELS, sample_rate=SAMPLE_RATE, norm=True),
+        FramedSignalProcessor(frame_size=SPEC_FRAME_SIZE, hop_size=SPEC_HOP_SIZE, origin='future'),
+        SpectrogramProcessor(frame_size=SPEC_FRAME_SIZE),
+        LogarithmicFilteredSpectrogramProcessor(filterbank=LogFilterbank, num_bands=SPEC_NUM_BANDS,
+                                                fmin=SPEC_FMIN, fmax=SPEC_FMAX)])
+
+
+def compareWithMadmom(engine, chunks):
+    """Computes the spectrogram columns of ``chunks`` with the engine
+    and with the original madmom pipeline and returns the maximum absolute
+    deviation.
+
+    Parameters
+    ----------
+    engine : SpectrogramEngine
+        the engine to be checked
+    chunks : 2d numpy array of int16 values
+        audio chunks stacked along the first axis
+
+    Returns
+    -------
+    float
+        maximum absolute deviation between both outputs
+    """
+    processorPipeline = madmomPipeline()
+    reference = np.stack([processorPipeline.process(chunk)[0] for chunk in chunks])
+    return float(np.abs(engine.process(chunks) - reference).max())
+
+
+if __name__ == '__main__':
+    engine = SpectrogramEngine()
+    chunks = (np.random.randn(256, CHUNK_SIZE) * 3000).astype(np.int16)
+
+    deviation = compareWithMadmom(engine, chunks)
+    print('max deviation from madmom: {:.2e} (tolerance {:.0e})'.format(deviation, MADMOM_TOLERANCE))
+
+    processorPipeline = madmomPipeline()
+    start = time.perf_counter()
+    for chunk in chunks:
+        processorPipeline.process(chunk)
+    madmomTime = time.perf_counter() - start
+    start = time.perf_counter()
+    engine.process(chunks)
+    engineTime = time.perf_counter() - start
+    print('per column: madmom {:.1f} us, engine {:.1f} us'.format(madmomTime / len(chunks) * 1e6,
+                                                                   engineTime / len(chunks) * 1e6))
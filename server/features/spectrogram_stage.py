@@ -0,0 +1,155 @@
+"""This module implements the feature extraction stage owned by
+``AudioTaggerManager``. It reads all audio chunks up to the global
+timing variable ``tGroundTruth`` from the shared memory which it has not
+processed yet, computes their spectrogram columns exactly once in a single
+batch (see ``SpectrogramEngine``) and publishes them to the feature ring
+(see ``FeatureRing``). Visualizers and predictors only read columns from
+that ring, so the STFT and filterbank cost is paid once per chunk no
+matter how many consumers are registered.
+
+The stage waits on its own subscription of the chunk notifier of the
+manager. Once new columns are published, the head of the feature ring is
+published by the feature notifier of the manager, which wakes up the consumers.
+"""
+from threading import Thread, Event
+
+from server.config.config import BUFFER_SIZE, CONSUMER_WAIT_TIMEOUT
+from server.buffers.read_cursor import ReadCursor
+from server.features.spectrogram_engine import sharedEngine
+
+
+class FeatureExtractionThread(Thread):
+    """
+    Thread for processing new audio chunks into spectrogram
+    columns which are published to the feature ring.
+
+    Attributes
+    ----------
+    stage : SpectrogramStage
+        reference to the feature extraction stage the thread belongs to
+    subscription : Subscription
+        wake-up channel of the thread for new audio chunks
+    _stopevent : threading.Event
+        indicator for stopping a thread loop
+
+    Methods
+    -------
+    run()
+        method triggered when start() method is called.
+
+    join()
+        sends stop signal to thread.
+    """
+    def __init__(self, stage, name='FeatureExtractionThread'):
+        """
+        Parameters
+        ----------
+        stage : SpectrogramStage
+            reference to the feature extraction stage the thread belongs to
+        name : str
+            the name of the thread
+        """
+        self.stage = stage
+        self.subscription = stage.manager.chunkNotifier.subscribe()
+        self._stopevent = Event()
+        Thread.__init__(self, name=name)
+
+    def run(self):
+        """Periodically computes spectrogram columns of new audio chunks and
+        informs all consumers once a new column has been published.
+        """
+        manager = self.stage.manager
+        while not self._stopevent.isSet():
+            if len(manager.sharedMemory) > 0 and self.stage.computeSpectrogram():  # start once the producer has started
+                manager.featureNotifier.publish(manager.featureRing.head)
+            self.subscription.wait(self.stage.cursor.position, CONSUMER_WAIT_TIMEOUT)
+
+    def join(self, timeout=None):
+        """Stops the thread.
+
+        This method tries to stop a thread. When timeout has passed
+        and the thread could not be stopped yet, the program continues.
+        If timeout is set to None, join blocks until the thread is stopped.
+
+        Parameters
+        ----------
+        timeout : float
+            a timeout value in seconds
+
+        """
+        self._stopevent.set()
+        self.subscription.cancel()
+        Thread.join(self, timeout)
+
+
+class SpectrogramStage:
+    """
+    Shared spectrogram front end which computes each audio chunk's
+    spectrogram column once for all consumers.
+
+    Attributes
+    ----------
+    engine : SpectrogramEngine
+        batched spectrogram computation shared by all stages
+    manager : AudioTaggerManager
+        reference to the audio tagger manager owning the stage
+    cursor : ReadCursor
+        read position of the stage in shared memory
+    featureThread:
+        reference pointing to the feature extraction thread
+
+    Methods
+    -------
+    start()
+       starts the feature extraction thread.
+    stop()
+       stops the feature extraction thread.
+    computeSpectrogram()
+       compute the spectrogram columns of all new audio chunks.
+    """
+    def __init__(self, manager):
+        """
+        Parameters
+        ----------
+        manager : AudioTaggerManager
+            reference to the audio tagger manager owning the stage
+        """
+        self.manager = manager
+        # the batched engine is cheap enough to always catch up on every buffered chunk
+        self.cursor = ReadCursor(manager.sharedMemory, BUFFER_SIZE)
+
+    @property
+    def engine(self):
+        # created on first use instead of on import of this module
+        return sharedEngine()
+
+    def start(self):
+        """Start the feature extraction thread.
+        """
+        self.featureThread = FeatureExtractionThread(self)
+        self.featureThread.start()
+
+    def stop(self):
+        """Stops the feature extraction thread.
+        """
+        self.featureThread.join()
+
+    def computeSpectrogram(self):
+        """This methods reads all audio chunks from shared memory between the
+        cursor of the stage and the global time variable ``tGroundTruth``. Afterwards, the spectrogram columns of these chunks are
+        computed in a single batch. Finally, the columns are published to the
+        feature ring.
+
+        Returns
+        -------
+        bool
+            True if new columns have been published, False if all
+            audio chunks have already been processed
+        """
+        chunks = self.cursor.readPending()
+        # if thread faster than producer, do not process same chunk multiple times
+        if len(chunks) == 0:
+            return False
+
+        self.manager.featureRing.putMany(self.engine.process(chunks))
+        return True
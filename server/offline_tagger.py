@@ -0,0 +1,192 @@
+"""This module implements an offline mode which tags whole audio files
+faster than real time.
+
+In contrast to ``AudiofileThread``, the audio file is neither played back nor
+paced by an audio device. The WAV file is decoded with ``wave`` block by
+block, the spectrogram columns are computed by the same ``SpectrogramEngine``
+as in the live pipeline and the sliding windows are sent into the predictor in
+batches. The result is a timeline of class probabilities with one entry every
+``hop`` seconds, where each entry refers to the window ending at the given time.
+Like the live pipeline, the sliding window starts filled with zeros.
+
+The module can be used from the command line on headless machines, e.g.:
+
+```bash
+python server/offline_tagger.py server/files/trumpet.wav --hop 0.5 --output trumpet.csv
+```
+
+"""
+import os
+import csv
+import json
+import wave
+import argparse
+import numpy as np
+
+from pydoc import locate
+
+from server.config.config import CHUNK_SIZE, SAMPLE_RATE, N_CHANNELS, START_PREDICTOR, SLIDING_WINDOW_SIZE, \
+    OFFLINE_PREDICTION_HOP, OFFLINE_BATCH_SIZE, OFFLINE_READ_CHUNKS
+from server.config.load_config import loadPredictors
+from server.features.spectrogram_engine import SpectrogramEngine
+
+
+class OfflineTagger:
+    """
+    Tags audio files without playback as fast as the CPU allows.
+
+    Attributes
+    ----------
+    predictor : PredictorContract
+        predictor providing ``predictBatch(windows)`` and ``classes``
+    engine : SpectrogramEngine
+        batched spectrogram computation of audio chunks
+    batchSize : int
+        number of windows per forward pass
+
+    Methods
+    -------
+    tagFile(filePath, hop)
+        computes the prediction timeline of a WAV file.
+    """
+    def __init__(self, predictor, engine=None, batchSize=OFFLINE_BATCH_SIZE):
+        """
+        Parameters
+        ----------
+        predictor : PredictorContract
+            predictor providing ``predictBatch(windows)`` and ``classes``
+        engine : SpectrogramEngine
+            batched spectrogram computation, a new one is created if None
+        batchSize : int
+            number of windows per forward pass
+        """
+        if not hasattr(predictor, 'predictBatch'):
+            raise ValueError('{} does not support offline prediction'.format(type(predictor).__name__))
+        self.predictor = predictor
+        self.engine = SpectrogramEngine() if engine is None else engine
+        self.batchSize = batchSize
+
+    def tagFile(self, filePath, hop=OFFLINE_PREDICTION_HOP):
+        """computes the prediction timeline of a WAV file.
+
+        Parameters
+        ----------
+        filePath : str
+            path to a 16 bit WAV file with the configured sample rate and channels
+        hop : float
+            seconds between two predictions, rounded to whole audio chunks
+
+        Returns
+        -------
+        list of tuple (float, 1d numpy array of float values)
+            time in seconds of the end of each window and its class probabilities.
+            The end of the file is always included.
+
+        Raises
+        ------
+        ValueError
+            if the format of the WAV file does not match the backend configuration
+        """
+        hopChunks = max(1, int(round(hop * SAMPLE_RATE / CHUNK_SIZE)))
+        timeline = []
+        windows, times = [], []
+
+        # the last SLIDING_WINDOW_SIZE columns, initially silent like the live sliding window
+        history = np.zeros((SLIDING_WINDOW_SIZE, self.engine.nBins), dtype=np.float32)
+        t = 0
+        for columns in self._readColumns(filePath):
+            block = np.concatenate([history, columns])
+            ends = np.flatnonzero((t + np.arange(1, len(columns) + 1)) % hopChunks == 0)
+            for i in ends:
+                windows.append(block[i + 1:i + 1 + SLIDING_WINDOW_SIZE].T)
+                times.append((t + i + 1) * CHUNK_SIZE / SAMPLE_RATE)
+                if len(windows) == self.batchSize:
+                    self._flush(windows, times, timeline)
+            history = block[-SLIDING_WINDOW_SIZE:]
+            t += len(columns)
+
+        if t % hopChunks != 0:
+            windows.append(history.T)
+            times.append(t * CHUNK_SIZE / SAMPLE_RATE)
+        self._flush(windows, times, timeline)
+        return timeline
+
+    def _flush(self, windows, times, timeline):
+        if windows:
+            probabilities = self.predictor.predictBatch(np.stack(windows))
+            timeline.extend(zip(times, probabilities))
+            del windows[:], times[:]
+
+    def _readColumns(self, filePath):
+        wf = wave.open(filePath, 'rb')
+        try:
+            if wf.getsampwidth() != 2 or wf.getnchannels() != N_CHANNELS or wf.getframerate() != SAMPLE_RATE:
+                raise ValueError('{} must be 16 bit with {} channel(s) at {} Hz'.format(filePath, N_CHANNELS,
+                                                                                         SAMPLE_RATE))
+            chunkSamples = CHUNK_SIZE * N_CHANNELS
+            data = wf.readframes(CHUNK_SIZE * OFFLINE_READ_CHUNKS)
+            while data != b'':
+                samples = np.frombuffer(data, dtype=np.int16)
+                nChunks = -(-len(samples) // chunkSamples)
+                chunks = np.zeros((nChunks, chunkSamples), dtype=np.int16)     # last chunk padded with zeros
+                chunks.reshape(-1)[:len(samples)] = samples
+                yield self.engine.process(chunks)
+                data = wf.readframes(CHUNK_SIZE * OFFLINE_READ_CHUNKS)
+        finally:
+            wf.close()
+
+
+def loadOfflinePredictor(predictorId=START_PREDICTOR):
+    """Creates the predictor listed in ``predictors.csv`` with the given id
+    without starting its threads.
+
+    Parameters
+    ----------
+    predictorId : int
+        id of the predictor in ``predictors.csv``
+
+    Returns
+    -------
+    PredictorContract
+        the predictor object
+    """
+    predictorClassPath = [elem['predictorClassPath'] for elem in loadPredictors() if elem['id'] == predictorId][0]
+    predictorClass = locate('server.consumer.predictors.{}'.format(predictorClassPath))
+    return predictorClass()
+
+
+def writeTimeline(timeline, classes, outputPath):
+    """Writes a prediction timeline to a CSV file (delimiter ``;``) or,
+    if the path ends with ``.json``, to a JSON file.
+
+    Parameters
+    ----------
+    timeline : list of tuple (float, 1d numpy array of float values)
+        the timeline as returned by ``OfflineTagger.tagFile()``
+    classes : list of str
+        class names in the order of the predicted probabilities
+    outputPath : str
+        path of the output file
+    """
+    with open(outputPath, 'w', newline='') as file:
+        if outputPath.endswith('.json'):
+            json.dump([{'time': time, 'probabilities': dict(zip(classes, probs.tolist()))}
+                       for time, probs in timeline], file)
+        else:
+            csvWriter = csv.writer(file, delimiter=';')
+            csvWriter.writerow(['time'] + list(classes))
+            for time, probs in timeline:
+                csvWriter.writerow(['{:.3f}'.format(time)] + ['{:.6f}'.format(p) for p in probs])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tag a WAV file faster than real time without playback.')
+    parser.add_argument('file', help='path to the WAV file')
+    parser.add_argument('--hop', type=float, default=OFFLINE_PREDICTION_HOP, help='seconds between predictions')
+    parser.add_argument('--predictor', type=int, default=int(START_PREDICTOR), help='id of the predictor')
+    parser.add_argument('--output', help='CSV or JSON output file, defaults to <file>.csv')
+    args = parser.parse_args()
+
+    predictor = loadOfflinePredictor(args.predictor)
+    timeline = OfflineTagger(predictor).tagFile(args.file, args.hop)
+    writeTimeline(timeline, predictor.classes, args.output or os.path.splitext(args.file)[0] + '.csv')
@@ -0,0 +1,4 @@
+"""This package contains the rendering of spectrograms into images
+which are served by the web server.
+
+"""
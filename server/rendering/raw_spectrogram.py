@@ -0,0 +1,64 @@
+"""This module implements the raw encoding of spectrogram columns for
+clients which apply the colormap themselves.
+
+The columns are sent column by column (time-major), i.e. as a C-ordered
+array of shape ``(nColumns, nBins)`` with the lowest frequency bin first, so
+a client can append incremental updates to its own sliding window without
+reordering. Two data types are available:
+
+-   ``uint8``: the color index of the viewer's colormap, computed like in
+    ``convertSpecToJPG()``: ``clip(value * 256 / 3, 0, 255)``
+-   ``float16``: the spectrogram values in little-endian half precision
+
+A full window of 128 bins and 256 columns takes 32 KB as ``uint8``.
+
+"""
+import numpy as np
+
+RAW_FORMATS = ['uint8', 'float16']
+
+# factor mapping spectrogram values to the 256 colors of the colormap
+COLOR_SCALE = 256 / 3.0
+
+
+def quantizeSpec(spec):
+    """Maps spectrogram values to the color indices of the colormap.
+
+    Parameters
+    ----------
+    spec : 2d numpy array of float values
+        the spectrogram
+
+    Returns
+    -------
+    2d numpy array of uint8 values
+        the color indices, values outside the colormap get the first and last color
+    """
+    return np.clip(spec * COLOR_SCALE, 0, 255).astype(np.uint8)
+
+
+def encodeColumns(columns, dtype='uint8'):
+    """Encodes spectrogram columns in one of the ``RAW_FORMATS``.
+
+    Parameters
+    ----------
+    columns : 2d numpy array of float values
+        the columns of shape ``(nBins, nColumns)``
+    dtype : str
+        one of ``RAW_FORMATS``
+
+    Returns
+    -------
+    bytes
+        the time-major columns of shape ``(nColumns, nBins)``
+
+    Raises
+    ------
+    ValueError
+        if the data type is unknown
+    """
+    if dtype == 'uint8':
+        return quantizeSpec(columns.T).tobytes()
+    if dtype == 'float16':
+        return columns.T.astype('<f2').tobytes()
+    raise ValueError('unsupported spectrogram format: {}'.format(dtype))
@@ -0,0 +1,174 @@
+"""This module implements the rendering of spectrograms into JPEG images
+and a cache of the rendered images.
+
+Every new spectrogram of a session gets a version number. A rendition,
+i.e. a JPEG of a certain version, scale and quality, is computed once and
+kept in a bounded LRU cache, so any number of clients polling the same
+spectrogram only cost a cache lookup. The colormap is applied with a
+precomputed uint8 lookup table of viridis instead of the float RGBA
+expansion of matplotlib; the resulting pixels are the same. Each rendition
+has an ETag, which lets clients skip unchanged frames entirely (HTTP 304).
+OpenCV and matplotlib are imported with the first rendition, so importing the
+web server stays fast.
+
+"""
+import os
+import numpy as np
+
+from functools import lru_cache
+from collections import OrderedDict
+from threading import Lock
+
+from server.config.config import RENDER_SCALE, RENDER_JPEG_QUALITY, RENDER_CACHE_SIZE
+
+
+@lru_cache(maxsize=None)
+def viridisLUT():
+    """Builds the lookup table of the viridis colormap once.
+
+    Returns
+    -------
+    2d numpy array of uint8 values
+        256 colors of shape ``(256, 3)`` in the channel order of ``plt.cm.viridis``
+    """
+    import matplotlib.pyplot as plt
+    return (plt.cm.viridis(np.arange(256))[:, 0:3] * 255).astype(np.uint8)
+
+
+def convertSpecToJPG(spec, scale=RENDER_SCALE, quality=RENDER_JPEG_QUALITY):
+    """Renders a spectrogram into a JPEG image with the viridis colormap,
+    low frequencies at the bottom.
+
+    Parameters
+    ----------
+    spec : 2d numpy array of float values
+        the spectrogram of shape ``(nBins, nColumns)``
+    scale : int
+        upscaling factor of the spectrogram
+    quality : int
+        JPEG quality between 0 and 100
+
+    Returns
+    -------
+    bytes
+        the encoded JPEG image
+    """
+    import cv2
+    spec = cv2.resize(spec.astype(np.float32) * (256 / 3.0), (spec.shape[1] * scale, spec.shape[0] * scale))
+    # same color indices as plt.cm.viridis, values outside [0, 1] get the first and last color
+    indices = np.clip(spec[::-1], 0, 255).astype(np.uint8)
+    spec_bgr = viridisLUT()[indices]
+    if spec_bgr.shape[1] < 512:
+        p = (512 - spec_bgr.shape[1]) // 2
+        spec_bgr = np.pad(spec_bgr, ((0, 0), (p, p), (0, 0)), mode="constant")
+    _, curImage = cv2.imencode('.jpg', spec_bgr, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    return curImage.tobytes()
+
+
+class RenderCache:
+    """
+    Bounded LRU cache of JPEG renditions of versioned spectrograms.
+
+    Attributes
+    ----------
+    maxSize : int
+        maximum number of cached renditions
+    renditions : OrderedDict
+        maps ``(key, version, scale, quality)`` to the JPEG and its ETag
+    token : str
+        random prefix of the ETags, so that ETags of a previous backend run never match
+    hits : int
+        number of requests served from the cache
+    misses : int
+        number of rendered images
+    lock : threading.Lock
+        guards the cache, renditions are computed under the lock so each is computed once
+
+    Methods
+    -------
+    render(key, version, spec, scale, quality)
+        returns the JPEG of a spectrogram version and its ETag.
+    getStats()
+        returns the number of cache hits and misses.
+    """
+    def __init__(self, maxSize=RENDER_CACHE_SIZE):
+        """
+        Parameters
+        ----------
+        maxSize : int
+            maximum number of cached renditions
+        """
+        self.maxSize = maxSize
+        self.renditions = OrderedDict()
+        self.token = os.urandom(4).hex()
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    def etag(self, key, version, scale=RENDER_SCALE, quality=RENDER_JPEG_QUALITY):
+        """returns the ETag of a rendition without rendering it.
+
+        Parameters
+        ----------
+        key : hashable
+            identifies the source of the spectrogram, e.g. the session id
+        version : int
+            version of the spectrogram
+        scale : int
+            upscaling factor of the spectrogram
+        quality : int
+            JPEG quality between 0 and 100
+
+        Returns
+        -------
+        str
+            the ETag
+        """
+        return '{}-{}-{}-{}x{}'.format(self.token, key, version, scale, quality)
+
+    def render(self, key, version, spec, scale=RENDER_SCALE, quality=RENDER_JPEG_QUALITY):
+        """returns the JPEG of a spectrogram version, which is only
+        rendered if it is not cached yet.
+
+        Parameters
+        ----------
+        key : hashable
+            identifies the source of the spectrogram, e.g. the session id
+        version : int
+            version of the spectrogram
+        spec : 2d numpy array of float values
+            the spectrogram of this version
+        scale : int
+            upscaling factor of the spectrogram
+        quality : int
+            JPEG quality between 0 and 100
+
+        Returns
+        -------
+        tuple (bytes, str)
+            the encoded JPEG image and its ETag
+        """
+        cacheKey = (key, version, scale, quality)
+        with self.lock:
+            if cacheKey in self.renditions:
+                self.renditions.move_to_end(cacheKey)
+                self.hits += 1
+                return self.renditions[cacheKey]
+
+            rendition = (convertSpecToJPG(spec, scale, quality), self.etag(key, version, scale, quality))
+            self.renditions[cacheKey] = rendition
+            self.misses += 1
+            if len(self.renditions) > self.maxSize:
+                self.renditions.popitem(last=False)
+            return rendition
+
+    def getStats(self):
+        """returns the number of cache hits and misses.
+
+        Returns
+        -------
+        dict
+            number of hits, misses and cached renditions
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.renditions)}
@@ -0,0 +1,226 @@
+"""This module implements the switching of the audio source and the
+predictor of a running session without a gap in its output.
+
+A ``SettingsSwitch`` runs in the background of a settings request. It is
+double buffered: the new producer opens its audio stream and the new predictor
+is taken warm from the predictor pool and started while the old ones keep
+delivering. The session switches over atomically once the new producer
+delivered its first chunk and the new predictor its first prediction
+(see ``AudioSession.putToSM()`` and ``AudioSession.onBoundPredictionCalculated()``),
+at the latest after ``SWITCH_PRIME_TIMEOUT`` seconds. Chunks and predictions of
+the old ones are dropped from then on and they are torn down afterwards.
+The switch reports its progress, so clients can poll it.
+
+"""
+import time
+
+from threading import Thread, Event
+
+from server.config.config import SWITCH_PRIME_TIMEOUT
+
+# states of a switch
+SWITCH_QUEUED = 'queued'
+SWITCH_RUNNING = 'running'
+SWITCH_TEARDOWN = 'teardown'
+SWITCH_DONE = 'done'
+SWITCH_FAILED = 'failed'
+
+# states of the producer and the predictor within a switch
+PART_UNCHANGED = 'unchanged'
+PART_PENDING = 'pending'
+PART_PRIMING = 'priming'
+PART_SWITCHED = 'switched'
+PART_FORCED = 'forced'      # switched after SWITCH_PRIME_TIMEOUT without a first result
+
+
+class PredictorBinding:
+    """
+    The session as seen by a predictor. It is registered as the manager of
+    the predictor and forwards everything to the session, except that
+    predictions are published only while the predictor is the active
+    predictor of the session.
+
+    Attributes
+    ----------
+    session : AudioSession
+        the session the predictor belongs to
+    predictor : PredictorContract
+        the predictor which is bound to the session
+    activated : threading.Event
+        set once the predictor became the active predictor of the session
+
+    Methods
+    -------
+    onNewPredictionCalculated(prob_dict)
+        hands a new prediction of the predictor to the session.
+    """
+    def __init__(self, session, predictor):
+        """
+        Parameters
+        ----------
+        session : AudioSession
+            the session the predictor belongs to
+        predictor : PredictorContract
+            the predictor which is bound to the session
+        """
+        self.session = session
+        self.predictor = predictor
+        self.activated = Event()
+
+    def __getattr__(self, name):
+        # the predictor reads feature ring, notifiers etc. of the session
+        return getattr(self.session, name)
+
+    def onNewPredictionCalculated(self, prob_dict):
+        """hands a new prediction of the predictor to the session.
+
+        Parameters
+        ----------
+        prob_dict : numpy array of list objects
+            holds the current class prediction object
+        """
+        self.session.onBoundPredictionCalculated(self, prob_dict)
+
+
+class SettingsSwitch(Thread):
+    """
+    Thread for switching a session to new settings.
+
+    Attributes
+    ----------
+    session : AudioSession
+        the session to be switched
+    switchId : int
+        id of the switch within the session
+    settings : dictionary
+        the new settings of the session
+    state : str
+        one of ``'queued'``, ``'running'``, ``'teardown'``, ``'done'`` or ``'failed'``
+    producer : str
+        progress of the new producer, one of ``'unchanged'``, ``'pending'``,
+        ``'priming'``, ``'switched'`` or ``'forced'``
+    predictor : str
+        progress of the new predictor, with the same states as ``producer``
+    created : float
+        time the switch has been requested
+    switchTime : float
+        seconds from the request until the session delivered the output of the new settings
+    error : str
+        message of the exception which made the switch fail
+
+    Methods
+    -------
+    run()
+        method triggered when start() method is called.
+    getStatus()
+        returns the progress of the switch.
+    """
+    def __init__(self, session, switchId, settings, name='SettingsSwitch'):
+        """
+        Parameters
+        ----------
+        session : AudioSession
+            the session to be switched
+        switchId : int
+            id of the switch within the session
+        settings : dictionary
+            a dictionary holding the a flag for microphone/audio file input
+            and IDs for the desired predictor and audio file, respectively.
+        name : str
+            the name of the thread
+        """
+        self.session = session
+        self.switchId = switchId
+        self.settings = dict(settings)
+        self.state = SWITCH_QUEUED
+        self.producer = PART_PENDING
+        self.predictor = PART_PENDING
+        self.created = time.perf_counter()
+        self.switchTime = None
+        self.error = None
+        Thread.__init__(self, name=name, daemon=True)
+
+    def run(self):
+        """Switches producer and predictor of the session one after another
+        and tears down the old ones. Switches of a session run in the order
+        of their requests.
+        """
+        with self.session.switchLock:
+            if self.session.closed:
+                self.state, self.error = SWITCH_FAILED, 'session has been closed'
+                return
+            self.state = SWITCH_RUNNING
+            retired = []
+            try:
+                # a new producer restarts the audio file even if it has not changed
+                retired.append(self.switchProducer())
+                self.session.settings = dict(self.session.settings, isLive=self.settings['isLive'],
+                                             file=self.settings['file'])
+                if self.settings['predictor'] != self.session.settings['predictor']:
+                    retired.append(self.switchPredictor())
+                    self.session.settings = dict(self.settings)
+                else:
+                    self.predictor = PART_UNCHANGED
+                self.switchTime = time.perf_counter() - self.created
+            except Exception as exception:
+                self.error = str(exception)
+
+            # the session does not use the old producer and predictor anymore
+            self.state = SWITCH_TEARDOWN
+            for stop in retired:
+                stop()
+            self.state = SWITCH_DONE if self.error is None else SWITCH_FAILED
+
+    def switchProducer(self):
+        # primes the new producer, which takes over with its first chunk
+        self.producer = PART_PRIMING
+        producer = self.session.manager.createProducer(self.session, self.settings)
+        old = self.session.producerThread
+        with self.session.producerLock:
+            self.session.pendingProducer = producer
+        producer.start()
+        if not producer.activated.wait(SWITCH_PRIME_TIMEOUT):
+            with self.session.producerLock:
+                if not producer.activated.is_set():
+                    self.session.activateProducer()
+                    self.producer = PART_FORCED
+        if self.producer != PART_FORCED:
+            self.producer = PART_SWITCHED
+        return old.join
+
+    def switchPredictor(self):
+        # starts the new predictor, which takes over with its first prediction
+        self.predictor = PART_PRIMING
+        predictor = self.session.manager.createPredictor(self.settings['predictor'])
+        binding = PredictorBinding(self.session, predictor)
+        predictor.registerManager(binding)
+        old = self.session.predProvider
+        with self.session.predictionLock:
+            self.session.pendingPredBinding = binding
+        try:
+            predictor.start()
+        except Exception:
+            with self.session.predictionLock:
+                self.session.pendingPredBinding = None
+            raise
+        if not binding.activated.wait(SWITCH_PRIME_TIMEOUT):
+            with self.session.predictionLock:
+                if not binding.activated.is_set():
+                    self.session.activatePredictor()
+                    self.predictor = PART_FORCED
+        if self.predictor != PART_FORCED:
+            self.predictor = PART_SWITCHED
+        return old.stop
+
+    def getStatus(self):
+        """returns the progress of the switch.
+
+        Returns
+        -------
+        dict
+            a dictionary in the following format:
+            ``{"id": 3, "state": "done", "producer": "switched", "predictor": "unchanged",
+            "settings": {"isLive": 0, "file": 1, "predictor": 0}, "switchTime": 0.05, "error": null}``
+        """
+        return {'id': self.switchId, 'state': self.state, 'producer': self.producer, 'predictor': self.predictor,
+                'settings': self.settings, 'switchTime': self.switchTime, 'error': self.error}
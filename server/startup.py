@@ -0,0 +1,157 @@
+"""This module implements the startup of the backend in the background.
+
+Importing the web server only loads the configuration. The heavy libraries
+(torch, madmom, OpenCV and matplotlib) are imported on first use, so the web
+server answers requests like ``/pred_list`` and ``/health`` right away. The
+``StartupThread`` then prepares everything the default session needs: it starts
+the predictor pool, warms up ``START_PREDICTOR`` (which imports torch and loads
+the model), builds the spectrogram engine (which imports madmom), renders a
+first image (which imports OpenCV and matplotlib) and finally starts the default
+session. Every phase is timed, the durations are reported by
+``/health`` and printed once the startup finished if ``STARTUP_REPORT`` is set.
+
+"""
+import time
+import numpy as np
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Thread, Event, Lock
+
+from server.config.config import START_FILE, START_PREDICTOR, DEFAULT_SESSION, EXECUTION_MODE, \
+    PREDICTOR_POOL_PRELOAD, STARTUP_REPORT, SPEC_NUM_BINS
+from server.features.spectrogram_engine import sharedEngine
+from server.rendering.render_cache import convertSpecToJPG
+
+# states of the startup
+STARTUP_STARTING = 'starting'
+STARTUP_OK = 'ok'
+STARTUP_FAILED = 'failed'
+
+
+class StartupThread(Thread):
+    """
+    Thread for starting the backend in the background.
+
+    Attributes
+    ----------
+    manager : AudioTaggerManager
+        reference to the audio tagger manager to be started
+    state : str
+        one of ``'starting'``, ``'ok'`` or ``'failed'``
+    phases : OrderedDict
+        seconds per startup phase in the order of the phases, None while a phase is running
+    created : float
+        time the manager has been created
+    error : str
+        message of the exception which made the startup fail
+    finished : threading.Event
+        set once the startup succeeded or failed
+    lock : threading.Lock
+        guards the phases
+
+    Methods
+    -------
+    run()
+        method triggered when start() method is called.
+    phase(name)
+        times a startup phase.
+    addPhase(name, duration)
+        records a phase which has been timed elsewhere, e.g. the import of the web server.
+    getStatus()
+        returns the progress of the startup.
+    """
+    def __init__(self, manager, name='StartupThread'):
+        """
+        Parameters
+        ----------
+        manager : AudioTaggerManager
+            reference to the audio tagger manager to be started
+        name : str
+            the name of the thread
+        """
+        self.manager = manager
+        self.state = STARTUP_STARTING
+        self.phases = OrderedDict()
+        self.created = time.perf_counter()
+        self.error = None
+        self.finished = Event()
+        self.lock = Lock()
+        Thread.__init__(self, name=name, daemon=True)
+
+    def run(self):
+        """Prepares the predictor, the spectrogram engine and the renderer
+        of the default session and starts it.
+        """
+        try:
+            with self.phase('predictor pool'):
+                self.manager.predictorPool.start(PREDICTOR_POOL_PRELOAD)
+            with self.phase('predictor'):
+                self.manager.predictorPool.refill(START_PREDICTOR)
+            if EXECUTION_MODE == 'threads':
+                # worker processes build their own engine
+                with self.phase('spectrogram engine'):
+                    sharedEngine()
+            # the first spectrogram of the default session is not delayed by the imports
+            with self.phase('renderer'):
+                convertSpecToJPG(np.zeros((SPEC_NUM_BINS, 1), dtype=np.float32))
+            with self.phase('default session'):
+                self.manager.createSession({'isLive': START_FILE is None, 'file': START_FILE,
+                                            'predictor': START_PREDICTOR}, DEFAULT_SESSION)
+            self.state = STARTUP_OK
+        except Exception as exception:
+            self.state, self.error = STARTUP_FAILED, str(exception)
+        self.finished.set()
+
+        if STARTUP_REPORT:
+            status = self.getStatus()
+            phases = ', '.join('{} {:.2f} s'.format(elem['name'], elem['duration'])
+                               for elem in status['phases'] if elem['duration'] is not None)
+            print('startup {} after {:.2f} s: {}'.format(self.state, status['uptime'], phases))
+            if self.error is not None:
+                print('startup error: {}'.format(self.error))
+
+    @contextmanager
+    def phase(self, name):
+        """times a startup phase.
+
+        Parameters
+        ----------
+        name : str
+            the name of the phase
+        """
+        with self.lock:
+            self.phases[name] = None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.addPhase(name, time.perf_counter() - start)
+
+    def addPhase(self, name, duration):
+        """records a phase which has been timed elsewhere, e.g. the import of the web server.
+
+        Parameters
+        ----------
+        name : str
+            the name of the phase
+        duration : float
+            seconds the phase took
+        """
+        with self.lock:
+            self.phases[name] = duration
+
+    def getStatus(self):
+        """returns the progress of the startup.
+
+        Returns
+        -------
+        dict
+            a dictionary in the following format:
+            ``{"status": "starting", "uptime": 1.2, "phases": [{"name": "web server import", "duration": 0.21},
+            {"name": "predictor pool", "duration": 0.0}, {"name": "predictor", "duration": null}], "error": null}``
+        """
+        with self.lock:
+            phases = [{'name': name, 'duration': duration} for name, duration in self.phases.items()]
+        return {'status': self.state, 'uptime': time.perf_counter() - self.created, 'phases': phases,
+                'error': self.error}
@@ -0,0 +1,4 @@
+"""This package contains the encoding of predictions which are pushed
+to clients or served in compact formats by the web server.
+
+"""
@@ -0,0 +1,236 @@
+"""This module implements the publishing of prebuilt artifacts of a
+session for the asyncio front end (see ``server.async_webserver``).
+
+An ``ArtifactThread`` waits for new versions of the spectrogram or the
+prediction of a session, encodes them once (JPEG with the default scale and
+quality, JSON of the prediction) and publishes the result as an immutable
+``Artifact``. Requests of the front end only hand out the newest artifact, so
+neither DSP nor inference nor encoding ever runs on a request path. Waiting
+clients on the event loop are woken up via ``call_soon_threadsafe``, i.e. an
+idle or streaming connection costs no thread. The threads end by themselves
+once their session is closed.
+
+"""
+import json
+import asyncio
+
+from collections import namedtuple
+from threading import Thread, Event
+
+from server.config.config import STREAM_WAIT_TIMEOUT
+from server.rendering.render_cache import convertSpecToJPG
+from server.streaming.prediction_formats import classesTag
+
+# version: sequence number of the source, content: encoded bytes, etag: unquoted entity tag of the content,
+# source: the object the content was encoded from
+Artifact = namedtuple('Artifact', ['version', 'content', 'etag', 'source'])
+
+
+class ArtifactThread(Thread):
+    """
+    Thread for encoding every new version of a session output once.
+
+    Attributes
+    ----------
+    session : AudioSession
+        the session whose output is encoded
+    notifier : SequenceNotifier
+        publishes the version of the session output
+    getVersioned : callable
+        returns the newest version and the session output
+    encode : callable
+        encodes a session output into bytes
+    etag : callable
+        returns the entity tag of the artifact of a version
+    loop : asyncio.AbstractEventLoop
+        event loop of the waiting clients
+    onClosed : callable
+        called on the event loop once the thread ended because the session has been closed
+    artifact : Artifact
+        the newest artifact, None until the first one is encoded
+    future : asyncio.Future
+        resolved on the event loop once the next artifact is published
+    subscription : Subscription
+        wake-up channel of the thread for new versions
+    _stopevent : threading.Event
+        indicator for stopping a thread loop
+
+    Methods
+    -------
+    run()
+        method triggered when start() method is called.
+    waitFor(version, timeout)
+        coroutine returning the first artifact newer than a version.
+    join()
+        sends stop signal to thread.
+    """
+    def __init__(self, session, notifier, getVersioned, encode, etag, loop, onClosed=None, name='ArtifactThread'):
+        """
+        Parameters
+        ----------
+        session : AudioSession
+            the session whose output is encoded
+        notifier : SequenceNotifier
+            publishes the version of the session output
+        getVersioned : callable
+            returns the newest version and the session output
+        encode : callable
+            encodes a session output into bytes
+        etag : callable
+            returns the entity tag of the artifact of a version
+        loop : asyncio.AbstractEventLoop
+            event loop of the waiting clients, the thread has to be created on it
+        onClosed : callable
+            called on the event loop once the thread ended because the session has been closed
+        name : str
+            the name of the thread
+        """
+        self.session = session
+        self.notifier = notifier
+        self.getVersioned = getVersioned
+        self.encode = encode
+        self.etag = etag
+        self.loop = loop
+        self.onClosed = onClosed
+        self.artifact = None
+        self.future = loop.create_future()
+        self.subscription = notifier.subscribe()
+        self._stopevent = Event()
+        Thread.__init__(self, name=name, daemon=True)
+
+    def run(self):
+        """Encodes the newest version whenever a new one is published.
+        Versions published while an artifact is encoded are skipped.
+        The thread ends once the session has been closed.
+        """
+        version = -1    # the initial output of the session (version 0) is published as well
+        while not self._stopevent.is_set():
+            if self.session.closed:
+                self.subscription.cancel()
+                if self.onClosed is not None:
+                    self._callSoon(self.onClosed)
+                break
+            newest, source = self.getVersioned()
+            if newest > version:
+                version = newest
+                artifact = Artifact(version, self.encode(source), self.etag(version), source)
+                if not self._callSoon(self._publish, artifact):
+                    break   # event loop has been closed
+            self.subscription.wait(max(version, 0), STREAM_WAIT_TIMEOUT)
+
+    def _callSoon(self, callback, *args):
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            return False
+        return True
+
+    def _publish(self, artifact):
+        # runs on the event loop
+        self.artifact = artifact
+        future, self.future = self.future, self.loop.create_future()
+        future.set_result(artifact)
+
+    async def waitFor(self, version=-1, timeout=STREAM_WAIT_TIMEOUT):
+        """returns the first artifact newer than a version.
+
+        Parameters
+        ----------
+        version : int
+            version the client already has, -1 if none
+        timeout : float
+            seconds to wait at most for a new artifact
+
+        Returns
+        -------
+        Artifact
+            the newest artifact, which is not newer than ``version``
+            (or None) if the timeout has passed
+        """
+        if self.artifact is None or self.artifact.version <= version:
+            try:
+                await asyncio.wait_for(asyncio.shield(self.future), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.artifact
+
+    def join(self, timeout=None):
+        """Stops the thread.
+
+        This method tries to stop a thread. When timeout has passed
+        and the thread could not be stopped yet, the program continues.
+        If timeout is set to None, join blocks until the thread is stopped.
+
+        Parameters
+        ----------
+        timeout : float
+            a timeout value in seconds
+
+        """
+        self._stopevent.set()
+        self.subscription.cancel()
+        Thread.join(self, timeout)
+
+
+class SessionArtifacts:
+    """
+    Prebuilt artifacts of a single session.
+
+    Attributes
+    ----------
+    session : AudioSession
+        the session the artifacts are built from
+    visual : ArtifactThread
+        publishes the JPEG of every new spectrogram
+    prediction : ArtifactThread
+        publishes the JSON of every new prediction
+
+    Methods
+    -------
+    classesTag()
+        returns the tag of the class table of the newest prediction artifact.
+    stop()
+        stops the artifact threads.
+    """
+    def __init__(self, session, loop, renderCache, onClosed=None):
+        """
+        Parameters
+        ----------
+        session : AudioSession
+            the session the artifacts are built from
+        loop : asyncio.AbstractEventLoop
+            event loop of the waiting clients
+        renderCache : RenderCache
+            cache of the other renditions, the JPEG artifacts get the same ETags as its default renditions
+        onClosed : callable
+            called on the event loop with this object once the session has been closed
+        """
+        self.session = session
+        closed = None if onClosed is None else lambda: onClosed(self)
+        self.visual = ArtifactThread(session, session.visualNotifier, session.getVersionedVisualisation,
+                                     convertSpecToJPG, lambda version: renderCache.etag(session.sessionId, version),
+                                     loop, closed, 'VisualArtifactThread')
+        self.prediction = ArtifactThread(session, session.predictionNotifier, session.getVersionedPrediction,
+                                         lambda prediction: json.dumps(prediction).encode(),
+                                         lambda version: '{}-{}-pred-{}'.format(renderCache.token, session.sessionId,
+                                                                                version),
+                                         loop, closed, 'PredictionArtifactThread')
+        self.visual.start()
+        self.prediction.start()
+
+    def classesTag(self):
+        """returns the tag of the class table of the newest prediction artifact.
+
+        Returns
+        -------
+        str
+            the tag, see ``prediction_formats.classesTag()``
+        """
+        artifact = self.prediction.artifact
+        return classesTag(artifact.source if artifact is not None else self.session.getVersionedPrediction()[1])
+
+    def stop(self):
+        """stops the artifact threads.
+        """
+        self.visual.join()
+        self.prediction.join()
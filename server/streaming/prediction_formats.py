@@ -0,0 +1,123 @@
+"""This module implements compact encodings of a class prediction for
+clients which poll ``/live_pred`` at a high rate.
+
+The class names are served once by ``/classes``; a prediction can then be
+fetched without names in one of the following formats:
+
+-   ``json``: the list of ``[name, probability, index]`` triples (default)
+-   ``float32`` / ``float16``: raw little-endian probabilities
+-   ``npy``: a numpy array in the ``.npy`` file format
+-   ``msgpack``: a map with the sequence number, the class indices and the probabilities
+
+If ``k`` is smaller than the number of classes, only the k most probable
+classes are selected (sorted by probability) and the raw formats start with
+the k class indices as little-endian uint16 followed by the k probabilities,
+the ``npy`` format holds a structured array with the fields ``index`` and
+``prob``. Otherwise all probabilities are encoded in class order.
+
+"""
+import io
+import json
+import zlib
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:     # msgpack is optional, the other formats work without it
+    msgpack = None
+
+from server.streaming.prediction_stream import topK
+
+FORMATS = ['json', 'float32', 'float16', 'npy', 'msgpack']
+
+MIMETYPES = {'json': 'application/json', 'float32': 'application/octet-stream',
+             'float16': 'application/octet-stream', 'npy': 'application/octet-stream',
+             'msgpack': 'application/msgpack'}
+
+
+def classesTag(prediction):
+    """Returns a tag of the class names of a prediction, which
+    changes whenever another predictor is selected.
+
+    Parameters
+    ----------
+    prediction : list of lists
+        the prediction of a session, e.g. ``[["Acoustic_guitar", 0.0006955251446925104, 0], ...]``
+
+    Returns
+    -------
+    str
+        the tag, e.g. used as ETag of ``/classes``
+    """
+    return '{:08x}-{}'.format(zlib.crc32('\n'.join(entry[0] for entry in prediction).encode()), len(prediction))
+
+
+def selectClasses(probs, k=None):
+    """Returns the indices of the encoded classes.
+
+    Parameters
+    ----------
+    probs : 1d numpy array of float values
+        the class probabilities
+    k : int
+        number of selected classes, None selects all classes
+
+    Returns
+    -------
+    tuple (1d numpy array of int values, bool)
+        the class indices and True if only the top-k classes are selected
+    """
+    if k is None or k >= len(probs):
+        return np.arange(len(probs)), False
+    return topK(probs, k), True
+
+
+def encodePrediction(sequence, prediction, k=None, format='json'):
+    """Encodes a prediction in one of the ``FORMATS``.
+
+    Parameters
+    ----------
+    sequence : int
+        sequence number of the prediction
+    prediction : list of lists
+        the prediction of a session, e.g. ``[["Acoustic_guitar", 0.0006955251446925104, 0], ...]``
+    k : int
+        number of encoded classes, None encodes all classes
+    format : str
+        one of ``FORMATS``
+
+    Returns
+    -------
+    tuple (bytes, str)
+        the encoded prediction and its mimetype
+
+    Raises
+    ------
+    ValueError
+        if the format is unknown or not available
+    """
+    if format not in FORMATS or (format == 'msgpack' and msgpack is None):
+        raise ValueError('unsupported prediction format: {}'.format(format))
+
+    probs = np.fromiter((entry[1] for entry in prediction), dtype=np.float32, count=len(prediction))
+    indices, selected = selectClasses(probs, k)
+    if format == 'json':
+        content = json.dumps([prediction[index] for index in indices] if selected else prediction)
+        return content.encode(), MIMETYPES[format]
+    if format == 'msgpack':
+        content = {'seq': sequence, 'indices': indices.tolist(), 'probs': probs[indices].tolist()}
+        return msgpack.packb(content), MIMETYPES[format]
+
+    dtype = np.dtype('<f2') if format == 'float16' else np.dtype('<f4')
+    values = probs[indices].astype(dtype)
+    if format == 'npy':
+        if selected:
+            array = np.empty(len(indices), dtype=[('index', '<u2'), ('prob', '<f4')])
+            array['index'], array['prob'] = indices, values
+            values = array
+        buffer = io.BytesIO()
+        np.save(buffer, values)
+        return buffer.getvalue(), MIMETYPES[format]
+    if selected:
+        return indices.astype('<u2').tobytes() + values.tobytes(), MIMETYPES[format]
+    return values.tobytes(), MIMETYPES[format]
@@ -0,0 +1,135 @@
+"""This module implements the push of class predictions to a client via
+server-sent events (SSE).
+
+Instead of the full list of ``[name, probability, index]`` triples of
+``/live_pred``, a client first receives a ``classes`` event with the class
+names of the current predictor. Every following ``prediction`` event only
+holds the sequence number of the prediction and ``[index, probability]``
+pairs of the top-k classes, sorted by probability. A prediction is not sent at
+all if no probability changed by at least ``minDelta`` and the top-k classes
+are the same as in the previous message. If the predictor of the session is
+switched, a new ``classes`` event is sent before the next prediction.
+
+"""
+import json
+import numpy as np
+
+from server.config.config import PUSH_TOP_K, PUSH_MIN_DELTA
+
+
+def topK(probs, k=None):
+    """Returns the indices of the k highest probabilities in descending
+    order. Only the selected entries are sorted.
+
+    Parameters
+    ----------
+    probs : 1d numpy array of float values
+        the class probabilities
+    k : int
+        number of selected classes, None selects all classes
+
+    Returns
+    -------
+    1d numpy array of int values
+        indices of the selected classes, highest probability first
+    """
+    if k is None or k >= len(probs):
+        indices = np.arange(len(probs))
+    else:
+        indices = np.argpartition(probs, -k)[-k:]
+    return indices[np.argsort(-probs[indices], kind='stable')]
+
+
+def formatEvent(event, data, eventId=None):
+    """Encodes a server-sent event.
+
+    Parameters
+    ----------
+    event : str
+        name of the event
+    data : object
+        json serializable content of the event
+    eventId : int
+        id of the event, e.g. the sequence number of a prediction
+
+    Returns
+    -------
+    bytes
+        the event in the wire format of ``text/event-stream``
+    """
+    lines = 'event: {}\n'.format(event)
+    if eventId is not None:
+        lines += 'id: {}\n'.format(eventId)
+    return (lines + 'data: {}\n\n'.format(json.dumps(data, separators=(',', ':')))).encode()
+
+
+class PredictionStream:
+    """
+    Turns the predictions of a session into the events of a single client.
+
+    Attributes
+    ----------
+    k : int
+        number of reported classes, None reports all classes
+    minDelta : float
+        minimum change of a probability which is reported
+    classes : list of str
+        class names sent to the client last
+    sent : 1d numpy array of float values
+        probabilities as known to the client
+    sentTop : 1d numpy array of int values
+        indices of the classes reported in the previous message
+
+    Methods
+    -------
+    update(sequence, prediction)
+        returns the events for a new prediction.
+    """
+    def __init__(self, k=PUSH_TOP_K, minDelta=PUSH_MIN_DELTA):
+        """
+        Parameters
+        ----------
+        k : int
+            number of reported classes, None reports all classes
+        minDelta : float
+            minimum change of a probability which is reported
+        """
+        self.k = k
+        self.minDelta = minDelta
+        self.classes = None
+        self.sent = None
+        self.sentTop = None
+
+    def update(self, sequence, prediction):
+        """returns the events for a new prediction.
+
+        Parameters
+        ----------
+        sequence : int
+            sequence number of the prediction
+        prediction : list of lists
+            the prediction of the session, e.g.
+            ``[["Acoustic_guitar", 0.0006955251446925104, 0], ...]``
+
+        Returns
+        -------
+        bytes
+            a ``classes`` event if the class names changed followed by a
+            ``prediction`` event, or empty if nothing changed noticeably
+        """
+        events = b''
+        classes = [entry[0] for entry in prediction]
+        if classes != self.classes:
+            self.classes, self.sent, self.sentTop = classes, None, None
+            events += formatEvent('classes', {'classes': classes})
+
+        probs = np.fromiter((entry[1] for entry in prediction), dtype=np.float64, count=len(prediction))
+        top = topK(probs, self.k)
+        # the client only knows the reported classes, so only their changes count
+        if self.sent is not None and np.array_equal(top, self.sentTop) \
+                and np.max(np.abs(probs[top] - self.sent[top]), initial=0.0) < max(self.minDelta, 1e-12):
+            return events
+
+        self.sent, self.sentTop = probs, top
+        content = {'seq': sequence, 'top': [[int(index), float(probs[index])] for index in top]}
+        return events + formatEvent('prediction', content, sequence)
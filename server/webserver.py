@@ -12,44 +12,56 @@ Possible GET requests are audio input visualisation (e.g. spectrogram) and the c
 of a certain model based on the current audio input. Beyond reading data from the
 web server, one can also send the backend that it should switch to another
 predictor or should use microphone input or audio file input.
+Several audio sessions (e.g. one per room) can run in one backend process. The
+routes below ``/sessions/<id>`` address a single session, the routes without a
+session id address the default session which is started on startup.
+The model is loaded and the default session is started in the background, so
+the web server answers right away. Until the default session runs, its routes
+respond with 503 and ``/health`` reports the progress of the startup.
 
 """
 
+import time
+
+# the startup report starts with the import of the web server
+importStart = time.perf_counter()
+
 import os
-import cv2
 import json
-import numpy as np
-import matplotlib.pyplot as plt
 
-from pydoc import locate
-from flask import Flask, Response, request
+from flask import Flask, Response, request, abort
 
-from server.consumer.visualizers.spectrogram.madmom_spectrogram_provider import MadmomSpectrogramProvider
 from server.audio_tagger_manager import AudioTaggerManager
 from server.config.load_config import loadPredictors, loadAudiofiles
-from server.config.config import START_PREDICTOR
-
-from threading import Condition
+from server.config.config import DEFAULT_SESSION, RENDER_SCALE, RENDER_JPEG_QUALITY, STREAM_MAX_FPS, \
+    STREAM_WAIT_TIMEOUT, PUSH_TOP_K, PUSH_MIN_DELTA, PUSH_MAX_RATE, PUSH_KEEPALIVE
+from server.rendering.render_cache import RenderCache
+from server.rendering.raw_spectrogram import encodeColumns
+from server.streaming.prediction_stream import PredictionStream
+from server.streaming.prediction_formats import encodePrediction, classesTag
 
 ### load configs ###
 predictorList = loadPredictors()
 audiofileList = loadAudiofiles()
 
-condition = Condition()
-
-visualisationProvider = MadmomSpectrogramProvider(condition)
-
-# load prediction class via reflection
-predictionProviderClass = locate('server.consumer.predictors.{}'.format(predictorList[int(START_PREDICTOR)]['predictorClassPath']))
-predictionProvider = predictionProviderClass(condition)
+# the default session with the starting predictor and audio file of config.py is started by model.start()
+model = AudioTaggerManager(predictorList, audiofileList)
+model.startup.addPhase('web server import', time.perf_counter() - importStart)
 
-model = AudioTaggerManager(visualisationProvider, predictionProvider, predictorList, audiofileList, condition)
+# every spectrogram version is rendered once per scale and quality
+renderCache = RenderCache()
 
 ###### audio tagger REST API functions ######
 app = Flask(__name__)
 
+@app.before_request
+def startBackend():
+    # starts the backend with the first request if the app is served by another WSGI server than app.run()
+    model.start()
+
 @app.route('/live_visual', methods=['GET'])
-def live_visual():
+@app.route('/sessions/<int:sessionId>/live_visual', methods=['GET'])
+def live_visual(sessionId=DEFAULT_SESSION):
     """Http GET interface method to request most current audio visualisation
     (URI: /live_visual).
 
@@ -57,23 +69,27 @@ def live_visual():
     currently incoming audio chunks. This method provides access to
     the most recent visual representation (e.g. spectrogram).
 
+    Optional query parameters are ``scale`` (upscaling factor, default 3)
+    and ``quality`` (JPEG quality, default 95).
+
     Note
     ----
     In general, the method would return the same representation until
-    a new one has been computed.
+    a new one has been computed. Each representation is rendered once and
+    comes with an ETag. If the request contains the ETag in the
+    ``If-None-Match`` header and there is no new representation, the
+    response is empty with status 304.
 
     Returns
     -------
     Response
         a response object with the visualisation in jpeg-format as content.
     """
-    content = model.getVisualisation()
-    content = convertSpecToJPG(content)
-    return Response(content,
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
+    return visualResponse(sessionId, lambda content: content)
 
 @app.route('/live_visual_browser', methods=['GET'])
-def live_visual_browser():
+@app.route('/sessions/<int:sessionId>/live_visual_browser', methods=['GET'])
+def live_visual_browser(sessionId=DEFAULT_SESSION):
     """Http GET interface method to request most current audio visualisation
     (browser ready) (URI: /live_visual_browser).
 
@@ -91,25 +107,121 @@ def live_visual_browser():
         a response object with the visualisation in jpeg-format as content
         which can be displayed in browser.
     """
-    content = model.getVisualisation()
-    content = convertSpecToJPG(content)
-    content = (b'--frame\r\n'
-                b'Content-Type: image/jpeg\r\n\r\n' + content + b'\r\n\r\n')
-    return Response(content,
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
+    return visualResponse(sessionId, lambda content: (b'--frame\r\n'
+                                                       b'Content-Type: image/jpeg\r\n\r\n' + content + b'\r\n\r\n'))
+
+@app.route('/live_visual_stream', methods=['GET'])
+@app.route('/sessions/<int:sessionId>/live_visual_stream', methods=['GET'])
+def live_visual_stream(sessionId=DEFAULT_SESSION):
+    """Http GET interface method to receive the audio visualisation as
+    a continuous MJPEG stream (URI: /live_visual_stream).
+
+    The connection is kept open and a new JPEG part is pushed as soon as
+    the backend has computed a new visual representation. It can be shown
+    directly in the browser, e.g. in an ``img`` tag. Optional query parameters
+    are ``fps`` (maximum frame rate of this client, default 25), ``scale``
+    and ``quality`` (see live_visual()).
+
+    Note
+    ----
+    A client never receives a backlog of frames. If it is slower than the
+    backend, intermediate representations are skipped and the next part
+    always shows the most recent one.
+
+    Returns
+    -------
+    Response
+        a streamed response with the visualisations in jpeg-format as parts.
+    """
+    scale, quality = renditionArgs()
+    fps = request.args.get('fps', STREAM_MAX_FPS, type=float)
+    if not fps > 0:
+        abort(400)
+    session = getSession(sessionId)
+
+    def generateFrames():
+        subscription = session.visualNotifier.subscribe()
+        try:
+            sentVersion, sentTime = 0, 0.0
+            while not session.closed:
+                version, spec = session.getVersionedVisualisation()
+                if version <= sentVersion:
+                    subscription.wait(sentVersion, STREAM_WAIT_TIMEOUT)
+                    continue
+                # respect the frame rate, frames published in the meantime are skipped
+                delay = sentTime + 1.0 / fps - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                    version, spec = session.getVersionedVisualisation()
+                content, _ = renderCache.render(sessionId, version, spec, scale, quality)
+                sentVersion, sentTime = version, time.monotonic()
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + content + b'\r\n')
+        finally:
+            subscription.cancel()
+
+    return Response(generateFrames(), mimetype='multipart/x-mixed-replace; boundary=frame',
+                    headers={'Cache-Control': 'no-cache'})
+
+@app.route('/live_spec', methods=['GET'])
+@app.route('/sessions/<int:sessionId>/live_spec', methods=['GET'])
+def live_spec(sessionId=DEFAULT_SESSION):
+    """Http GET interface method to request the most current spectrogram
+    as raw values for client-side rendering (URI: /live_spec).
+
+    Optional query parameters are ``format`` (``uint8`` color indices or
+    ``float16`` values, default ``uint8``) and ``since`` (column sequence
+    number the client already has, see ``server.rendering.raw_spectrogram``).
+    If ``since`` is given, only the columns appended afterwards are returned,
+    or the whole window if the client has fallen behind by more than a window
+    or is ahead of the session, e.g. because the session has been restarted.
+
+    Note
+    ----
+    The header ``X-Spectrogram-Sequence`` holds the column sequence number of
+    the response, to be sent as ``since`` with the next request, and
+    ``X-Spectrogram-Shape`` the shape ``nColumns,nBins`` of the content. If
+    there are no new columns, the response is empty with status 204.
+
+    Returns
+    -------
+    Response
+        a response object with the time-major spectrogram columns as content.
+    """
+    since = request.args.get('since', None, type=int)
+    head, columns = getSession(sessionId).getVisualisationColumns(since)
+    try:
+        content = encodeColumns(columns, request.args.get('format', 'uint8'))
+    except ValueError:
+        abort(400)
+    response = Response(content if content else None, status=200 if content else 204,
+                        mimetype='application/octet-stream')
+    response.headers['X-Spectrogram-Sequence'] = '' if head is None else str(head)
+    response.headers['X-Spectrogram-Shape'] = '{},{}'.format(columns.shape[1], columns.shape[0])
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/live_pred', methods=['GET'])
-def live_pred():
+@app.route('/sessions/<int:sessionId>/live_pred', methods=['GET'])
+def live_pred(sessionId=DEFAULT_SESSION):
     """Http GET interface method to request most current class predictions.
     (URI: /live_pred)
 
     Once the backend has computed new predictions based on current audio input
     they can be accessed via this REST interface method.
 
+    Optional query parameters are ``k`` (only the k most probable classes,
+    sorted by probability) and ``format`` (``json``, ``float32``, ``float16``,
+    ``npy`` or ``msgpack``, see ``server.streaming.prediction_formats``). The
+    binary formats hold no class names, they can be requested once from
+    classes().
+
     Note
     ----
     In general, the method would return the same predictions until
-    a new one has been computed.
+    a new one has been computed. The header ``X-Prediction-Sequence`` holds
+    the sequence number of the prediction, ``X-Classes-Tag`` the ETag of the
+    current class table.
 
     Returns
     -------
@@ -118,14 +230,125 @@ def live_pred():
         ``[["Acoustic_guitar", 0.0006955251446925104, 0], ["Applause", 0.0032770668622106314, 1], ...]``
 
     """
-    content = model.getPrediction()
+    k = request.args.get('k', None, type=int)
+    if k is not None and k < 1:
+        abort(400)
+    sequence, prediction = getSession(sessionId).getVersionedPrediction()
+    try:
+        content, mimetype = encodePrediction(sequence, prediction, k, request.args.get('format', 'json'))
+    except ValueError:
+        abort(400)
     response = app.response_class(
-        response=json.dumps(content),
+        response=content,
         status=200,
-        mimetype='application/json'
+        mimetype=mimetype
     )
+    response.headers['X-Prediction-Sequence'] = str(sequence)
+    response.headers['X-Classes-Tag'] = classesTag(prediction)
+    return response
+
+@app.route('/classes', methods=['GET'])
+@app.route('/sessions/<int:sessionId>/classes', methods=['GET'])
+def classes(sessionId=DEFAULT_SESSION):
+    """Http GET interface method to request the class names of the
+    currently selected predictor (URI: /classes).
+
+    Note
+    ----
+    The response carries an ETag, which equals the header ``X-Classes-Tag``
+    of live_pred(). Clients only need to request the class names again
+    once this tag changes, a request with the ETag in ``If-None-Match``
+    gets an empty response with status 304.
+
+    Returns
+    -------
+    Response : json
+        a json object with the class names ordered by class index:
+        ``["Acoustic_guitar", "Applause", ...]``
+
+    """
+    _, prediction = getSession(sessionId).getVersionedPrediction()
+    etag = classesTag(prediction)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = app.response_class(
+            response=json.dumps([entry[0] for entry in prediction]),
+            status=200,
+            mimetype='application/json'
+        )
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
     return response
 
+@app.route('/live_pred_stream', methods=['GET'])
+@app.route('/sessions/<int:sessionId>/live_pred_stream', methods=['GET'])
+def live_pred_stream(sessionId=DEFAULT_SESSION):
+    """Http GET interface method to receive the class predictions as
+    server-sent events (URI: /live_pred_stream).
+
+    The connection is kept open and an event is pushed as soon as the
+    backend has computed new class predictions. The first event holds the
+    class names, the following ones only the sequence number and the
+    class indices with their probabilities. Optional query parameters are
+    ``k`` (number of reported classes, default all), ``min_delta`` (minimum
+    change of a reported probability, default 0) and ``rate`` (maximum number
+    of events per second, default 10).
+
+    Note
+    ----
+    A client never receives a backlog of predictions. Predictions computed
+    faster than ``rate`` are skipped and the next event always holds the
+    most recent one. In a browser the events can be read with ``EventSource``.
+
+    Returns
+    -------
+    Response : text/event-stream
+        a streamed response with events in the following form:
+        ``event: classes``
+        ``data: {"classes":["Acoustic_guitar","Applause",...]}``
+
+        ``event: prediction``
+        ``id: 42``
+        ``data: {"seq":42,"top":[[1,0.73],[36,0.12],...]}``
+
+    """
+    k = request.args.get('k', PUSH_TOP_K, type=int)
+    minDelta = request.args.get('min_delta', PUSH_MIN_DELTA, type=float)
+    rate = request.args.get('rate', PUSH_MAX_RATE, type=float)
+    if (k is not None and k < 1) or not minDelta >= 0 or not rate > 0:
+        abort(400)
+    session = getSession(sessionId)
+
+    def generateEvents():
+        stream = PredictionStream(k, minDelta)
+        subscription = session.predictionNotifier.subscribe()
+        try:
+            seenSequence, seenTime, sentTime = 0, 0.0, time.monotonic()
+            while not session.closed:
+                sequence, prediction = session.getVersionedPrediction()
+                if sequence <= seenSequence:
+                    subscription.wait(seenSequence, STREAM_WAIT_TIMEOUT)
+                    if time.monotonic() - sentTime >= PUSH_KEEPALIVE:
+                        sentTime = time.monotonic()
+                        yield b': keep-alive\n\n'
+                    continue
+                # respect the rate, predictions published in the meantime are skipped
+                delay = seenTime + 1.0 / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                    sequence, prediction = session.getVersionedPrediction()
+                seenSequence, seenTime = sequence, time.monotonic()
+                events = stream.update(sequence, prediction)
+                if events:
+                    sentTime = seenTime
+                    yield events
+        finally:
+            subscription.cancel()
+
+    return Response(generateEvents(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/pred_list', methods=['GET'])
 def pred_list():
     """Http GET interface method to receive a list of available predictors.
@@ -160,6 +383,59 @@ def pred_list():
     )
     return response
 
+@app.route('/pred_status', methods=['GET'])
+def pred_status():
+    """Http GET interface method to check which predictors are warm.
+    (URI: /pred_status)
+
+    Warm predictors are taken from the predictor pool, so switching to them
+    with send_new_settings() takes milliseconds. The backend is ready once
+    all predictors of ``PREDICTOR_POOL_PRELOAD`` in config.py are warm, until
+    then the status code is 503.
+
+    Returns
+    -------
+    Response : json
+        a json object with the state of every predictor in the following form:
+        ``{"ready": true, "predictors": [{"id": 0, "displayname": "DCASEPredictor", "state": "warm",
+        "memory": 59403172, "warmUpTime": 0.4, "error": null}, {"id": 1, ..., "state": "cold", ...}, ...]}``
+
+    """
+    ready = model.predictorPool.isReady()
+    content = {'ready': ready, 'predictors': model.predictorPool.getStatus()}
+    response = app.response_class(
+        response=json.dumps(content),
+        status=200 if ready else 503,
+        mimetype='application/json'
+    )
+    return response
+
+@app.route('/health', methods=['GET'])
+def health():
+    """Http GET interface method to check the startup of the backend
+    (URI: /health)
+
+    The web server answers while the model is loaded in the background.
+    The status is ``"starting"`` until the default session runs, ``"ok"``
+    afterwards and ``"failed"`` if the startup failed, then the status
+    code is 503. The duration of every startup phase is given in seconds.
+
+    Returns
+    -------
+    Response : json
+        a json object with the startup status in the following form:
+        ``{"status": "ok", "uptime": 12.5, "phases": [{"name": "web server import", "duration": 0.21},
+        {"name": "predictor pool", "duration": 0.0}, {"name": "predictor", "duration": 1.9}, ...], "error": null}``
+
+    """
+    content = model.startup.getStatus()
+    response = app.response_class(
+        response=json.dumps(content),
+        status=503 if content['status'] == 'failed' else 200,
+        mimetype='application/json'
+    )
+    return response
+
 @app.route('/audiofile_list', methods=['GET'])
 def audiofile_list():
     """Http GET interface method to receive a list of available audio files.
@@ -189,8 +465,105 @@ def audiofile_list():
     )
     return response
 
+@app.route('/consumer_stats', methods=['GET'])
+@app.route('/sessions/<int:sessionId>/consumer_stats', methods=['GET'])
+def consumer_stats(sessionId=DEFAULT_SESSION):
+    """Http GET interface method to request lag statistics of the
+    feature extraction stage and the consumers.
+    (URI: /consumer_stats)
+
+    Every consumer keeps its own read position. If it falls behind, it
+    processes all missed chunks at once or applies the configured lag policy
+    (see ``CONSUMER_LAG_POLICY`` in config.py).
+
+    Returns
+    -------
+    Response : json
+        a json object with the lag statistics in the following form:
+        ``{"featureStage": {"lag": 1, "maxLag": 3, "processed": 1200, "dropped": 0, "policy": "catchup"}, ...}``
+
+    """
+    content = getSession(sessionId).getConsumerStats()
+    response = app.response_class(
+        response=json.dumps(content),
+        status=200,
+        mimetype='application/json'
+    )
+    return response
+
+@app.route('/sessions', methods=['GET'])
+def session_list():
+    """Http GET interface method to receive a list of running audio sessions.
+    (URI: /sessions)
+
+    Returns
+    -------
+    Response : json
+        a json object with the sessions, their state and their settings in the following form:
+        ``[{"id": 0, "state": "running", "isLive": 0, "file": 1, "predictor": 0}, {"id": 1, "state": "starting", "isLive": 1, "predictor": 0}, ...]``
+
+    """
+    content = model.getSessions()
+    response = app.response_class(
+        response=json.dumps(content),
+        status=200,
+        mimetype='application/json'
+    )
+    return response
+
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    """Http POST interface method for starting a new audio session.
+    (URI: /sessions)
+
+    The body of the POST message holds the settings of the new session
+    in the same form as for send_new_settings():
+    ``{'isLive': 1, 'file': 0, 'predictor': 1}``
+
+    Note
+    ----
+    The session is started in the background, as the first session using a
+    predictor loads its weights. session_list() reports the session as
+    ``starting`` until it runs, its routes answer 404 until then.
+
+    Returns
+    -------
+    Response : json
+        a json object with the id of the new session: ``{"id": 1}``,
+        status 400 if the settings are invalid
+
+    """
+    content = request.get_json(silent=True)  # read the POST body an get the content
+    try:
+        sessionId = model.startSession(content)
+    except ValueError as e:
+        abort(400, str(e))
+    response = app.response_class(
+        response=json.dumps({'id': sessionId}),
+        status=202,
+        mimetype='application/json'
+    )
+    return response
+
+@app.route('/sessions/<int:sessionId>', methods=['DELETE'])
+def close_session(sessionId):
+    """Http DELETE interface method for stopping an audio session.
+    (URI: /sessions/<id>)
+
+    Returns
+    -------
+    Http Status Code
+
+    """
+    try:
+        model.closeSession(sessionId)
+    except KeyError:
+        abort(404)
+    return 'OK'
+
 @app.route('/settings', methods=['POST'])
-def send_new_settings():
+@app.route('/sessions/<int:sessionId>/settings', methods=['POST'])
+def send_new_settings(sessionId=DEFAULT_SESSION):
     """Http POST interface method for sending new configuration settings
     to backend system.
     (URI: /settings)
@@ -201,6 +574,10 @@ def send_new_settings():
     a certain input source. The body of the POST message should look as follows:
     ``{'isLive': 1, 'file': 0, 'predictor': 1}``
 
+    The session is switched in the background, the old producer and predictor
+    keep delivering until the new ones delivered their first output. The
+    progress of the switch is available at the URI of the ``Location`` header.
+
     Note
     ----
     Use the same IDs for audio files and predictors as the come from
@@ -209,30 +586,86 @@ def send_new_settings():
 
     Returns
     -------
+    Response : json
+        status code 202 and the progress of the switch, see switch_status()
+
     Http Status Code
+        400 if the settings are invalid
 
     """
-    content = request.json  # read the POST body an get the content
-    model.refreshAudioTagger(content)
-    return 'OK'
+    content = request.get_json(silent=True)  # read the POST body an get the content
+    session = getSession(sessionId)
+    try:
+        switch = session.refreshAudioTagger(content)
+    except ValueError as e:
+        abort(400, str(e))
+    response = app.response_class(
+        response=json.dumps(switch.getStatus()),
+        status=202,
+        mimetype='application/json'
+    )
+    response.headers['Location'] = '{}/{}'.format(request.path.rstrip('/'), switch.switchId)
+    return response
+
+@app.route('/settings/<int:switchId>', methods=['GET'])
+@app.route('/sessions/<int:sessionId>/settings/<int:switchId>', methods=['GET'])
+def switch_status(switchId, sessionId=DEFAULT_SESSION):
+    """Http GET interface method to request the progress of a settings switch.
+    (URI: /settings/<switchId>)
+
+    Returns
+    -------
+    Response : json
+        a json object with the progress of the switch in the following form:
+        ``{"id": 3, "state": "done", "producer": "switched", "predictor": "switched",
+        "settings": {"isLive": 0, "file": 1, "predictor": 2}, "switchTime": 0.21, "error": null}``
+        where ``state`` is one of ``queued``, ``running``, ``teardown``, ``done`` or ``failed``
+
+    """
+    try:
+        switch = getSession(sessionId).getSwitch(switchId)
+    except KeyError:
+        abort(404)
+    response = app.response_class(
+        response=json.dumps(switch.getStatus()),
+        status=200,
+        mimetype='application/json'
+    )
+    return response
 
 ###### Helper functions ######
 
-def convertSpecToJPG(spec):
-    spec = spec / 3.0
-    resz_spec = 3
-    spec = cv2.resize(spec, (spec.shape[1] * resz_spec, spec.shape[0] * resz_spec))
-    spec = plt.cm.viridis(spec)[:, :, 0:3]
-    spec_bgr = (spec * 255).astype(np.uint8)
-    if spec_bgr.shape[1] < 512:
-        p = (512 - spec_bgr.shape[1]) // 2
-        spec_bgr = np.pad(spec_bgr, ((0, 0), (p, p), (0, 0)), mode="constant")
-    spec_bgr = cv2.flip(spec_bgr, 0)
-    _, curImage = cv2.imencode('.jpg', spec_bgr)
-    return curImage.tobytes()
+def getSession(sessionId):
+    try:
+        return model.getSession(sessionId)
+    except KeyError:
+        # the default session is not running until the startup finished
+        abort(503 if sessionId == DEFAULT_SESSION and not model.startup.finished.is_set() else 404)
+
+def renditionArgs():
+    scale = request.args.get('scale', RENDER_SCALE, type=int)
+    quality = request.args.get('quality', RENDER_JPEG_QUALITY, type=int)
+    if not 1 <= scale <= 8 or not 1 <= quality <= 100:
+        abort(400)
+    return scale, quality
+
+def visualResponse(sessionId, wrap):
+    # serves the cached rendition of the current spectrogram version, or 304 if the client has it already
+    scale, quality = renditionArgs()
+    version, spec = getSession(sessionId).getVersionedVisualisation()
+    etag = renderCache.etag(sessionId, version, scale, quality)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        content, etag = renderCache.render(sessionId, version, spec, scale, quality)
+        response = Response(wrap(content), mimetype='multipart/x-mixed-replace; boundary=frame')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 # start webserver
 if __name__ == '__main__':
+    model.start()
     app.run(host='127.0.0.1', debug=False)
 
 
@@ -0,0 +1,4 @@
+"""This package contains the worker processes of the ``processes``
+execution mode (see ``EXECUTION_MODE`` in config.py).
+
+"""
@@ -0,0 +1,170 @@
+"""This module implements the feature extraction stage of the ``processes``
+execution mode.
+
+The stage has the same interface as ``SpectrogramStage``, but computes the
+spectrogram columns in a worker process. The producer thread writes the audio
+chunks into a ring buffer in shared memory, the worker reads them from there,
+computes their columns with the ``SpectrogramEngine`` and writes them into the
+feature ring, which is in shared memory as well. A thread of the backend
+process watches the head of the feature ring and publishes it by the feature
+notifier of the session, so visualizers and predictors are woken up as before.
+Neither chunks nor columns are pickled or sent through a pipe.
+
+"""
+import multiprocessing
+
+from threading import Thread, Event
+
+from server.config.config import BUFFER_SIZE, WORKER_POLL_INTERVAL
+from server.buffers.read_cursor import ReadCursor
+from server.buffers.shared_memory import attachRing
+from server.features.spectrogram_engine import SpectrogramEngine
+
+
+def runFeatureWorker(audioSpec, featureSpec, position, stopEvent, pollInterval=WORKER_POLL_INTERVAL):
+    """Main function of the feature extraction process.
+
+    Parameters
+    ----------
+    audioSpec : tuple
+        spec of the shared memory of the audio ring buffer
+    featureSpec : tuple
+        spec of the shared memory of the feature ring
+    position : int
+        sequence number of the first audio chunk to be processed
+    stopEvent : multiprocessing.Event
+        indicator for stopping the process
+    pollInterval : float
+        seconds between two checks for new audio chunks
+    """
+    audioRing, featureRing = attachRing(audioSpec), attachRing(featureSpec)
+    cursor = ReadCursor(audioRing, BUFFER_SIZE, position=position)
+    engine = SpectrogramEngine()
+    while not stopEvent.is_set():
+        chunks = cursor.readPending()
+        if len(chunks) > 0:
+            featureRing.putMany(engine.process(chunks))
+        else:
+            stopEvent.wait(pollInterval)
+
+
+class FeatureWatchThread(Thread):
+    """
+    Thread for publishing new spectrogram columns written by the
+    feature extraction process to the consumers of the session.
+
+    Attributes
+    ----------
+    stage : FeatureProcessStage
+        reference to the feature extraction stage the thread belongs to
+    _stopevent : threading.Event
+        indicator for stopping a thread loop
+
+    Methods
+    -------
+    run()
+        method triggered when start() method is called.
+
+    join()
+        sends stop signal to thread.
+    """
+    def __init__(self, stage, name='FeatureWatchThread'):
+        """
+        Parameters
+        ----------
+        stage : FeatureProcessStage
+            reference to the feature extraction stage the thread belongs to
+        name : str
+            the name of the thread
+        """
+        self.stage = stage
+        self._stopevent = Event()
+        Thread.__init__(self, name=name)
+
+    def run(self):
+        """Publishes the head of the feature ring whenever it advanced.
+        """
+        manager = self.stage.manager
+        published = manager.featureRing.head
+        while not self._stopevent.is_set():
+            head = manager.featureRing.head
+            if head != published:
+                published = head
+                manager.featureNotifier.publish(head)
+            self._stopevent.wait(WORKER_POLL_INTERVAL)
+
+    def join(self, timeout=None):
+        """Stops the thread.
+
+        This method tries to stop a thread. When timeout has passed
+        and the thread could not be stopped yet, the program continues.
+        If timeout is set to None, join blocks until the thread is stopped.
+
+        Parameters
+        ----------
+        timeout : float
+            a timeout value in seconds
+
+        """
+        self._stopevent.set()
+        Thread.join(self, timeout)
+
+
+class FeatureProcessStage:
+    """
+    Feature extraction stage which computes the spectrogram columns
+    in a worker process.
+
+    Attributes
+    ----------
+    manager : AudioSession
+        reference to the session owning the stage, its audio ring buffer
+        and feature ring have to be in shared memory
+    cursor : ReadCursor
+        always None, the read position is kept by the worker process
+    process : multiprocessing.Process
+        the feature extraction process
+    stopEvent : multiprocessing.Event
+        indicator for stopping the process
+    watchThread : FeatureWatchThread
+        publishes new columns to the consumers
+
+    Methods
+    -------
+    start()
+       starts the feature extraction process.
+    stop()
+       stops the feature extraction process.
+    """
+    def __init__(self, manager):
+        """
+        Parameters
+        ----------
+        manager : AudioSession
+            reference to the session owning the stage
+        """
+        self.manager = manager
+        self.cursor = None
+        self.process = None
+
+    def start(self):
+        """Starts the feature extraction process.
+        """
+        context = multiprocessing.get_context('spawn')
+        self.stopEvent = context.Event()
+        self.process = context.Process(target=runFeatureWorker, name='FeatureProcess', daemon=True,
+                                       args=(self.manager.sharedMemory.storage.spec,
+                                             self.manager.featureRing.storage.spec,
+                                             self.manager.sharedMemory.head, self.stopEvent))
+        self.process.start()
+        self.watchThread = FeatureWatchThread(self)
+        self.watchThread.start()
+
+    def stop(self):
+        """Stops the feature extraction process.
+        """
+        self.stopEvent.set()
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.watchThread.join()
@@ -0,0 +1,329 @@
+"""This module implements the predictor of the ``processes`` execution
+mode.
+
+``ProcessPredictor`` wraps a predictor class with a ``predictBatch()``
+method (e.g. ``DcasePredictorProvider``) and runs it in a worker process. The
+worker loads and warms up the predictor as soon as the process is started, so
+the predictor pool can keep warm workers. Once the predictor is started, the
+worker attaches the feature ring of the session in shared memory, assembles its
+own sliding window from the new columns and predicts whenever the
+``PredictionPacer`` says a prediction is due. The probabilities and the pacer
+statistics are written into a ``SharedResultSlot``, from which a thread of the
+backend process hands every new prediction to the session. Inference therefore
+neither competes for the GIL of the backend process nor delays audio capture.
+
+"""
+import time
+import multiprocessing
+import numpy as np
+
+from pydoc import locate
+from threading import Thread, Event
+
+from server.config.config import SPEC_NUM_BINS, SLIDING_WINDOW_SIZE, CONSUMER_MAX_LAG, CONSUMER_LAG_POLICY, \
+    CONSUMER_WAIT_TIMEOUT, WORKER_POLL_INTERVAL, WORKER_TORCH_THREADS
+from server.buffers.read_cursor import ReadCursor, readBacklog
+from server.buffers.sliding_window import SlidingWindow
+from server.buffers.shared_memory import SharedResultSlot, attachRing
+from server.consumer.predictors.predictor_contract import PredictorContract
+from server.consumer.predictors.prediction_pacer import PredictionPacer
+
+# statistics of the pacer which are published with every prediction, see PredictionPacer.getStats()
+PACER_STATS = ['baseHop', 'hop', 'inferenceTime', 'load', 'predictionRate', 'predictions', 'skipped']
+INTEGER_STATS = ['baseHop', 'hop', 'predictions', 'skipped']
+
+
+def runPredictionWorker(predictorClassPath, connection, stopEvent, pollInterval=WORKER_POLL_INTERVAL,
+                        numThreads=WORKER_TORCH_THREADS):
+    """Main function of the prediction process. The process loads and warms
+    up its predictor first and reports the memory of the predictor. Then it
+    waits for the feature ring and the result slot of the session it serves.
+
+    Parameters
+    ----------
+    predictorClassPath : str
+        class path of the predictor below ``server.consumer.predictors``
+    connection : multiprocessing.connection.Connection
+        receives the spec of the feature ring, the spec of the result slot and
+        the sequence number of the first spectrogram column to be processed.
+        The sliding window is filled with the columns before it first.
+    stopEvent : multiprocessing.Event
+        indicator for stopping the process
+    pollInterval : float
+        seconds between two checks for new spectrogram columns
+    numThreads : int
+        number of torch threads, None lets torch decide
+    """
+    if numThreads is not None:
+        import torch
+        torch.set_num_threads(numThreads)
+
+    predictor = locate('server.consumer.predictors.{}'.format(predictorClassPath))()
+    predictor.warmUp()
+    connection.send(predictor.memorySize())
+    while not connection.poll(CONSUMER_WAIT_TIMEOUT):
+        if stopEvent.is_set():
+            return
+    featureSpec, resultSpec, position = connection.recv()
+
+    featureRing, slot = attachRing(featureSpec), SharedResultSlot(*resultSpec)
+    window = SlidingWindow(SPEC_NUM_BINS, SLIDING_WINDOW_SIZE)
+    window.extend(readBacklog(featureRing, window.width, position)[1])
+    cursor = ReadCursor(featureRing, CONSUMER_MAX_LAG, CONSUMER_LAG_POLICY, position=position)
+    snapshot = np.empty((1,) + window.shape, dtype=np.float32)
+    # keeps the step of the predictor, e.g. hops at multiples of STREAMING_HOP for StreamingDcasePredictorProvider
+    pacer = PredictionPacer(step=predictor.pacer.step if hasattr(predictor, 'pacer') else 1)
+    while not stopEvent.is_set():
+        window.extend(cursor.readPending())
+        head = window.head
+        if head > 0 and pacer.isDue(head):   # start once the first columns arrived
+            window.snapshot(out=snapshot[0])
+            start = time.perf_counter()
+            probs = predictor.predictBatch(snapshot)[0]
+            pacer.record(head, time.perf_counter() - start)
+            stats = pacer.getStats()
+            slot.write(probs, head, [stats[name] for name in PACER_STATS])
+        stopEvent.wait(pollInterval)
+
+
+class SharedPacerStats:
+    """
+    Statistics of the pacer of a prediction process.
+
+    Attributes
+    ----------
+    slot : SharedResultSlot
+        the result slot the statistics are published with
+
+    Methods
+    -------
+    getStats()
+        returns hop, inference time, load and the effective prediction rate.
+    """
+    def __init__(self, slot):
+        """
+        Parameters
+        ----------
+        slot : SharedResultSlot
+            the result slot the statistics are published with
+        """
+        self.slot = slot
+
+    def getStats(self):
+        """returns hop, inference time, load and the effective prediction rate.
+
+        Returns
+        -------
+        dict
+            the statistics in the form of ``PredictionPacer.getStats()``
+        """
+        values = self.slot.stats.tolist()
+        return {name: int(value) if name in INTEGER_STATS else value for name, value in zip(PACER_STATS, values)}
+
+
+class ResultThread(Thread):
+    """
+    Thread for handing new predictions of the prediction process
+    to the session.
+
+    Attributes
+    ----------
+    provider : ProcessPredictor
+        reference to the predictor the thread belongs to
+    _stopevent : threading.Event
+        indicator for stopping a thread loop
+
+    Methods
+    -------
+    run()
+        method triggered when start() method is called.
+
+    join()
+        sends stop signal to thread.
+    """
+    def __init__(self, provider, name='ResultThread'):
+        """
+        Parameters
+        ----------
+        provider : ProcessPredictor
+            reference to the predictor the thread belongs to
+        name : str
+            the name of the thread
+        """
+        self.provider = provider
+        self._stopevent = Event()
+        Thread.__init__(self, name=name)
+
+    def run(self):
+        """Informs the session about every new prediction in the result slot.
+        """
+        sequence = 0
+        while not self._stopevent.is_set():
+            if self.provider.slot.sequence[0] != sequence:
+                sequence, _, probs = self.provider.slot.read()
+                self.provider.manager.onNewPredictionCalculated(self.provider.toPrediction(probs))
+            self._stopevent.wait(WORKER_POLL_INTERVAL)
+
+    def join(self, timeout=None):
+        """Stops the thread.
+
+        This method tries to stop a thread. When timeout has passed
+        and the thread could not be stopped yet, the program continues.
+        If timeout is set to None, join blocks until the thread is stopped.
+
+        Parameters
+        ----------
+        timeout : float
+            a timeout value in seconds
+
+        """
+        self._stopevent.set()
+        Thread.join(self, timeout)
+
+
+class ProcessPredictor(PredictorContract):
+    """
+    Implementation of a PredictorContract which runs a predictor
+    in a worker process.
+
+    Attributes
+    ----------
+    predictorClassPath : str
+        class path of the predictor below ``server.consumer.predictors``
+    classes : list of str
+        class names of the predictor
+    cursor : ReadCursor
+        always None, the read position is kept by the worker process
+    pacer : SharedPacerStats
+        statistics of the pacer of the worker process, None until started
+    slot : SharedResultSlot
+        shared memory the worker process writes its predictions to
+    process : multiprocessing.Process
+        the prediction process, None until warmed up
+    connection : multiprocessing.connection.Connection
+        hands the session to the prediction process
+    memory : int
+        bytes of the predictor reported by the prediction process
+    resultThread : ResultThread
+        hands new predictions to the session
+
+    Methods
+    -------
+    warmUp()
+       starts the prediction process, which loads and warms up the predictor.
+    memorySize()
+       returns the memory of the predictor in the prediction process.
+    start()
+       hands the session to the prediction process.
+    stop()
+       stops the prediction process.
+    release()
+       stops the prediction process of a predictor which has not been started.
+    predict()
+       returns the newest prediction of the prediction process.
+    toPrediction(probs)
+       converts probabilities into the prediction format of the session.
+    """
+    def __init__(self, predictorClassPath, classes):
+        """
+        Parameters
+        ----------
+        predictorClassPath : str
+            class path of the predictor below ``server.consumer.predictors``
+        classes : list of str
+            class names of the predictor
+        """
+        self.predictorClassPath = predictorClassPath
+        self.classes = list(classes)
+        self.cursor = None
+        self.pacer = None
+        self.slot = None
+        self.process = None
+        self.memory = 0
+        self.resultThread = None
+
+    def warmUp(self):
+        """Starts the prediction process and waits until it has loaded and
+        warmed up the predictor. Does nothing if the process is running already.
+        """
+        if self.process is not None:
+            return
+        context = multiprocessing.get_context('spawn')
+        self.stopEvent = context.Event()
+        self.connection, workerConnection = context.Pipe()
+        self.process = context.Process(target=runPredictionWorker, name='PredictionProcess', daemon=True,
+                                       args=(self.predictorClassPath, workerConnection, self.stopEvent))
+        self.process.start()
+        workerConnection.close()    # the pipe reports EOF if the process dies
+        self.memory = self.connection.recv()
+
+    def memorySize(self):
+        """returns the memory of the predictor in the prediction process.
+
+        Returns
+        -------
+        int
+            bytes reported by the predictor after its warm up
+        """
+        return self.memory
+
+    def start(self):
+        """Hands the session to the prediction process, which starts
+        the process first if the predictor has not been warmed up.
+        """
+        self.warmUp()
+        self.slot = SharedResultSlot(len(self.classes), len(PACER_STATS))
+        self.pacer = SharedPacerStats(self.slot)
+        self.connection.send((self.manager.featureRing.storage.spec, self.slot.spec, self.manager.featureRing.head))
+        self.resultThread = ResultThread(self)
+        self.resultThread.start()
+
+    def stop(self):
+        """Stops the prediction process.
+        """
+        if self.process is None:
+            return
+        self.stopEvent.set()
+        if self.resultThread is not None:
+            self.resultThread.join()
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.connection.close()
+        self.process = None
+        self.pacer = None
+        if self.slot is not None:
+            self.slot.release()
+
+    def release(self):
+        """stops the prediction process of a predictor which has been
+        evicted from the predictor pool without being started.
+        """
+        self.stop()
+
+    def predict(self):
+        """returns the newest prediction of the prediction process.
+
+        Returns
+        -------
+        list
+            an array of number of classes entries where each entry consists of
+            the class name, its predicted probability and a position index.
+        """
+        _, _, probs = self.slot.read()
+        return self.toPrediction(np.zeros(len(self.classes)) if probs is None else probs)
+
+    def toPrediction(self, probs):
+        """converts probabilities into the prediction format of the session.
+
+        Parameters
+        ----------
+        probs : 1d numpy array of float values
+            probability of each class
+
+        Returns
+        -------
+        list
+            ``[["class1", 0.0006955251446925104, 0], ["class2", 0.0032770668622106314, 1], ...]``
+        """
+        return [[elem, prob, index] for index, (elem, prob) in enumerate(zip(self.classes, probs.tolist()))]
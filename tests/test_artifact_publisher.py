@@ -0,0 +1,43 @@
+import asyncio
+
+from server.buffers.sequence_notifier import SequenceNotifier
+from server.streaming.artifact_publisher import ArtifactThread
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+        self.notifier = SequenceNotifier()
+        self.version = 0
+
+    def getVersioned(self):
+        return self.version, 'output {}'.format(self.version)
+
+
+def test_new_versions_are_published_once_and_the_thread_ends_with_its_session():
+    async def main():
+        loop = asyncio.get_event_loop()
+        session = FakeSession()
+        closed = loop.create_future()
+        thread = ArtifactThread(session, session.notifier, session.getVersioned, str.encode,
+                                lambda version: 'tag-{}'.format(version), loop,
+                                lambda: closed.set_result(True))
+        thread.start()
+
+        artifact = await thread.waitFor(-1, timeout=2.0)
+        assert artifact == (0, b'output 0', 'tag-0', 'output 0')
+        session.version = 3
+        session.notifier.publish(3)
+        artifact = await thread.waitFor(0, timeout=2.0)
+        assert (artifact.version, artifact.etag) == (3, 'tag-3')
+        # without a new version the newest artifact is returned after the timeout
+        assert (await thread.waitFor(3, timeout=0.1)).version == 3
+
+        session.closed = True
+        session.notifier.publish(4)
+        assert await asyncio.wait_for(closed, 2.0)
+        thread.join(2.0)
+        assert not thread.is_alive()
+        assert thread.subscription not in session.notifier.subscriptions
+
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+import time
+import pytest
+
+from threading import Lock
+
+import server.audio_tagger_manager as audio_tagger_manager
+from server.audio_tagger_manager import AudioTaggerManager
+
+
+PREDICTORS = [{'id': 0, 'predictorClassPath': 'dcase'}, {'id': 1, 'predictorClassPath': 'dummy'}]
+AUDIOFILES = [{'id': 0, 'path': 'a.wav'}, {'id': 1, 'path': 'b.wav'}]
+
+
+class FakeSession:
+    # stands in for AudioSession, fails for predictor 1
+    def __init__(self, manager, sessionId, settings):
+        if settings['predictor'] == 1:
+            raise RuntimeError('predictor failed')
+        self.sessionId = sessionId
+        self.settings = dict(settings)
+        self.stopped = False
+
+    def startThreads(self):
+        pass
+
+    def stopThreads(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    # a manager without the default session
+    monkeypatch.setattr(audio_tagger_manager, 'AudioSession', FakeSession)
+    manager = AudioTaggerManager.__new__(AudioTaggerManager)
+    manager.predList = PREDICTORS
+    manager.audiofileList = AUDIOFILES
+    manager.sessions = {}
+    manager.startingSessions = {}
+    manager.nextSessionId = 0
+    manager.lock = Lock()
+    return manager
+
+
+def waitForState(manager, sessionId, state):
+    deadline = time.time() + 2.0
+    while time.time() < deadline:
+        sessions = [session for session in manager.getSessions() if session['id'] == sessionId]
+        if sessions and sessions[0]['state'] == state:
+            return sessions[0]
+        time.sleep(0.01)
+    raise AssertionError('session {} is not {}'.format(sessionId, state))
+
+
+@pytest.mark.parametrize('settings', [
+    None,
+    [],
+    {'isLive': 0, 'file': 0},
+    {'file': 0, 'predictor': 0},
+    {'isLive': 0, 'predictor': 0},
+    {'isLive': 0, 'file': 0, 'predictor': 2},
+    {'isLive': 0, 'file': 2, 'predictor': 0},
+    {'isLive': 0, 'file': '0', 'predictor': 0},
+])
+def test_invalid_settings_are_rejected(manager, settings):
+    with pytest.raises(ValueError):
+        manager.checkSettings(settings)
+    with pytest.raises(ValueError):
+        manager.startSession(settings)
+    assert manager.getSessions() == []
+
+
+def test_live_session_needs_no_file(manager):
+    manager.checkSettings({'isLive': 1, 'predictor': 0})
+    manager.checkSettings({'isLive': 0, 'file': 1, 'predictor': 1})
+
+
+def test_session_is_started_in_the_background(manager):
+    sessionId = manager.startSession({'isLive': 0, 'file': 1, 'predictor': 0})
+    session = waitForState(manager, sessionId, 'running')
+    assert session == {'id': sessionId, 'state': 'running', 'isLive': 0, 'file': 1, 'predictor': 0}
+    assert manager.getSession(sessionId).settings['file'] == 1
+    manager.closeSession(sessionId)
+    assert manager.getSessions() == []
+
+
+def test_failed_start_is_reported_until_closed(manager):
+    sessionId = manager.startSession({'isLive': 1, 'predictor': 1})
+    session = waitForState(manager, sessionId, 'failed')
+    assert session['error'] == 'predictor failed'
+    with pytest.raises(KeyError):
+        manager.getSession(sessionId)
+    manager.closeSession(sessionId)
+    assert manager.getSessions() == []
@@ -0,0 +1,78 @@
+import numpy as np
+import torch
+
+from server.buffers.ring_buffer import SequenceRingBuffer
+from server.config.config import SPEC_NUM_BINS, SLIDING_WINDOW_SIZE
+from server.consumer.predictors.dcase_predictor_provider.dcase_predictor_provider import DcasePredictorProvider
+
+
+class CountingProvider(DcasePredictorProvider):
+    # stands in for a predictor class with a shared network, counts the loads
+    loads = 0
+
+    @classmethod
+    def loadModel(cls):
+        with cls._sharedLock:
+            if cls not in cls._models:
+                cls.loads += 1
+                cls._models[cls] = object()
+            return cls._models[cls]
+
+
+def test_shared_model_is_unloaded_by_its_last_user():
+    running, spare = CountingProvider(), CountingProvider()
+    assert running.prediction_model is spare.prediction_model
+
+    # evicting the spare must not unload the network of the running predictor
+    spare.release()
+    spare.release()
+    assert CountingProvider in CountingProvider._models
+    refill = CountingProvider()
+    assert refill.prediction_model is running.prediction_model
+    assert CountingProvider.loads == 1
+
+    running.releaseModel()
+    assert CountingProvider in CountingProvider._models
+    refill.release()
+    assert CountingProvider not in CountingProvider._models
+    assert CountingProvider not in CountingProvider._modelUsers
+
+    # the next instance loads the network again
+    CountingProvider().release()
+    assert CountingProvider.loads == 2
+
+
+class RecordingNet(torch.nn.Module):
+    # stands in for the CNN, records the shapes of its inputs
+    def __init__(self):
+        super().__init__()
+        self.shapes = []
+
+    def forward(self, x):
+        self.shapes.append(tuple(x.shape))
+        return torch.zeros(x.shape[0], 3)
+
+
+class RecordingProvider(DcasePredictorProvider):
+    @classmethod
+    def loadModel(cls):
+        with cls._sharedLock:
+            return cls._models.setdefault(cls, RecordingNet())
+
+
+def test_warm_up_predicts_an_empty_window():
+    provider = RecordingProvider()
+    provider.warmUp()
+    assert provider.prediction_model.shapes == [(1, 1, SPEC_NUM_BINS, SLIDING_WINDOW_SIZE)]
+    provider.release()
+
+
+def test_registered_predictor_starts_with_a_full_window():
+    manager = type('Manager', (), {})()
+    manager.featureRing = SequenceRingBuffer(1024, (SPEC_NUM_BINS,), np.float32)
+    manager.featureRing.putMany(np.ones((300, SPEC_NUM_BINS), dtype=np.float32))
+    provider = CountingProvider()
+    provider.registerManager(manager)
+    assert provider.cursor.position == 300
+    assert provider.sliding_window.view().all()
+    provider.release()
@@ -0,0 +1,33 @@
+import time
+
+from server.buffers.sequence_notifier import SequenceNotifier
+from server.consumer.predictors.example_predictor.dummy_predictor import DummyPredictor
+
+
+class FakeSession:
+    # the parts of an audio session the dummy predictor uses
+    def __init__(self):
+        self.featureNotifier = SequenceNotifier()
+        self.sharedMemory = [b'chunk']
+        self.predictions = 0
+
+    def onNewPredictionCalculated(self, probs):
+        self.predictions += 1
+
+
+def test_predictor_waits_for_new_columns():
+    session = FakeSession()
+    predictor = DummyPredictor()
+    session.predProvider = predictor
+    predictor.registerManager(session)
+    predictor.start()
+    try:
+        time.sleep(0.2)
+        assert session.predictions == 1
+        for sequence in range(1, 4):
+            session.featureNotifier.publish(sequence)
+            time.sleep(0.05)
+        assert session.predictions == 4
+    finally:
+        predictor.stop()
+    assert not predictor.predThread.is_alive()
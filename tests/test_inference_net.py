@@ -0,0 +1,52 @@
+import os
+import torch
+
+from server.config.config import SPEC_NUM_BINS, SLIDING_WINDOW_SIZE
+from server.consumer.predictors.dcase_predictor_provider.baseline_net import Net
+from server.consumer.predictors.dcase_predictor_provider.inference_net import INFERENCE_TOLERANCE, CACHE_KEY_FILE, \
+    buildInferenceModel, cacheKey, compareWithNet, loadNet, saveCachedModule
+
+
+def randomWeights(path):
+    # random Net whose batch normalization statistics are not the identity
+    torch.manual_seed(0)
+    net = Net()
+    for module in net.modules():
+        if isinstance(module, torch.nn.BatchNorm2d):
+            module.running_mean.uniform_(-0.5, 0.5)
+            module.running_var.uniform_(0.5, 2.0)
+            module.weight.data.uniform_(0.5, 1.5)
+            module.bias.data.uniform_(-0.5, 0.5)
+    torch.save(net.state_dict(), path)
+    return loadNet(path)
+
+
+def windows():
+    torch.manual_seed(1)
+    return torch.rand(2, 1, SPEC_NUM_BINS, SLIDING_WINDOW_SIZE) * 3
+
+
+def test_frozen_model_matches_net(tmp_path):
+    weightsPath = str(tmp_path / 'net.pt')
+    net = randomWeights(weightsPath)
+    model = buildInferenceModel(weightsPath)
+    assert compareWithNet(net, model, windows()) < INFERENCE_TOLERANCE
+
+    # the second build loads the cached module
+    assert os.path.exists(str(tmp_path / 'net.inference.pt'))
+    cached = buildInferenceModel(weightsPath)
+    assert compareWithNet(net, cached, windows()) < INFERENCE_TOLERANCE
+
+
+def test_stale_cache_is_rebuilt(tmp_path):
+    weightsPath = str(tmp_path / 'net.pt')
+    cachePath = str(tmp_path / 'net.inference.pt')
+    net = randomWeights(weightsPath)
+    # a cached module of another source code or torch version, newer than the weights
+    saveCachedModule(buildInferenceModel(weightsPath), cachePath, 'stale')
+
+    model = buildInferenceModel(weightsPath)
+    assert compareWithNet(net, model, windows()) < INFERENCE_TOLERANCE
+    extraFiles = {CACHE_KEY_FILE: ''}
+    torch.jit.load(cachePath, _extra_files=extraFiles)
+    assert extraFiles[CACHE_KEY_FILE] == cacheKey().encode()
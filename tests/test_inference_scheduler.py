@@ -0,0 +1,117 @@
+import time
+import numpy as np
+import pytest
+
+from threading import Event, Thread
+
+from server.consumer.predictors.inference_scheduler import InferenceScheduler
+
+
+class RecordingModel:
+    # doubles every window and records the batch sizes, blocks while gate is cleared
+    def __init__(self):
+        self.batches = []
+        self.gate = Event()
+        self.gate.set()
+
+    def __call__(self, windows):
+        self.gate.wait()
+        self.batches.append(len(windows))
+        return windows * 2
+
+
+def window(value):
+    return np.full((2, 3), value, dtype=np.float32)
+
+
+def test_pending_windows_form_one_batch():
+    model = RecordingModel()
+    scheduler = InferenceScheduler(model, maxBatchSize=8, maxWait=0.05)
+    requests = [scheduler.submit(window(value)) for value in range(5)]
+    scheduler.start()
+    results = [request.wait(5) for request in requests]
+    scheduler.join()
+    assert model.batches == [5]
+    assert [result[0, 0] for result in results] == [0, 2, 4, 6, 8]
+    assert scheduler.getStats() == {'batches': 1, 'requests': 5, 'averageBatchSize': 5.0}
+
+
+def test_batches_are_closed_at_max_batch_size():
+    model = RecordingModel()
+    scheduler = InferenceScheduler(model, maxBatchSize=4, maxWait=0.05)
+    requests = [scheduler.submit(window(value)) for value in range(10)]
+    scheduler.start()
+    for request in requests:
+        request.wait(5)
+    scheduler.join()
+    assert model.batches == [4, 4, 2]
+
+
+def test_single_window_waits_at_most_max_wait():
+    scheduler = InferenceScheduler(RecordingModel(), maxBatchSize=8, maxWait=0.2)
+    scheduler.start()
+    start = time.monotonic()
+    scheduler.predict(window(1), timeout=5)
+    elapsed = time.monotonic() - start
+    scheduler.join()
+    assert 0.15 < elapsed < 2
+
+
+def test_errors_reach_the_caller():
+    def failing(windows):
+        raise ValueError('broken network')
+
+    scheduler = InferenceScheduler(failing, maxWait=0)
+    scheduler.start()
+    with pytest.raises(ValueError):
+        scheduler.predict(window(1), timeout=5)
+    scheduler.join()
+
+
+def test_stop_fails_pending_windows_and_rejects_new_ones():
+    model = RecordingModel()
+    model.gate.clear()
+    scheduler = InferenceScheduler(model, maxBatchSize=1, maxWait=0)
+    scheduler.start()
+    running = scheduler.submit(window(1))
+    time.sleep(0.1)     # the first batch is in the forward pass
+    pending = scheduler.submit(window(2))
+    stopper = Thread(target=scheduler.join)
+    stopper.start()
+    time.sleep(0.1)
+    model.gate.set()
+    stopper.join(5)
+
+    assert running.wait(1)[0, 0] == 2
+    with pytest.raises(RuntimeError):
+        pending.wait(1)
+    with pytest.raises(RuntimeError):
+        scheduler.submit(window(3))
+
+
+def test_window_submitted_during_the_stop_is_not_lost():
+    scheduler = InferenceScheduler(RecordingModel(), maxWait=0)
+    scheduler.start()
+    put = scheduler.queue.put
+
+    def slowPut(request):
+        time.sleep(0.3)     # the stop is requested between the check and the put
+        put(request)
+
+    scheduler.queue.put = slowPut
+    requests = []
+    submitter = Thread(target=lambda: requests.append(scheduler.submit(window(1))))
+    submitter.start()
+    time.sleep(0.1)
+    scheduler.join()
+    submitter.join()
+    try:
+        requests[0].wait(1)
+    except RuntimeError:
+        pass    # failed by the stop, but done
+
+
+def test_predict_times_out():
+    scheduler = InferenceScheduler(RecordingModel())
+    with pytest.raises(TimeoutError):
+        scheduler.predict(window(1), timeout=0.05)
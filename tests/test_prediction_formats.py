@@ -0,0 +1,65 @@
+import io
+import json
+import numpy as np
+import pytest
+
+from server.streaming.prediction_formats import FORMATS, MIMETYPES, classesTag, encodePrediction
+
+PREDICTION = [['Bark', 0.125, 0], ['Cello', 0.5, 1], ['Chime', 0.0625, 2], ['Cough', 0.3125, 3]]
+PROBS = np.array([entry[1] for entry in PREDICTION], dtype=np.float32)
+
+
+def decode(content, format, k):
+    # returns the class indices and probabilities of an encoded prediction
+    if format == 'json':
+        entries = json.loads(content)
+        return [entry[2] for entry in entries], [entry[1] for entry in entries]
+    if format == 'msgpack':
+        import msgpack
+        entries = msgpack.unpackb(content)
+        assert entries['seq'] == 7
+        return entries['indices'], entries['probs']
+    if format == 'npy':
+        array = np.load(io.BytesIO(content))
+        if k is None:
+            return list(range(len(array))), array.tolist()
+        assert array.dtype.names == ('index', 'prob')
+        return array['index'].tolist(), array['prob'].tolist()
+    dtype = '<f2' if format == 'float16' else '<f4'
+    if k is None:
+        return list(range(len(PREDICTION))), np.frombuffer(content, dtype=dtype).tolist()
+    return np.frombuffer(content[:2 * k], dtype='<u2').tolist(), np.frombuffer(content[2 * k:], dtype=dtype).tolist()
+
+
+@pytest.mark.parametrize('format', FORMATS)
+@pytest.mark.parametrize('k', [None, 2, 4, 10])
+def test_encode_prediction(format, k):
+    if format == 'msgpack':
+        pytest.importorskip('msgpack')
+    content, mimetype = encodePrediction(7, PREDICTION, k, format)
+    assert mimetype == MIMETYPES[format]
+    indices, probs = decode(content, format, None if k is None or k >= len(PREDICTION) else k)
+    if k == 2:
+        # the k most probable classes, highest first
+        assert indices == [1, 3]
+    else:
+        assert indices == [0, 1, 2, 3]
+    assert np.allclose(probs, PROBS[indices])
+
+
+def test_json_keeps_the_class_names():
+    content, _ = encodePrediction(0, PREDICTION, 1)
+    assert json.loads(content) == [['Cello', 0.5, 1]]
+    assert json.loads(encodePrediction(0, PREDICTION)[0]) == PREDICTION
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        encodePrediction(0, PREDICTION, format='xml')
+
+
+def test_classes_tag_changes_with_the_class_names():
+    tag = classesTag(PREDICTION)
+    assert tag == classesTag([[name, 0.0, index] for name, _, index in PREDICTION])
+    assert tag != classesTag(PREDICTION[:3])
+    assert tag != classesTag([['Bark', 0.0, 0], ['Cello', 0.0, 1], ['Chime', 0.0, 2], ['Cowbell', 0.0, 3]])
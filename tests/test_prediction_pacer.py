@@ -0,0 +1,19 @@
+from server.consumer.predictors.prediction_pacer import PredictionPacer
+
+
+def test_hop_widens_under_load_and_recovers():
+    pacer = PredictionPacer(hop=1, maxLoad=0.5, maxHop=64)
+    assert pacer.isDue(0)
+    pacer.record(0, 10.0)
+    assert pacer.hop == 64
+    assert not pacer.isDue(63) and pacer.isDue(64)
+    for head in range(64, 64 * 40, 64):
+        pacer.record(head, 0.0)
+    assert pacer.hop == 1
+
+
+def test_hop_is_multiple_of_step():
+    pacer = PredictionPacer(hop=1, maxLoad=0.5, maxHop=60, step=8)
+    assert (pacer.baseHop, pacer.maxHop) == (8, 64)
+    pacer.record(0, pacer.chunkDuration * 0.5 * 11)
+    assert pacer.hop == 16
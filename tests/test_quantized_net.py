@@ -0,0 +1,14 @@
+import os
+import sys
+import subprocess
+
+
+def test_provider_does_not_import_quantization():
+    # torch.ao quantization breaks scripting the float network, it is only loaded by the INT8 variant
+    script = ('import sys\n'
+              'import server.consumer.predictors.dcase_predictor_provider.dcase_predictor_provider\n'
+              'print("torch.ao.quantization.quantize_fx" in sys.modules, '
+              '"server.consumer.predictors.dcase_predictor_provider.quantized_net" in sys.modules)\n')
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.split() == ['False', 'False']
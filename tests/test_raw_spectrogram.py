@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from threading import Lock
+
+from server.audio_tagger_manager import AudioSession
+from server.rendering.raw_spectrogram import COLOR_SCALE, encodeColumns
+
+
+def columns(nBins=4, nColumns=3):
+    # column c of bin b holds b + 10 * c
+    return (np.arange(nBins)[:, None] + 10 * np.arange(nColumns)[None, :]).astype(np.float32) / 100
+
+
+def test_columns_are_encoded_time_major():
+    spec = columns()
+    values = np.frombuffer(encodeColumns(spec, 'float16'), dtype='<f2').reshape(3, 4)
+    assert np.allclose(values, spec.T, atol=1e-3)
+    assert np.allclose(values[1], spec[:, 1], atol=1e-3)
+
+
+def test_uint8_columns_are_color_indices():
+    spec = np.array([[-1.0, 0.0, 1.5], [3.0, 10.0, 2.99]], dtype=np.float32)
+    content = encodeColumns(spec)
+    assert len(content) == spec.size
+    values = np.frombuffer(content, dtype=np.uint8).reshape(3, 2)
+    assert values.T.tolist() == [[0, 0, int(1.5 * COLOR_SCALE)], [255, 255, int(2.99 * COLOR_SCALE)]]
+
+
+def test_non_contiguous_columns():
+    spec = columns(4, 6)[:, 2:5]
+    assert encodeColumns(spec) == encodeColumns(np.ascontiguousarray(spec))
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        encodeColumns(columns(), 'float32')
+
+
+@pytest.mark.parametrize('since, expected', [
+    (None, 8), (100, 0), (97, 3), (92, 8), (50, 8), (150, 8),
+])
+def test_columns_since_a_cursor(since, expected):
+    session = AudioSession.__new__(AudioSession)
+    session.visualLock = Lock()
+    session.visualHead = 100
+    session.curVisual = columns(4, 8)
+    head, visual = session.getVisualisationColumns(since)
+    assert head == 100 and visual.shape == (4, expected)
+    assert np.array_equal(visual, session.curVisual[:, 8 - expected:])
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from server.buffers.read_cursor import ReadCursor, LAG_POLICY_CATCHUP, LAG_POLICY_DROP, LAG_POLICY_RESYNC, \
+    readBacklog
+from server.buffers.ring_buffer import SequenceRingBuffer
+
+
+def filledRing(size, rows):
+    ring = SequenceRingBuffer(size, (2,), np.float32)
+    for row in np.arange(2 * rows, dtype=np.float32).reshape(rows, 2):
+        ring.put(row)
+    return ring
+
+
+def test_cursor_reads_every_row_once():
+    ring = filledRing(16, 3)
+    cursor = ReadCursor(ring, 8, position=0)
+    assert np.array_equal(cursor.readPending()[:, 0], [0, 2, 4])
+    assert len(cursor.readPending()) == 0
+    ring.put(np.zeros(2, dtype=np.float32))
+    assert len(cursor.readPending()) == 1
+    assert cursor.getStats() == {'lag': 1, 'maxLag': 3, 'processed': 4, 'dropped': 0, 'policy': LAG_POLICY_CATCHUP}
+
+
+@pytest.mark.parametrize('policy, rows', [(LAG_POLICY_CATCHUP, 12), (LAG_POLICY_DROP, 4), (LAG_POLICY_RESYNC, 1)])
+def test_lag_policy(policy, rows):
+    ring = filledRing(16, 12)
+    cursor = ReadCursor(ring, 4, policy, position=0)
+    assert len(cursor.readPending()) == rows
+    assert cursor.position == 12
+    assert cursor.processed + cursor.dropped == 12
+
+
+def test_overwritten_rows_are_dropped():
+    ring = filledRing(4, 10)
+    cursor = ReadCursor(ring, 100, position=0)
+    assert np.array_equal(cursor.readPending()[:, 0], [12, 14, 16, 18])
+    assert cursor.dropped == 6
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        ReadCursor(filledRing(4, 0), 4, 'skip')
+
+
+def test_backlog_returns_newest_rows():
+    ring = filledRing(16, 10)
+    head, rows = readBacklog(ring, 4)
+    assert head == 10
+    assert np.array_equal(rows[:, 0], [12, 14, 16, 18])
+
+
+def test_backlog_is_clamped_to_the_ring():
+    ring = filledRing(16, 40)
+    head, rows = readBacklog(ring, 32)
+    assert head == 40 and len(rows) == 16
+    assert rows[0, 0] == 2 * ring.tail
+
+    # rows before a given head which have all been overwritten
+    head, rows = readBacklog(ring, 4, head=10)
+    assert head == 10 and len(rows) == 0
@@ -0,0 +1,38 @@
+import numpy as np
+
+from server.rendering.render_cache import RenderCache
+
+
+def spec(value):
+    return np.full((8, 16), value, dtype=np.float32)
+
+
+def test_etag_identifies_the_rendition():
+    cache = RenderCache()
+    etag = cache.etag(0, 1, 3, 90)
+    assert etag == cache.etag(0, 1, 3, 90)
+    assert len({etag, cache.etag(1, 1, 3, 90), cache.etag(0, 2, 3, 90), cache.etag(0, 1, 2, 90),
+                cache.etag(0, 1, 3, 80)}) == 5
+    # a restarted backend never matches ETags of the previous run
+    assert RenderCache().etag(0, 1, 3, 90) != etag
+
+
+def test_rendition_is_computed_once():
+    cache = RenderCache()
+    content, etag = cache.render(0, 1, spec(1.0), 2, 90)
+    assert content[:2] == b'\xff\xd8' and etag == cache.etag(0, 1, 2, 90)
+    # the spectrogram of a cached version is not rendered again
+    assert cache.render(0, 1, spec(2.0), 2, 90) == (content, etag)
+    assert cache.getStats() == {'hits': 1, 'misses': 1, 'size': 1}
+    assert cache.render(0, 2, spec(2.0), 2, 90)[0] != content
+
+
+def test_least_recently_used_rendition_is_evicted():
+    cache = RenderCache(maxSize=2)
+    cache.render(0, 1, spec(1.0))
+    cache.render(0, 2, spec(2.0))
+    cache.render(0, 1, spec(1.0))
+    cache.render(0, 3, spec(3.0))
+    assert [key[:2] for key in cache.renditions] == [(0, 1), (0, 3)]
+    cache.render(0, 2, spec(2.0))
+    assert cache.getStats()['misses'] == 4
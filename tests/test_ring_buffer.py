@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from server.buffers.ring_buffer import SequenceRingBuffer, AudioRingBuffer
+from server.features.feature_ring import FeatureRing
+
+
+def rows(start, stop):
+    # row i holds the value i, so every row tells its sequence number
+    return np.arange(start, stop, dtype=np.float32)[:, np.newaxis].repeat(2, axis=1)
+
+
+def test_put_wraps_around():
+    ring = SequenceRingBuffer(4, 2, np.float32)
+    assert [ring.put(row) for row in rows(0, 6)] == list(range(6))
+    assert (ring.head, ring.tail, len(ring)) == (6, 2, 4)
+    assert [ring.view(seq)[0] for seq in range(2, 6)] == [2, 3, 4, 5]
+    assert ring.latest()[0] == 5
+
+
+def test_overwritten_rows_are_not_available():
+    ring = SequenceRingBuffer(4, 2, np.float32)
+    ring.putMany(rows(0, 6))
+    assert not ring.isAvailable(1)
+    assert ring.isAvailable(2, 6)
+    with pytest.raises(IndexError):
+        ring.view(1)
+    with pytest.raises(IndexError):
+        ring.view(6)
+
+
+def test_put_many_keeps_sequence_numbers_of_overwritten_rows():
+    ring = SequenceRingBuffer(4, 2, np.float32)
+    ring.put(rows(0, 1)[0])
+    assert ring.putMany(rows(1, 11)) == 7
+    assert (ring.head, ring.tail) == (11, 7)
+    assert np.array_equal(ring.read(7, 11), rows(7, 11))
+
+
+def test_read_straddling_the_wrap_point_copies():
+    ring = SequenceRingBuffer(8, 2, np.float32)
+    ring.putMany(rows(0, 10))
+    straddling = ring.read(5, 10)
+    assert np.array_equal(straddling, rows(5, 10))
+    assert not np.shares_memory(straddling, ring.buffer)
+
+    # a range which does not wrap is a view unless out is given
+    assert np.shares_memory(ring.read(2, 5), ring.buffer)
+    out = np.empty((3, 2), dtype=np.float32)
+    assert ring.read(2, 5, out=out) is out
+    assert np.array_equal(out, rows(2, 5))
+
+
+def test_reader_lagging_past_capacity():
+    ring = SequenceRingBuffer(4, 2, np.float32)
+    position = ring.head
+    ring.putMany(rows(0, 3))
+    assert np.array_equal(ring.read(position, ring.head), rows(0, 3))
+    position = ring.head
+    for row in rows(3, 10):
+        ring.put(row)
+    # the reader lost rows 3 to 5, it can only resume at the tail
+    with pytest.raises(IndexError):
+        ring.read(position, ring.head)
+    assert ring.tail == 6
+    assert np.array_equal(ring.read(ring.tail, ring.head), rows(6, 10))
+
+
+def test_clear_keeps_sequence_numbers():
+    ring = SequenceRingBuffer(4, 2, np.float32)
+    ring.putMany(rows(0, 3))
+    ring.clear()
+    assert len(ring) == 0 and ring.latest() == (None, None)
+    assert ring.put(rows(3, 4)[0]) == 3
+
+
+def test_audio_chunks_are_padded():
+    ring = AudioRingBuffer(2, 4)
+    ring.putBytes(np.array([1, 2, 3, 4], dtype=np.int16).tobytes())
+    ring.putBytes(np.array([5, 6], dtype=np.int16).tobytes())
+    assert np.array_equal(ring.read(0, 2), [[1, 2, 3, 4], [5, 6, 0, 0]])
+
+
+def test_feature_ring_returns_copies():
+    ring = FeatureRing(4, 3)
+    ring.put(np.ones(3, dtype=np.float32))
+    column = ring.get(0)
+    column[:] = 0
+    assert ring.get(0).all()
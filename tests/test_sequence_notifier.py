@@ -0,0 +1,77 @@
+import time
+
+from threading import Thread
+
+from server.buffers.sequence_notifier import SequenceNotifier
+
+
+def waitInThread(subscription, lastSeen, timeout=None):
+    # runs wait() in a thread and records its result and the time it returned
+    result = {}
+
+    def run():
+        result['reached'] = subscription.wait(lastSeen, timeout)
+        result['time'] = time.monotonic()
+    thread = Thread(target=run, daemon=True)
+    thread.start()
+    time.sleep(0.05)
+    return thread, result
+
+
+def test_publish_wakes_up_the_subscriber():
+    notifier = SequenceNotifier()
+    thread, result = waitInThread(notifier.subscribe(), 0)
+    assert thread.is_alive()
+    notifier.publish(1)
+    thread.join(1.0)
+    assert result['reached']
+
+
+def test_subscriber_wakes_up_once_per_batch():
+    notifier = SequenceNotifier()
+    thread, result = waitInThread(notifier.subscribe(batch=4), 0)
+    for sequence in range(1, 4):
+        notifier.publish(sequence)
+    time.sleep(0.05)
+    assert thread.is_alive()
+    published = time.monotonic()
+    notifier.publish(4)
+    thread.join(1.0)
+    assert result['reached'] and result['time'] >= published
+
+
+def test_sequence_published_before_wait_is_not_lost():
+    notifier = SequenceNotifier()
+    subscription = notifier.subscribe()
+    notifier.publish(1)
+    start = time.monotonic()
+    assert subscription.wait(0, timeout=1.0)
+    assert time.monotonic() - start < 0.5
+
+
+def test_skipped_sequences_wake_up_the_subscriber():
+    # a publisher may pass over the target, e.g. when several chunks are published at once
+    notifier = SequenceNotifier()
+    thread, result = waitInThread(notifier.subscribe(batch=2), 3)
+    notifier.publish(10)
+    thread.join(1.0)
+    assert result['reached']
+
+
+def test_wait_times_out():
+    notifier = SequenceNotifier()
+    start = time.monotonic()
+    assert not notifier.subscribe().wait(0, timeout=0.1)
+    assert time.monotonic() - start >= 0.1
+
+
+def test_cancel_wakes_up_and_unsubscribes():
+    notifier = SequenceNotifier()
+    subscription = notifier.subscribe()
+    thread, result = waitInThread(subscription, 0)
+    subscription.cancel()
+    thread.join(1.0)
+    assert not result['reached']
+    assert subscription not in notifier.subscriptions
+    notifier.publish(1)
+    assert not subscription.wait(0, timeout=1.0)
@@ -0,0 +1,170 @@
+from threading import Event, Lock
+
+import server.session_switch as session_switch
+from server.audio_tagger_manager import AudioSession
+from server.session_switch import SettingsSwitch, PredictorBinding
+
+
+class FakeProducer:
+    # delivers its chunks synchronously when started
+    def __init__(self, session, chunks=1):
+        self.session = session
+        self.chunks = chunks
+        self.activated = Event()
+        self.accepted = []
+        self.joined = False
+
+    def start(self):
+        self.accepted = [self.session.putToSM(b'chunk', self) for _ in range(self.chunks)]
+
+    def join(self):
+        self.joined = True
+
+
+class FakePredictor:
+    # delivers its predictions synchronously when started
+    def __init__(self, predictions=1, fails=False):
+        self.predictions = predictions
+        self.fails = fails
+        self.binding = None
+        self.stopped = False
+
+    def registerManager(self, binding):
+        self.binding = binding
+
+    def start(self):
+        if self.fails:
+            raise RuntimeError('predictor failed')
+        for i in range(self.predictions):
+            self.binding.onNewPredictionCalculated([['new', i]])
+
+    def stop(self):
+        self.stopped = True
+
+
+class FakeManager:
+    def __init__(self, producer, predictor):
+        self.producer = producer
+        self.predictor = predictor
+
+    def createProducer(self, session, settings):
+        return self.producer
+
+    def createPredictor(self, predictorId):
+        return self.predictor
+
+
+class FakeMemory:
+    def __init__(self):
+        self.chunks = 0
+
+    def putBytes(self, chunk):
+        self.chunks += 1
+
+
+class FakeNotifier:
+    def publish(self, version):
+        pass
+
+
+def createSession(producer, predictor):
+    # a session with an old producer and predictor, without audio and feature threads
+    session = AudioSession.__new__(AudioSession)
+    session.manager = FakeManager(producer(session), predictor)
+    session.settings = {'isLive': 0, 'file': 0, 'predictor': 0}
+    session.closed = False
+    session.switchLock, session.producerLock, session.predictionLock = Lock(), Lock(), Lock()
+    session.sharedMemory = FakeMemory()
+    session.producerThread, session.pendingProducer = FakeProducer(session), None
+    session.predProvider, session.pendingPredBinding = FakePredictor(), None
+    session.predBinding = PredictorBinding(session, session.predProvider)
+    session.curPred, session.predictionVersion = None, 0
+    session.predictionNotifier = FakeNotifier()
+    return session
+
+
+def runSwitch(session, settings):
+    switch = SettingsSwitch(session, 0, settings)
+    switch.start()
+    switch.join(5)
+    return switch
+
+
+def test_new_producer_and_predictor_take_over_with_their_first_output():
+    newPredictor = FakePredictor()
+    session = createSession(FakeProducer, newPredictor)
+    oldProducer, oldPredictor, oldBinding = session.producerThread, session.predProvider, session.predBinding
+
+    switch = runSwitch(session, {'isLive': 1, 'file': 0, 'predictor': 1})
+    status = switch.getStatus()
+    assert (status['state'], status['producer'], status['predictor']) == ('done', 'switched', 'switched')
+    assert status['error'] is None and status['switchTime'] is not None
+    assert session.settings == {'isLive': 1, 'file': 0, 'predictor': 1}
+
+    assert session.producerThread is session.manager.producer and session.producerThread.accepted == [True]
+    assert session.predProvider is newPredictor and session.curPred == [['new', 0]]
+    assert oldProducer.joined and oldPredictor.stopped
+
+    # output of the replaced producer and predictor is dropped
+    assert not session.putToSM(b'chunk', oldProducer)
+    oldBinding.onNewPredictionCalculated([['old', 0]])
+    assert session.curPred == [['new', 0]] and session.predictionVersion == 1
+    assert session.sharedMemory.chunks == 1
+
+
+def test_old_producer_keeps_delivering_while_the_new_one_primes():
+    session = createSession(lambda session: FakeProducer(session, chunks=0), FakePredictor())
+    oldProducer = session.producerThread
+    switch = SettingsSwitch(session, 0, {'isLive': 1, 'file': 0, 'predictor': 0})
+    newProducer = session.manager.producer
+    newProducer.start = lambda: newProducer.accepted.extend(
+        [session.putToSM(b'chunk', oldProducer), session.putToSM(b'chunk', newProducer)])
+    switch.start()
+    switch.join(5)
+    assert newProducer.accepted == [True, True]
+    assert switch.getStatus()['predictor'] == 'unchanged'
+    assert session.producerThread is newProducer and oldProducer.joined
+
+
+def test_switch_is_forced_after_the_prime_timeout(monkeypatch):
+    monkeypatch.setattr(session_switch, 'SWITCH_PRIME_TIMEOUT', 0.05)
+    newPredictor = FakePredictor(predictions=0)
+    session = createSession(lambda session: FakeProducer(session, chunks=0), newPredictor)
+    oldPredictor = session.predProvider
+
+    switch = runSwitch(session, {'isLive': 1, 'file': 0, 'predictor': 1})
+    status = switch.getStatus()
+    assert (status['state'], status['producer'], status['predictor']) == ('done', 'forced', 'forced')
+    assert session.producerThread is session.manager.producer and session.producerThread.activated.is_set()
+    assert session.predProvider is newPredictor and oldPredictor.stopped
+    assert session.pendingProducer is None and session.pendingPredBinding is None
+
+    # the forced predictor publishes its predictions like one which primed in time
+    newPredictor.binding.onNewPredictionCalculated([['new', 0]])
+    assert session.curPred == [['new', 0]]
+
+
+def test_failed_predictor_keeps_the_old_one():
+    session = createSession(FakeProducer, FakePredictor(fails=True))
+    oldPredictor = session.predProvider
+    switch = runSwitch(session, {'isLive': 0, 'file': 1, 'predictor': 1})
+    status = switch.getStatus()
+    assert (status['state'], status['error']) == ('failed', 'predictor failed')
+    assert session.predProvider is oldPredictor and not oldPredictor.stopped
+    assert session.pendingPredBinding is None
+    assert session.settings == {'isLive': 0, 'file': 1, 'predictor': 0}
+
+
+def test_closed_session_is_not_switched():
+    session = createSession(FakeProducer, FakePredictor())
+    session.closed = True
+    switch = runSwitch(session, {'isLive': 1, 'file': 0, 'predictor': 1})
+    assert switch.getStatus()['state'] == 'failed'
+    assert session.manager.producer.accepted == []
+
+
+def test_status_reports_a_queued_switch():
+    settings = {'isLive': 1, 'file': 0, 'predictor': 0}
+    switch = SettingsSwitch(createSession(FakeProducer, FakePredictor()), 3, settings)
+    assert switch.getStatus() == {'id': 3, 'state': 'queued', 'producer': 'pending', 'predictor': 'pending',
+                                  'settings': settings, 'switchTime': None, 'error': None}
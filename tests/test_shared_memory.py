@@ -0,0 +1,88 @@
+import os
+import sys
+import subprocess
+import multiprocessing
+import numpy as np
+import pytest
+
+from multiprocessing.shared_memory import SharedMemory
+
+from server.buffers.ring_buffer import SequenceRingBuffer
+from server.buffers.shared_memory import SharedRingMemory, SharedResultSlot, attachRing
+
+
+def rows(start, stop):
+    # row i holds the value i, so every row tells its sequence number
+    return np.arange(start, stop, dtype=np.float32)[:, np.newaxis].repeat(2, axis=1)
+
+
+def readRows(ringSpec, slotSpec, start, stop):
+    # runs in a spawned process, hands the rows back through the result slot
+    ring, slot = attachRing(ringSpec), SharedResultSlot(*slotSpec)
+    slot.write(ring.read(start, stop, out=np.empty((stop - start, 2), dtype=np.float32)).ravel(), ring.head)
+    ring.putMany(rows(ring.head, ring.head + 3))
+    ring.storage.release()
+    slot.release()
+
+
+@pytest.fixture
+def sharedRing():
+    storage = SharedRingMemory(8, 2, np.float32)
+    yield SequenceRingBuffer(8, 2, np.float32, storage)
+    storage.release()
+
+
+def test_ring_is_read_and_written_across_processes(sharedRing):
+    sharedRing.putMany(rows(0, 10))
+    slot = SharedResultSlot(10)
+    context = multiprocessing.get_context('spawn')
+    process = context.Process(target=readRows, args=(sharedRing.storage.spec, slot.spec, 5, 10))
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+
+    sequence, head, values = slot.read()
+    assert (sequence, head) == (1, 10)
+    assert np.array_equal(values.reshape(5, 2), rows(5, 10))
+    # the rows written by the worker are visible in the creator, the block outlives the worker
+    assert (sharedRing.head, sharedRing.tail) == (13, 5)
+    assert np.array_equal(sharedRing.read(8, 13, out=np.empty((5, 2), dtype=np.float32)), rows(8, 13))
+    slot.release()
+
+
+def test_attaching_in_another_program_keeps_the_block(sharedRing):
+    # a process not started by multiprocessing has its own resource tracker, which must not unlink the block
+    script = ('import sys\n'
+              'from server.buffers.shared_memory import SharedRingMemory\n'
+              'storage = SharedRingMemory(8, 2, "<f4", sys.argv[1])\n'
+              'storage.counters[0] = 3\n'
+              'storage.release()\n')
+    result = subprocess.run([sys.executable, '-c', script, sharedRing.storage.memory.name],
+                            capture_output=True, text=True, timeout=30,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.returncode == 0
+    assert 'leaked' not in result.stderr
+    assert sharedRing.head == 3
+    SharedMemory(name=sharedRing.storage.memory.name).close()
+
+
+class WritingArray(np.ndarray):
+    # output array which lets the writer wrap around while the reader copies
+    def __setitem__(self, key, value):
+        writer = getattr(self, 'writer', None)
+        if writer is not None:
+            self.writer = None
+            writer.putMany(rows(writer.head, writer.head + 4))
+        super().__setitem__(key, value)
+
+
+def test_rows_overwritten_during_the_copy_are_detected(sharedRing):
+    sharedRing.putMany(rows(0, 10))
+    reader = attachRing(sharedRing.storage.spec)
+    out = np.empty((5, 2), dtype=np.float32).view(WritingArray)
+    out.writer = sharedRing
+    with pytest.raises(IndexError):
+        reader.read(5, 10, out=out)
+    # without a concurrent writer the same read succeeds
+    assert np.array_equal(reader.read(6, 11, out=np.empty((5, 2), dtype=np.float32)), rows(6, 11))
+    reader.storage.release()
@@ -0,0 +1,50 @@
+import numpy as np
+
+from server.buffers.sliding_window import SlidingWindow
+
+
+def column(value, nBins=2):
+    return np.full(nBins, value, dtype=np.float32)
+
+
+def test_window_starts_with_zeros():
+    window = SlidingWindow(2, 3)
+    assert window.shape == (2, 3)
+    assert not window.view().any()
+
+
+def test_append_keeps_time_order_across_the_wrap():
+    window = SlidingWindow(2, 3)
+    for value in range(1, 6):
+        window.append(column(value))
+    assert window.head == 5
+    assert np.array_equal(window.view()[0], [3, 4, 5])
+    assert np.array_equal(window.snapshot()[0], [3, 4, 5])
+
+
+def test_view_is_zero_copy_and_snapshot_is_a_copy():
+    window = SlidingWindow(2, 3)
+    for value in range(1, 3):
+        window.append(column(value))
+    assert np.shares_memory(window.view(), window.storage)
+
+    snapshot = window.snapshot()
+    assert snapshot.flags['C_CONTIGUOUS'] and not np.shares_memory(snapshot, window.storage)
+    window.append(column(9))
+    assert np.array_equal(snapshot[0], [0, 1, 2])
+    assert np.array_equal(window.view()[0], [1, 2, 9])
+
+
+def test_snapshot_into_preallocated_array():
+    window = SlidingWindow(2, 3)
+    window.append(column(7))
+    out = np.empty((2, 3), dtype=np.float32)
+    assert window.snapshot(out=out) is out
+    assert np.array_equal(out[1], [0, 0, 7])
+
+
+def test_clear_keeps_the_head():
+    window = SlidingWindow(2, 3)
+    window.append(column(1))
+    window.clear()
+    assert window.head == 1 and not window.view().any()
@@ -0,0 +1,24 @@
+import numpy as np
+
+from server.config.config import SAMPLE_RATE, CHUNK_SIZE
+from server.features.spectrogram_engine import SpectrogramEngine, MADMOM_TOLERANCE, compareWithMadmom
+
+
+def syntheticChunks(n=64):
+    # sweep from 100 Hz to 8 kHz with a little noise, cut into chunks
+    t = np.arange(n * CHUNK_SIZE) / SAMPLE_RATE
+    frequency = 100 * (80 ** (t / t[-1]))
+    signal = np.sin(2 * np.pi * np.cumsum(frequency) / SAMPLE_RATE) * 12000
+    signal += np.random.RandomState(0).randn(len(signal)) * 300
+    return signal.astype(np.int16).reshape(n, CHUNK_SIZE)
+
+
+def test_matches_madmom():
+    assert compareWithMadmom(SpectrogramEngine(), syntheticChunks()) < MADMOM_TOLERANCE
+
+
+def test_silent_chunks_give_zero_columns():
+    engine = SpectrogramEngine()
+    columns = engine.process(np.zeros((3, CHUNK_SIZE), dtype=np.int16))
+    assert columns.shape == (3, engine.nBins)
+    assert not columns.any()
@@ -0,0 +1,67 @@
+import os
+import sys
+import subprocess
+
+import server.startup as startup
+from server.config.config import DEFAULT_SESSION
+from server.startup import StartupThread
+
+
+class FakePool:
+    def __init__(self):
+        self.warm = []
+
+    def start(self, preload):
+        pass
+
+    def refill(self, predictorId):
+        self.warm.append(predictorId)
+
+
+class FakeManager:
+    def __init__(self, fails=False):
+        self.predictorPool = FakePool()
+        self.fails = fails
+        self.sessions = {}
+
+    def createSession(self, settings, sessionId=None):
+        if self.fails:
+            raise RuntimeError('no audio device')
+        self.sessions[sessionId] = settings
+
+
+def runStartup(manager, monkeypatch):
+    monkeypatch.setattr(startup, 'sharedEngine', lambda: None)
+    monkeypatch.setattr(startup, 'convertSpecToJPG', lambda spec: b'')
+    monkeypatch.setattr(startup, 'STARTUP_REPORT', False)
+    thread = StartupThread(manager)
+    thread.start()
+    assert thread.finished.wait(5)
+    return thread.getStatus()
+
+
+def test_manager_module_does_not_import_heavy_libraries():
+    # torch, madmom, OpenCV, matplotlib and pyaudio are loaded by the startup thread or on first use
+    script = ('import sys\n'
+              'import server.audio_tagger_manager\n'
+              'print(*[name in sys.modules for name in ["torch", "madmom", "cv2", "matplotlib", "pyaudio"]])\n')
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.split() == ['False'] * 5
+
+
+def test_startup_starts_the_default_session(monkeypatch):
+    manager = FakeManager()
+    status = runStartup(manager, monkeypatch)
+    assert status['status'] == 'ok' and status['error'] is None
+    assert list(manager.sessions) == [DEFAULT_SESSION]
+    assert manager.predictorPool.warm == [manager.sessions[DEFAULT_SESSION]['predictor']]
+    phases = [phase['name'] for phase in status['phases']]
+    assert phases[:2] == ['predictor pool', 'predictor'] and phases[-1] == 'default session'
+    assert all(phase['duration'] is not None for phase in status['phases'])
+
+
+def test_failed_startup_is_reported(monkeypatch):
+    status = runStartup(FakeManager(fails=True), monkeypatch)
+    assert (status['status'], status['error']) == ('failed', 'no audio device')
+    assert status['phases'][-1]['name'] == 'default session'
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import torch
+
+from server.config.config import SPEC_NUM_BINS, SLIDING_WINDOW_SIZE
+from server.consumer.predictors.dcase_predictor_provider.baseline_net import Net
+from server.consumer.predictors.dcase_predictor_provider.inference_net import InferenceNet
+from server.consumer.predictors.dcase_predictor_provider.streaming_net import STREAMING_TOLERANCE, STREAMING_HOP, \
+    compareWithFull
+from server.consumer.predictors.dcase_predictor_provider.dcase_predictor_provider import \
+    StreamingDcasePredictorProvider
+
+
+def randomModel():
+    torch.manual_seed(0)
+    return InferenceNet.fromNet(Net())
+
+
+@pytest.mark.parametrize('hop', [1, 8, 64])
+def test_streaming_matches_full_forward_pass(hop):
+    torch.manual_seed(1)
+    assert compareWithFull(randomModel(), hop, steps=2) < STREAMING_TOLERANCE
+
+
+def test_predictor_predicts_aligned_windows(monkeypatch):
+    model = randomModel()
+    monkeypatch.setitem(StreamingDcasePredictorProvider._models, StreamingDcasePredictorProvider, model)
+    provider = StreamingDcasePredictorProvider()
+    assert provider.pacer.hop % STREAMING_HOP == 0
+
+    rng = np.random.RandomState(0)
+    stream = (rng.rand(SLIDING_WINDOW_SIZE + 40, SPEC_NUM_BINS) * 3).astype(np.float32)
+    head = 0
+    for advance in [SLIDING_WINDOW_SIZE, 11, 8, 21]:
+        provider.sliding_window.extend(stream[head:head + advance])
+        head += advance
+        probs = provider.predict()
+        # the predicted window ends at the newest multiple of STREAMING_HOP columns after the first prediction
+        end = SLIDING_WINDOW_SIZE + (head - SLIDING_WINDOW_SIZE) // STREAMING_HOP * STREAMING_HOP
+        assert provider.last_head == end
+        assert head - end < STREAMING_HOP
+        window = torch.from_numpy(stream[end - SLIDING_WINDOW_SIZE:end].T.copy())[None, None]
+        with torch.inference_mode():
+            expected = torch.softmax(model(window), dim=1)[0].numpy()
+        assert np.abs(np.array([prob for _, prob, _ in probs]) - expected).max() < STREAMING_TOLERANCE
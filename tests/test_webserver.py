@@ -0,0 +1,80 @@
+import os
+import numpy as np
+import pytest
+
+from threading import Event
+
+from server.config.config import PROJECT_ROOT
+
+# importing the web server reads the lists of predictors and audio files below PROJECT_ROOT
+if not os.path.exists(os.path.join(PROJECT_ROOT, 'server/config/predictors.csv')):
+    pytest.skip('PROJECT_ROOT does not point to this checkout', allow_module_level=True)
+
+from server import webserver
+
+
+class FakeSession:
+    def __init__(self):
+        self.version = 1
+        self.spec = np.ones((8, 16), dtype=np.float32)
+
+    def getVersionedVisualisation(self):
+        return self.version, self.spec
+
+
+class FakeStartup:
+    def __init__(self):
+        self.finished = Event()
+
+
+class FakeManager:
+    def __init__(self):
+        self.session = FakeSession()
+        self.startup = FakeStartup()
+        self.running = True
+
+    def start(self):
+        pass
+
+    def getSession(self, sessionId):
+        if sessionId != 0 or not self.running:
+            raise KeyError(sessionId)
+        return self.session
+
+
+@pytest.fixture
+def client(monkeypatch):
+    manager = FakeManager()
+    monkeypatch.setattr(webserver, 'model', manager)
+    monkeypatch.setattr(webserver, 'renderCache', webserver.RenderCache())
+    client = webserver.app.test_client()
+    client.manager, client.session = manager, manager.session
+    return client
+
+
+def test_unchanged_spectrogram_is_answered_with_304(client):
+    response = client.get('/live_visual')
+    assert response.status_code == 200 and response.headers['Cache-Control'] == 'no-cache'
+    etag = response.headers['ETag']
+    for route in ['/live_visual', '/live_visual_browser', '/sessions/0/live_visual']:
+        response = client.get(route, headers={'If-None-Match': etag})
+        assert response.status_code == 304 and response.data == b''
+    assert webserver.renderCache.getStats()['misses'] == 1
+
+    client.session.version += 1
+    response = client.get('/live_visual', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+
+
+def test_rendition_parameters_are_checked(client):
+    assert client.get('/live_visual?scale=1&quality=50').status_code == 200
+    assert client.get('/live_visual?scale=20').status_code == 400
+    assert client.get('/sessions/7/live_visual').status_code == 404
+
+
+def test_default_session_is_unavailable_during_startup(client):
+    client.manager.running = False
+    assert client.get('/live_visual').status_code == 503
+    assert client.get('/sessions/7/live_visual').status_code == 404
+    client.manager.startup.finished.set()
+    assert client.get('/live_visual').status_code == 404
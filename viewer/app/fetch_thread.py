@@ -0,0 +1,128 @@
+"""Background network layer of the GUI.
+
+Spectrograms and predictions are fetched by a separate thread over
+persistent keep-alive connections, so a slow response of the backend never
+blocks the UI thread. Spectrograms are requested conditionally with their ETag,
+unchanged frames cost an empty 304 response and are not decoded again. Decoded
+results are not queued: the thread only keeps the newest one and the UI
+thread picks it up once per frame.
+
+"""
+import time
+import numpy as np
+import cv2
+import requests
+
+from threading import Thread, Event
+
+BACKEND_URL = 'http://127.0.0.1:5000'
+FETCH_INTERVAL = 0.02   # seconds between two requests of the same resource
+REQUEST_TIMEOUT = 2.0   # seconds until a request is given up
+
+
+class FetchThread(Thread):
+    """
+    Thread for periodically fetching the current spectrogram
+    and class predictions from the backend.
+
+    Attributes
+    ----------
+    onSpectrogram : callable
+        receives every new decoded spectrogram image, called from this thread
+    onPrediction : callable
+        receives every new list of class predictions, called from this thread
+    interval : float
+        seconds between two fetches
+    session : requests.Session
+        keeps the connection to the backend alive between requests
+    etag : str
+        ETag of the spectrogram fetched last
+    sequence : str
+        sequence number of the prediction fetched last
+    _stopevent : threading.Event
+        indicator for stopping a thread loop
+
+    Methods
+    -------
+    run()
+        method triggered when start() method is called.
+    fetchSpectrogram()
+        fetches the spectrogram if it changed.
+    fetchPrediction()
+        fetches the 5 most probable classes if the prediction changed.
+    join()
+        sends stop signal to thread.
+    """
+    def __init__(self, onSpectrogram, onPrediction, interval=FETCH_INTERVAL, name='FetchThread'):
+        """
+        Parameters
+        ----------
+        onSpectrogram : callable
+            receives every new decoded spectrogram image
+        onPrediction : callable
+            receives every new list of class predictions
+        interval : float
+            seconds between two fetches
+        name : str
+            the name of the thread
+        """
+        self.onSpectrogram = onSpectrogram
+        self.onPrediction = onPrediction
+        self.interval = interval
+        self.session = requests.Session()
+        self.etag = None
+        self.sequence = None
+        self._stopevent = Event()
+        Thread.__init__(self, name=name, daemon=True)
+
+    def run(self):
+        """Periodically fetches spectrogram and predictions. If the backend
+        is busy, the next fetch starts right after the previous one instead
+        of piling up requests.
+        """
+        while not self._stopevent.is_set():
+            start = time.monotonic()
+            try:
+                self.fetchSpectrogram()
+                self.fetchPrediction()
+            except requests.RequestException:
+                pass    # backend not reachable, try again with the next interval
+            self._stopevent.wait(max(0.0, self.interval - (time.monotonic() - start)))
+        self.session.close()
+
+    def fetchSpectrogram(self):
+        """fetches the spectrogram and decodes it if it changed since the previous fetch.
+        """
+        headers = {'If-None-Match': self.etag} if self.etag else {}
+        response = self.session.get(BACKEND_URL + '/live_visual', headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code != 200:
+            return
+        self.etag = response.headers.get('ETag')
+        image = cv2.imdecode(np.frombuffer(response.content, np.uint8), cv2.IMREAD_COLOR)
+        self.onSpectrogram(cv2.flip(image, 0))
+
+    def fetchPrediction(self):
+        """fetches the 5 most probable classes if there is a new prediction.
+        """
+        response = self.session.get(BACKEND_URL + '/live_pred?k=5', timeout=REQUEST_TIMEOUT)
+        sequence = response.headers.get('X-Prediction-Sequence')
+        if response.status_code != 200 or (sequence is not None and sequence == self.sequence):
+            return
+        self.sequence = sequence
+        self.onPrediction(response.json())
+
+    def join(self, timeout=None):
+        """Stops the thread.
+
+        This method tries to stop a thread. When timeout has passed
+        and the thread could not be stopped yet, the program continues.
+        If timeout is set to None, join blocks until the thread is stopped.
+
+        Parameters
+        ----------
+        timeout : float
+            a timeout value in seconds
+
+        """
+        self._stopevent.set()
+        Thread.join(self, timeout)
@@ -3,19 +3,18 @@ Sample Kivy GUI
 """
 
 import json
-import numpy as np
-import cv2
 
 import requests
 from urllib.request import urlopen
 
 from kivy.app import App
-from kivy.clock import Clock, mainthread
+from kivy.clock import Clock
 from kivy.uix.floatlayout import FloatLayout
 from kivy.graphics.texture import Texture
 from kivy.core.window import Window
 from kivy.properties import ListProperty, StringProperty
 from viewer.utils.utils import getScreenResolution
+from viewer.app.fetch_thread import FetchThread
 
 class AudioTaggerWindow(FloatLayout):
     prob_list = ListProperty([100, 100, 100, 100, 100]) # length of class probability bars
@@ -27,11 +26,28 @@ class AudioTaggerWindow(FloatLayout):
     predictorProperty = StringProperty() # label showing the currently active predictor
 
 
+    def __init__(self, **kwargs):
+        super(AudioTaggerWindow, self).__init__(**kwargs)
+        # newest results of the fetch thread, drawn at most once per frame
+        self.pendingImage = None
+        self.pendingPrediction = None
+        self.spectrogramTrigger = Clock.create_trigger(self.update_Spectrogram_Image)
+        self.predictionTrigger = Clock.create_trigger(self.update_Class_Prob_Bars)
+
     def start_Button_pressed(self, label):
         self.start_button.disabled = True
-        # get current spectrogram and predictions periodically by polling
-        Clock.schedule_interval(App.get_running_app().getCurrentSpectrogram, 0.02)
-        Clock.schedule_interval(App.get_running_app().getCurrentPrediction, 0.02)
+        # get current spectrogram and predictions periodically in the background
+        App.get_running_app().startFetching()
+
+    def setSpectrogram(self, image):
+        # called from the fetch thread, older images which have not been drawn yet are replaced
+        self.pendingImage = image
+        self.spectrogramTrigger()
+
+    def setPrediction(self, prob_list):
+        # called from the fetch thread, older predictions which have not been drawn yet are replaced
+        self.pendingPrediction = prob_list
+        self.predictionTrigger()
 
     def liveOrFileSettingHasChanged(self, instance, value):
         App.get_running_app().setIsLive(value)
@@ -42,14 +58,27 @@ class AudioTaggerWindow(FloatLayout):
     def sourceSettingHasChanged(self, *args):
         App.get_running_app().setFile(args[0].selection[0].text)
 
-    @mainthread
-    def update_Spectrogram_Image(self, image):
-        image_texture = Texture.create(size=(image.shape[1], image.shape[0]), colorfmt='rgb')
-        arr = image.flatten()
-        image_texture.blit_buffer(arr, colorfmt='rgb', bufferfmt='ubyte')
+    def update_Spectrogram_Image(self, dt):
+        image, self.pendingImage = self.pendingImage, None
+        if image is None:
+            return
+        image_texture = self.img_texture.texture
+        if image_texture is None or tuple(image_texture.size) != (image.shape[1], image.shape[0]):
+            image_texture = Texture.create(size=(image.shape[1], image.shape[0]), colorfmt='rgb')
+        image_texture.blit_buffer(image.tobytes(), colorfmt='rgb', bufferfmt='ubyte')
         self.img_texture.texture = image_texture
+        self.img_texture.canvas.ask_update()
+
+    def update_Class_Prob_Bars(self, dt):
+        prob_list, self.pendingPrediction = self.pendingPrediction, None
+        if prob_list is None:
+            return
+        for i in range(5):
+            if i < len(prob_list):
+                self.update_Class_Prob_Bar(prob_list[i][0], prob_list[i][1] * self.class1Label.parent.width, 20, i)
+            else:
+                self.update_Class_Prob_Bar('', 1, 1, i)
 
-    @mainthread
     def update_Class_Prob_Bar(self, label, width, height, index):
         self.class_list[index] = label
         self.prob_list[index] = width
@@ -120,31 +149,14 @@ class MainApp(App):
         self.predictor = value
         self.notifyBackendAboutSettingsChanged()
 
-    def getCurrentSpectrogram(self, dt):
-        response = urlopen("http://127.0.0.1:5000/live_visual")
-
-        image = np.fromstring(response.read(), np.uint8)
-        image = cv2.imdecode(image, cv2.IMREAD_COLOR)
-        image = cv2.flip(image, 0)
-
-        # send new spectrogram to UI thread
-        self.window.update_Spectrogram_Image(image)
+    def startFetching(self):
+        # the backend selects the 5 most probable classes if there are more than 5, else stable position
+        self.fetchThread = FetchThread(self.window.setSpectrogram, self.window.setPrediction)
+        self.fetchThread.start()
 
-    def getCurrentPrediction(self, dt):
-        response = urlopen("http://127.0.0.1:5000/live_pred")
-        prob_list = json.loads(response.read())
-        # ordered by class probability if n of classes < 5, else stable position
-        if len(prob_list) > 5:
-            prob_list = sorted(prob_list, key=lambda i: i[1], reverse=True)
-        for i in range(5):
-            if i < len(prob_list):
-                class_label = prob_list[i][0]
-                class_width = prob_list[i][1] * self.window.class1Label.parent.width
-                # send new predictions to UI thread
-                self.window.update_Class_Prob_Bar(class_label, class_width, 20, i)
-            else:
-                # send new predictions to UI thread
-                self.window.update_Class_Prob_Bar('', 1, 1, i)
+    def on_stop(self):
+        if getattr(self, 'fetchThread', None) is not None:
+            self.fetchThread.join()
 
     def notifyBackendAboutSettingsChanged(self):
         self.setSummaryLabels()